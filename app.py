@@ -1,11 +1,19 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
+from functools import wraps
+import hmac
 import logging
+import multiprocessing
 import threading
 import time
 import os
+from datetime import datetime, timedelta, timezone
 
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
+from log_setup import setup_logging
+from profiling import profiler
+from watchdog import BotWatchdog
+
+# Настройка логирования (запись в файл и консоль - в отдельном потоке)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
@@ -13,29 +21,75 @@ app = Flask(__name__)
 # Глобальная переменная для бота
 news_bot = None
 bot_thread = None
+bot_watchdog = None
 
+# Быстрый холодный старт: бот (и его тяжелые импорты) стартует только после того,
+# как веб-сервер ответил на первый запрос, но не позже BOT_START_DELAY секунд
+BOT_AUTOSTART = os.environ.get('BOT_AUTOSTART', '1') == '1'
+BOT_START_DELAY = float(os.environ.get('BOT_START_DELAY', '10'))
+server_ready = threading.Event()
+_web_local = threading.local()
 
-def run_bot():
-    """Запускает бота в отдельном потоке"""
+# Пороги сторожа (секунды): с последнего тика основного цикла, длительность одного
+# цикла публикации, блокировка цикла событий; задержка перезапусков растет до BACKOFF_MAX
+WATCHDOG_TICK_TIMEOUT = float(os.environ.get('WATCHDOG_TICK_TIMEOUT', '900'))
+WATCHDOG_CYCLE_TIMEOUT = float(os.environ.get('WATCHDOG_CYCLE_TIMEOUT', '600'))
+WATCHDOG_LOOP_LAG_LIMIT = float(os.environ.get('WATCHDOG_LOOP_LAG_LIMIT', '60'))
+WATCHDOG_BACKOFF_MAX = float(os.environ.get('WATCHDOG_BACKOFF_MAX', '900'))
+
+
+@app.before_request
+def mark_server_ready():
+    if not server_ready.is_set():
+        server_ready.set()
+
+
+def _set_news_bot(bot):
     global news_bot
+    news_bot = bot
+    logger.info("🚀 Запускаем бота...")
+
+
+def run_bot():
+    """Запускает бота под присмотром сторожа (перезапуск при падении или зависании)"""
+    global bot_watchdog
     try:
-        # Импортируем здесь чтобы избежать циклических импортов
+        if not server_ready.wait(BOT_START_DELAY):
+            logger.info("⏳ Веб-сервер еще не получил запросов, запускаем бота по таймауту")
+
+        # Импортируем здесь чтобы избежать циклических импортов и не замедлять старт сервера
         from bot import NewsBot
-        news_bot = NewsBot()
-        logger.info("🚀 Запускаем бота...")
-        news_bot.run()
+        bot_watchdog = BotWatchdog(
+            NewsBot, on_start=_set_news_bot, tick_timeout=WATCHDOG_TICK_TIMEOUT,
+            cycle_timeout=WATCHDOG_CYCLE_TIMEOUT, loop_lag_limit=WATCHDOG_LOOP_LAG_LIMIT,
+            backoff_max=WATCHDOG_BACKOFF_MAX
+        )
+        bot_watchdog.run()
     except Exception as e:
         logger.error(f"❌ Ошибка в боте: {e}")
 
 
+def web_db():
+    """База для обработчиков запросов: свое соединение в каждом потоке сервера -
+    чтения не ждут соединение бота и его транзакции (WAL)"""
+    db = getattr(_web_local, 'db', None)
+    if db is None or db.db_path != news_bot.db.db_path:
+        from bot import DatabaseManager
+        db = DatabaseManager(news_bot.db.db_path)
+        _web_local.db = db
+    return db
+
+
 @app.route('/')
 def health_check():
     """Проверка здоровья приложения для Render"""
+    watchdog_status = bot_watchdog.status() if bot_watchdog else None
     return jsonify({
         'status': 'running',
         'service': 'Telegram News Bot',
         'timestamp': time.time(),
-        'bot_status': 'active' if news_bot else 'starting'
+        'bot_status': watchdog_status['state'] if watchdog_status else 'starting',
+        'watchdog': watchdog_status
     })
 
 
@@ -50,16 +104,144 @@ def get_stats():
     """Статистика бота"""
     if news_bot and hasattr(news_bot, 'db'):
         try:
-            reserve_count = news_bot.db.get_reserve_count()
-            return jsonify({
+            reserve_count = web_db().get_reserve_count()
+            stats = {
                 'reserve_news': reserve_count,
                 'status': 'active'
-            })
+            }
+            if getattr(news_bot, 'breaking', None):
+                stats['breaking'] = news_bot.breaking.latency.report()
+            return jsonify(stats)
         except Exception as e:
             return jsonify({'error': str(e)})
     return jsonify({'status': 'bot_not_initialized'})
 
 
+STATS_HISTORY_MAX_BUCKETS = {'hour': 24 * 31, 'day': 366}
+
+
+def _parse_time_arg(name: str):
+    """ISO 8601 из параметра запроса -> UTC без часового пояса (время без пояса считается UTC)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+@app.route('/stats/history')
+def stats_history():
+    """Почасовая или дневная статистика из предагрегированных таблиц (время - UTC)"""
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in STATS_HISTORY_MAX_BUCKETS:
+        return jsonify({'error': 'granularity must be hour or day'}), 400
+
+    step = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+    try:
+        end = _parse_time_arg('to') or datetime.now(timezone.utc).replace(tzinfo=None)
+        start = _parse_time_arg('from') or end - step * 47
+    except ValueError:
+        return jsonify({'error': 'from/to must be ISO 8601 timestamps'}), 400
+    if start > end:
+        return jsonify({'error': 'from must not be later than to'}), 400
+    if (end - start) / step >= STATS_HISTORY_MAX_BUCKETS[granularity]:
+        return jsonify({'error': f'range too large, at most {STATS_HISTORY_MAX_BUCKETS[granularity]} buckets'}), 400
+
+    if not (news_bot and hasattr(news_bot, 'db')):
+        return jsonify({'status': 'bot_not_initialized'}), 503
+
+    by_source = request.args.get('by') == 'source'
+    return jsonify({
+        'granularity': granularity,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'by': 'source' if by_source else 'total',
+        'buckets': web_db().get_stats_history(granularity, start, end, by_source)
+    })
+
+
+@app.route('/search')
+def search():
+    """Полнотекстовый поиск по опубликованным и резервным новостям"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'missing query parameter q'}), 400
+
+    kind = request.args.get('kind')
+    if kind not in (None, 'posted', 'reserve'):
+        return jsonify({'error': 'kind must be posted or reserve'}), 400
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+    if not (news_bot and hasattr(news_bot, 'db')):
+        return jsonify({'status': 'bot_not_initialized'}), 503
+
+    found = web_db().search_news(query, limit=per_page, offset=(page - 1) * per_page, kind=kind)
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': found['total'],
+        'results': found['results']
+    })
+
+
+# Отладочные эндпоинты доступны только при заданном DEBUG_TOKEN
+DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
+
+
+def require_debug_token(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not DEBUG_TOKEN:
+            return jsonify({'error': 'not found'}), 404
+        token = request.headers.get('X-Debug-Token', '')
+        if not hmac.compare_digest(token.encode(), DEBUG_TOKEN.encode()):
+            return jsonify({'error': 'forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/debug/profile', methods=['POST'])
+@require_debug_token
+def arm_profiler():
+    """Включает профилирование следующих N циклов публикации"""
+    cycles = min(max(request.args.get('cycles', 1, type=int), 0), 50)
+    trace_memory = request.args.get('memory', '1') == '1'
+    profiler.arm(cycles, trace_memory)
+    return jsonify({'armed_cycles': profiler.armed_cycles, 'trace_memory': trace_memory})
+
+
+@app.route('/debug/profile', methods=['GET'])
+@require_debug_token
+def list_profiles():
+    return jsonify({'armed_cycles': profiler.armed_cycles, 'results': profiler.summaries()})
+
+
+@app.route('/debug/profile/<int:result_id>')
+@require_debug_token
+def get_profile(result_id):
+    result = profiler.get(result_id)
+    if not result:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify({key: value for key, value in result.items() if key != 'profile'})
+
+
+@app.route('/debug/profile/<int:result_id>/download')
+@require_debug_token
+def download_profile(result_id):
+    """cProfile-дамп цикла: открывается через pstats.Stats или snakeviz"""
+    result = profiler.get(result_id)
+    if not result:
+        return jsonify({'error': 'not found'}), 404
+    return Response(result['profile'], mimetype='application/octet-stream', headers={
+        'Content-Disposition': f'attachment; filename={result["name"]}_{result_id}.prof'
+    })
+
+
 def start_bot():
     """Запуск бота в фоновом потоке"""
     global bot_thread
@@ -72,10 +254,12 @@ def start_bot():
     logger.info("🚀 Бот запущен в фоновом режиме")
 
 
-# Запускаем бот при старте приложения
-start_bot()
+# Запускаем бот при старте приложения (не в рабочих процессах пула разбора:
+# forkserver/spawn импортируют главный модуль заново)
+if BOT_AUTOSTART and multiprocessing.parent_process() is None:
+    start_bot()
 
 if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 10000))
-    logger.info(f"🌐 Запускаем веб-сервер на порту {port}")
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    from serve import run_server
+
+    run_server(app, port=int(os.environ.get('PORT', 10000)))
\ No newline at end of file
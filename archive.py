@@ -0,0 +1,273 @@
+"""Холодный архив опубликованных новостей.
+
+posted_news растет бесконечно, а проверки дублей, рейтинг и статистика
+нужны только по свежим публикациям. Старые строки переносятся в помесячные
+файлы SQLite (archive/posted_news_2025-01.db): описание хранится сжатым
+zlib, поиск идет по contentless-индексу FTS5 (только инвертированный индекс,
+без копии текста). Для проверки дублей в основной базе остается компактный
+archive_index: ключ строки, digest и месяц.
+
+Перенос идет месяц за месяцем: сначала строки записываются в файл месяца,
+затем в одной транзакции основной базы добавляются в archive_index и
+удаляются из posted_news. Если перенос прервался между шагами, повтор
+допишет в файл только недостающие строки (digest уникален). Файлы месяцев
+пишет только задача архивации; читатели открывают их только для чтения.
+
+Бот переносит старые публикации раз в сутки; вручную (например, первый
+большой перенос со сжатием файлов):
+    python archive.py --db news_bot.db --days 90 --compact
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_TABLE = '''
+    CREATE TABLE IF NOT EXISTS archive_index (
+        id INTEGER NOT NULL,
+        digest BLOB NOT NULL,
+        month TEXT NOT NULL,
+        PRIMARY KEY (id, digest)
+    ) WITHOUT ROWID
+'''
+
+PARTITION_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS posted_news (
+        id INTEGER NOT NULL,
+        digest BLOB NOT NULL UNIQUE,
+        title TEXT NOT NULL,
+        link TEXT NOT NULL,
+        posted_at TIMESTAMP,
+        source TEXT,
+        category TEXT,
+        description BLOB
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS posted_news_fts USING fts5(
+        title, description, source, category,
+        content='', tokenize='unicode61 remove_diacritics 2'
+    );
+'''
+
+COLUMNS = ('id', 'digest', 'title', 'link', 'posted_at', 'source', 'category', 'description')
+
+
+def default_archive_dir(db_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'archive')
+
+
+def compress(text: Optional[str]) -> Optional[bytes]:
+    return zlib.compress(text.encode('utf-8'), 9) if text else None
+
+
+def decompress(blob: Optional[bytes]) -> str:
+    return zlib.decompress(blob).decode('utf-8') if blob else ''
+
+
+def _next_month(month: str) -> str:
+    year, number = map(int, month.split('-'))
+    return f"{year + number // 12}-{number % 12 + 1:02d}"
+
+
+class NewsArchive:
+    def __init__(self, archive_dir: str, chunk_size: int = 2000):
+        self.archive_dir = archive_dir
+        self.chunk_size = chunk_size
+        self._readers: Dict[str, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+
+    def ensure_tables(self, cursor: sqlite3.Cursor):
+        cursor.execute(INDEX_TABLE)
+
+    def partition_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f'posted_news_{month}.db')
+
+    def months(self) -> List[str]:
+        """Месяцы с архивом, от новых к старым"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        names = [name for name in os.listdir(self.archive_dir)
+                 if name.startswith('posted_news_') and name.endswith('.db')]
+        return sorted((name[len('posted_news_'):-len('.db')] for name in names), reverse=True)
+
+    def _reader(self, month: str) -> sqlite3.Connection:
+        with self._lock:
+            conn = self._readers.get(month)
+            if conn is None:
+                conn = sqlite3.connect(f'file:{self.partition_path(month)}?mode=ro', uri=True,
+                                       check_same_thread=False)
+                self._readers[month] = conn
+            return conn
+
+    def _forget_reader(self, month: str):
+        with self._lock:
+            conn = self._readers.pop(month, None)
+        if conn:
+            conn.close()
+
+    # ---------- Перенос ----------
+    def archive_before(self, conn: sqlite3.Connection, cutoff: datetime, fenced=None) -> int:
+        """Переносит из posted_news все публикации старше cutoff (UTC). Возвращает число строк.
+
+        fenced(cursor) - проверка внутри транзакции основной базы (аренда публикатора)
+        """
+        cutoff = cutoff.strftime('%Y-%m-%d %H:%M:%S')
+        months = [row[0] for row in conn.execute(
+            "SELECT DISTINCT substr(posted_at, 1, 7) FROM posted_news WHERE posted_at < ? ORDER BY 1", (cutoff,)
+        )]
+        if not months:
+            return 0
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        moved = 0
+        for month in months:
+            end = min(f'{_next_month(month)}-01 00:00:00', cutoff)
+            while True:
+                rows = conn.execute(f'''
+                    SELECT {", ".join(COLUMNS)} FROM posted_news
+                    WHERE posted_at >= ? AND posted_at < ?
+                    ORDER BY posted_at LIMIT ?
+                ''', (f'{month}-01 00:00:00', end, self.chunk_size)).fetchall()
+                if not rows:
+                    break
+                self._write_partition(month, rows)
+                if not self._drop_from_hot(conn, month, rows, fenced):
+                    return moved
+                moved += len(rows)
+            logger.info(f"🗄️ Архив {month}: перенесены публикации до {end[:10]}")
+        return moved
+
+    def _write_partition(self, month: str, rows: List[tuple]):
+        self._forget_reader(month)
+        partition = sqlite3.connect(self.partition_path(month))
+        try:
+            partition.executescript(PARTITION_SCHEMA)
+            # Те же веса, что у поиска по основной базе
+            partition.execute(
+                "INSERT INTO posted_news_fts (posted_news_fts, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 1.0)')"
+            )
+            cursor = partition.cursor()
+            for news_id, digest, title, link, posted_at, source, category, description in rows:
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO posted_news ({", ".join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (news_id, digest, title, link, posted_at, source, category, compress(description)))
+                if cursor.rowcount == 1:
+                    cursor.execute('''
+                        INSERT INTO posted_news_fts (rowid, title, description, source, category)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (cursor.lastrowid, title, description or '', source or '', category or ''))
+            partition.commit()
+        finally:
+            partition.close()
+
+    @staticmethod
+    def _drop_from_hot(conn: sqlite3.Connection, month: str, rows: List[tuple], fenced) -> bool:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            if fenced and not fenced(cursor):
+                conn.rollback()
+                return False
+            cursor.executemany('INSERT OR IGNORE INTO archive_index (id, digest, month) VALUES (?, ?, ?)',
+                               [(row[0], row[1], month) for row in rows])
+            cursor.executemany('DELETE FROM posted_news WHERE id = ?', [(row[0],) for row in rows])
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def compact(self):
+        """VACUUM файлов архива (после первого большого переноса)"""
+        for month in self.months():
+            self._forget_reader(month)
+            partition = sqlite3.connect(self.partition_path(month))
+            try:
+                partition.execute("INSERT INTO posted_news_fts (posted_news_fts) VALUES ('optimize')")
+                partition.commit()
+                partition.execute('VACUUM')
+            finally:
+                partition.close()
+
+    # ---------- Чтение ----------
+    def search(self, match: str, limit: int) -> Dict:
+        """Поиск по всем месяцам: {'total': int, 'results': [...]} в формате DatabaseManager.search_news.
+
+        bm25 считается по статистике каждого месяца отдельно - для объединения
+        результатов этого достаточно.
+        """
+        total = 0
+        results = []
+        for month in self.months():
+            conn = self._reader(month)
+            total += conn.execute('SELECT COUNT(*) FROM posted_news_fts WHERE posted_news_fts MATCH ?',
+                                  (match,)).fetchone()[0]
+            rows = conn.execute('''
+                SELECT p.digest, p.title, p.link, p.source, p.category, p.posted_at, p.description, f.rank
+                FROM posted_news_fts f JOIN posted_news p ON p.rowid = f.rowid
+                WHERE posted_news_fts MATCH ?
+                ORDER BY f.rank
+                LIMIT ?
+            ''', (match, limit))
+            for digest, title, link, source, category, posted_at, description, rank in rows:
+                results.append({
+                    'id': digest.hex(),
+                    'kind': 'posted',
+                    'title': title,
+                    'link': link,
+                    'source': source,
+                    'category': category,
+                    'timestamp': posted_at,
+                    # contentless-индекс не строит сниппеты - начало описания
+                    'snippet': ' '.join(decompress(description).split()[:16]),
+                    'score': -rank,
+                    'archive': month,
+                })
+        return {'total': total, 'results': results}
+
+    def iter_rows(self) -> Iterator[Dict]:
+        """Все архивные публикации (для экспорта), описание распаковано"""
+        for month in sorted(self.months()):
+            cursor = self._reader(month).execute(
+                'SELECT digest, title, link, posted_at, source, category, description FROM posted_news'
+            )
+            for digest, title, link, posted_at, source, category, description in cursor:
+                yield {'id': digest.hex(), 'title': title, 'link': link, 'posted_at': posted_at,
+                       'source': source, 'category': category, 'description': decompress(description)}
+
+    def close(self):
+        for month in list(self._readers):
+            self._forget_reader(month)
+
+
+def main():
+    from bot import Config, DatabaseManager
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DB_CONFIG['database'], help='путь к базе бота')
+    parser.add_argument('--days', type=int, default=Config.ARCHIVE_AFTER_DAYS,
+                        help='оставить в базе публикации за N дней')
+    parser.add_argument('--compact', action='store_true', help='сжать файлы архива после переноса (VACUUM)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    Config.ARCHIVE_ENABLED = True
+    Config.ARCHIVE_AFTER_DAYS = args.days
+    db = DatabaseManager(args.db)
+    db.init_database()
+    moved = db.archive_old_news()
+    logger.info(f"🗄️ Перенесено в архив: {moved}")
+    if args.compact:
+        db.archive.compact()
+
+
+if __name__ == '__main__':
+    main()
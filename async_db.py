@@ -0,0 +1,144 @@
+"""Асинхронный доступ к базе для корутин публикации.
+
+Все обращения NewsBot к SQLite выполняются в отдельном потоке базы, а
+корутины только ждут результат - цикл событий не блокируется на диске и
+блокировках. Поток забирает из очереди все накопившиеся операции и
+выполняет их одной транзакцией (DatabaseManager.batch), каждую под своей
+точкой сохранения: ошибка одной операции не откатывает соседние. Результат
+отдается ожидающей корутине после фиксации транзакции.
+"""
+import asyncio
+import logging
+import queue
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _Operation:
+    __slots__ = ('func', 'args', 'kwargs', 'loop', 'future', 'ok', 'result')
+
+    def __init__(self, func, args, kwargs, loop, future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.loop = loop
+        self.future = future
+        self.ok = False
+        self.result = None
+
+    def resolve(self):
+        if self.future.cancelled():
+            return
+        if self.ok:
+            self.future.set_result(self.result)
+        else:
+            self.future.set_exception(self.result)
+
+
+class AsyncDatabase:
+    def __init__(self, db, max_batch: int = 64):
+        self.db = db
+        self.max_batch = max_batch
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name='db-worker', daemon=True)
+                self._thread.start()
+
+    async def run(self, func, *args, **kwargs):
+        """Выполняет func(*args, **kwargs) в потоке базы в составе ближайшего пакета"""
+        self._ensure_thread()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put(_Operation(func, args, kwargs, loop, future))
+        return await future
+
+    def close(self):
+        if self._thread and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _take_batch(self) -> list:
+        operations = [self._queue.get()]
+        while len(operations) < self.max_batch:
+            try:
+                operations.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return operations
+
+    def _worker(self):
+        while True:
+            operations = self._take_batch()
+            stop = any(operation is _STOP for operation in operations)
+            operations = [operation for operation in operations if operation is not _STOP]
+
+            if operations:
+                self._execute(operations)
+            if stop:
+                return
+
+    def _execute(self, operations: List[_Operation]):
+        try:
+            with self.db.batch():
+                for operation in operations:
+                    try:
+                        operation.result = self.db.run_in_batch(operation.func, *operation.args, **operation.kwargs)
+                        operation.ok = True
+                    except Exception as e:
+                        operation.result = e
+        except Exception as e:
+            logger.error(f"❌ Ошибка пакета операций с БД: {e}")
+            for operation in operations:
+                operation.ok = False
+                operation.result = e
+
+        self.batches += 1
+        self.operations += len(operations)
+        for operation in operations:
+            try:
+                operation.loop.call_soon_threadsafe(operation.resolve)
+            except RuntimeError:
+                # Цикл событий уже закрыт - результат никто не ждет
+                pass
+
+    # Операции, которые ждут корутины NewsBot
+
+    async def is_news_posted(self, news_id: str) -> bool:
+        return await self.run(self.db.is_news_posted, news_id)
+
+    async def get_known_ids(self, news_ids: List[str]) -> set:
+        return await self.run(self.db.get_known_ids, news_ids)
+
+    async def add_to_reserve(self, articles: list) -> list:
+        return await self.run(self.db.add_to_reserve, articles)
+
+    async def pick_reserve_news(self, count: int = 1, now=None) -> list:
+        return await self.run(self.db.pick_reserve_news, count, now)
+
+    async def release_reserve_news(self, news_id: str):
+        await self.run(self.db.release_reserve_news, news_id)
+
+    async def mark_news_as_posted(self, article) -> bool:
+        return await self.run(self.db.mark_news_as_posted, article)
+
+    async def get_reserve_count(self) -> int:
+        return await self.run(self.db.get_reserve_count)
+
+    async def record_stats(self, posted: list, collected: list, failures: int = 0, send_ms: float = None,
+                           cycles: int = 1):
+        await self.run(self.db.record_stats, posted, collected, failures, send_ms, cycles)
+
+    async def get_last_posted_at(self) -> Optional[datetime]:
+        return await self.run(self.db.get_last_posted_at)
@@ -0,0 +1,77 @@
+"""Бенчмарк разбора больших лент: feedparser по всему телу против потокового разбора.
+
+Для каждого размера ленты замеряются время и пиковая память (tracemalloc)
+получения первых --limit записей. Потоковому разбору тело подается кусками
+по 16 КБ, как при чтении ответа. Запуск из корня проекта:
+    python -m benchmarks.feed_parse_bench [--limit 15] [--runs 3]
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from feeds import parse_feed_bytes, parse_feed_stream
+
+CHUNK_SIZE = 16 * 1024
+CONTENT = ('<p>Разработчики анонсировали продолжение серии &mdash; релиз запланирован на осень. '
+           'Подробности обещают рассказать на ближайшей выставке.</p>') * 25
+
+
+def make_feed(items: int) -> bytes:
+    entries = []
+    for i in range(items):
+        entries.append(
+            f'<item><title>Новость {i}</title><link>https://news.example/{i}</link>'
+            f'<description><![CDATA[<p>Краткое описание новости {i}</p>]]></description>'
+            f'<content:encoded><![CDATA[{CONTENT}]]></content:encoded>'
+            f'<pubDate>Mon, 06 Jan 2025 10:00:00 +0300</pubDate>'
+            f'<media:content url="https://news.example/{i}.jpg" type="image/jpeg" medium="image"/></item>'
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/" '
+        'xmlns:content="http://purl.org/rss/1.0/modules/content/"><channel><title>Лента</title>'
+        + ''.join(entries) + '</channel></rss>'
+    ).encode('utf-8')
+
+
+def chunked(body: bytes):
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+def measure(func, runs: int):
+    timings = []
+    peak = 0
+    for _ in range(runs):
+        tracemalloc.start()
+        started = time.perf_counter()
+        records = func()
+        timings.append((time.perf_counter() - started) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(timings), peak, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--limit', type=int, default=15)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 1000])
+    args = parser.parse_args()
+
+    print(f"{'записей':>8}{'тело, КБ':>10}{'feedparser, мс':>16}{'пик, КБ':>10}"
+          f"{'поток, мс':>11}{'пик, КБ':>10}")
+    for size in args.sizes:
+        body = make_feed(size)
+        full_ms, full_peak, full_records = measure(lambda: parse_feed_bytes(body, args.limit), args.runs)
+        stream_ms, stream_peak, stream_records = measure(
+            lambda: parse_feed_stream(chunked(body), args.limit), args.runs)
+
+        assert [record['link'] for record in full_records] == [record['link'] for record in stream_records]
+        print(f"{size:>8}{len(body) / 1024:>10.0f}{full_ms:>16.1f}{full_peak / 1024:>10.0f}"
+              f"{stream_ms:>11.1f}{stream_peak / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
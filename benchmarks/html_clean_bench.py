@@ -0,0 +1,51 @@
+"""Бенчмарк очистки описаний: регулярные выражения по всему HTML против html_text.
+
+Запуск из корня проекта:
+    python -m benchmarks.html_clean_bench
+"""
+import re
+import statistics
+import time
+
+from html_text import html_to_text
+
+PARAGRAPH = ('<p>Разработчики <a href="https://example.com/game?utm_source=rss">анонсировали</a> '
+             'продолжение &laquo;серии&raquo; &mdash; релиз запланирован на&nbsp;осень.</p>\n')
+MEDIA = ('<figure><img src="https://example.com/cover.jpg" alt=""><figcaption>Скриншот</figcaption></figure>'
+         '<script>window.dataLayer = window.dataLayer || []; dataLayer.push({"event": "view"});</script>\n')
+
+
+def legacy_clean(text: str) -> str:
+    """Прежняя реализация ContentEnhancer._clean_description"""
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    if len(text) > 400:
+        text = text[:400] + '...'
+    return text.strip()
+
+
+def make_summary(size: int) -> str:
+    block = MEDIA + PARAGRAPH * 4
+    return (block * (size // len(block) + 1))[:size]
+
+
+def timeit(func, arg, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(arg)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    print(f"{'размер HTML':>12} {'регулярки, мс':>15} {'html_text, мс':>15}")
+    for size in (1_000, 10_000, 100_000, 1_000_000):
+        summary = make_summary(size)
+        repeats = 200 if size <= 10_000 else 20
+        print(f"{size:>12,} {timeit(legacy_clean, summary, repeats):>15.3f} "
+              f"{timeit(html_to_text, summary, repeats):>15.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Бенчмарк ключей posted_news: TEXT PRIMARY KEY (hex md5) против 64-битного rowid.
+
+Строится база прежнего формата (user_version 1) с --rows опубликованными
+новостями, замеряются размер таблицы и индексов (dbstat), время проверки
+"уже опубликована?" для существующих и новых id и время вставки новых
+строк. Затем база переводится штатной миграцией DatabaseManager и замеры
+повторяются. Запуск из корня проекта:
+    python -m benchmarks.key_format_bench [--rows 1000000] [--lookups 50000] [--inserts 20000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from bot import DatabaseManager
+from canonical import canonical_id
+from ranking import ReserveRanker
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE posted_news (
+        id TEXT PRIMARY KEY, title TEXT NOT NULL, link TEXT NOT NULL,
+        posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, source TEXT, category TEXT, description TEXT
+    );
+    CREATE TABLE news_reserve (
+        id TEXT PRIMARY KEY, title TEXT NOT NULL, link TEXT NOT NULL, image_url TEXT,
+        source TEXT, description TEXT, category TEXT,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, used BOOLEAN DEFAULT FALSE, published_at TIMESTAMP
+    );
+    PRAGMA user_version = 1;
+'''
+
+
+def link(i: int) -> str:
+    return f'https://news.example/articles/{i}'
+
+
+def build_legacy(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.executemany(
+        'INSERT INTO posted_news (id, title, link, posted_at, source, category) VALUES (?, ?, ?, ?, ?, ?)',
+        ((canonical_id(link(i)), f'Новость {i}', link(i), '2025-01-06 10:00:00', 'StopGame', 'news')
+         for i in range(rows))
+    )
+    # Индексы и поисковые триггеры - как в рабочей базе, чтобы вставки стоили одинаково
+    cursor = conn.cursor()
+    ReserveRanker().ensure_indexes(cursor)
+    DatabaseManager(path)._init_search_index(cursor)
+    conn.commit()
+    conn.close()
+
+
+def btree_sizes(conn: sqlite3.Connection) -> dict:
+    """Размер в КБ каждого B-дерева posted_news (таблица и ее индексы)"""
+    rows = conn.execute('''
+        SELECT name, SUM(pgsize) FROM dbstat
+        WHERE name = 'posted_news' OR name IN (SELECT name FROM sqlite_master WHERE tbl_name = 'posted_news'
+                                                                              AND type = 'index')
+        GROUP BY name
+    ''').fetchall()
+    return {name: size / 1024 for name, size in rows}
+
+
+def time_lookups(check, ids, runs: int = 3) -> float:
+    """Микросекунд на проверку (лучший из runs проходов - меньше шума)"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for news_id in ids:
+            check(news_id)
+        timings.append((time.perf_counter() - started) / len(ids) * 1e6)
+    return min(timings)
+
+
+def time_inserts(conn: sqlite3.Connection, insert, ids) -> float:
+    """Микросекунд на вставку (одна транзакция на все строки)"""
+    started = time.perf_counter()
+    for news_id in ids:
+        insert(news_id)
+    conn.commit()
+    return (time.perf_counter() - started) / len(ids) * 1e6
+
+
+def report(title: str, conn: sqlite3.Connection, check, insert, hits, misses, new_ids):
+    sizes = btree_sizes(conn)
+    hit_us = time_lookups(check, hits)
+    miss_us = time_lookups(check, misses)
+    insert_us = time_inserts(conn, insert, new_ids)
+    print(f"\n{title}")
+    for name, size in sorted(sizes.items()):
+        print(f"  {name:<32}{size / 1024:>9.1f} МБ")
+    print(f"  {'итого':<32}{sum(sizes.values()) / 1024:>9.1f} МБ")
+    print(f"  проверка: есть {hit_us:.2f} мкс, нет {miss_us:.2f} мкс; вставка {insert_us:.2f} мкс")
+    return sum(sizes.values()), hit_us, miss_us, insert_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=50_000)
+    parser.add_argument('--inserts', type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    hits = [canonical_id(link(rng.randrange(args.rows))) for _ in range(args.lookups)]
+    misses = [canonical_id(link(args.rows + i)) for i in range(args.lookups)]
+    # Вставляемые новости свои для каждого формата: база после первого замера мигрирует вместе с ними
+    legacy_new = [link(args.rows * 2 + i) for i in range(args.inserts)]
+    fresh_new = [link(args.rows * 3 + i) for i in range(args.inserts)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'keys.db')
+        started = time.perf_counter()
+        build_legacy(path, args.rows)
+        print(f"База из {args.rows} строк построена за {time.perf_counter() - started:.1f} с")
+
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode=WAL')  # как у DatabaseManager
+        cursor = conn.cursor()
+
+        def legacy_check(news_id):
+            cursor.execute('SELECT id FROM posted_news WHERE id = ?', (news_id,))
+            return cursor.fetchone() is not None
+
+        def legacy_insert(url):
+            cursor.execute('INSERT INTO posted_news (id, title, link, posted_at) VALUES (?, ?, ?, ?)',
+                           (canonical_id(url), 'Новость', url, '2025-01-07 10:00:00'))
+
+        before = report('TEXT PRIMARY KEY (hex md5)', conn, legacy_check, legacy_insert, hits, misses, legacy_new)
+        conn.close()
+
+        db = DatabaseManager(path)
+        started = time.perf_counter()
+        db.init_database()
+        print(f"\nМиграция: {time.perf_counter() - started:.1f} с")
+        conn = db.get_connection()
+        conn.execute('VACUUM')
+        cursor = conn.cursor()
+        assert all(db.find_row_key(cursor, 'posted_news', news_id) is not None for news_id in hits[:1000])
+
+        def insert(url):
+            news_id = canonical_id(url)
+            row_key = db.allocate_row_key(cursor, 'posted_news', news_id)
+            cursor.execute('INSERT INTO posted_news (id, digest, title, link, posted_at) VALUES (?, ?, ?, ?, ?)',
+                           (row_key, bytes.fromhex(news_id), 'Новость', url, '2025-01-07 10:00:00'))
+
+        after = report('INTEGER PRIMARY KEY (8 байт md5) + digest', conn,
+                       lambda news_id: db.find_row_key(cursor, 'posted_news', news_id), insert,
+                       hits, misses, fresh_new)
+        conn.close()
+
+    print(f"\nРазмер: {after[0] / before[0]:.0%} от прежнего; время относительно прежнего: "
+          f"проверка есть {after[1] / before[1]:.2f}, нет {after[2] / before[2]:.2f}, "
+          f"вставка {after[3] / before[3]:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Проверка выбора публикатора: несколько процессов на одной базе.
+
+Каждый процесс крутит цикл бота в миниатюре: продлевает аренду и, будучи
+публикатором, забирает новость из резерва и отмечает ее опубликованной.
+Время от времени процесс "зависает" дольше TTL аренды, а затем пытается
+записать со старым токеном - fencing должен отклонить такую запись.
+В конце проверяется, что ни одна новость не была забрана дважды и что у
+каждого токена был ровно один владелец. Запуск из корня проекта:
+    python -m benchmarks.leader_contention [--workers 4] [--seconds 20]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+from bot import DatabaseManager, NewsArticle
+from leader import PublisherLease
+
+
+def prepare_database(path: str, articles: int):
+    db = DatabaseManager(path)
+    db.init_database()
+    db.add_to_reserve([
+        NewsArticle(f'Новость {i}', f'https://news.example/{i}', f'Источник {i % 5}', 'games',
+                    'Описание', None)
+        for i in range(articles)
+    ])
+    db.get_connection().close()
+
+
+def worker(path: str, seconds: float, ttl: float, stall_rate: float, seed: int, events):
+    logging.basicConfig(level=logging.WARNING)
+    rng = random.Random(seed)
+    db = DatabaseManager(path)
+    lease = PublisherLease(path, ttl=ttl)
+    db.fence = lease.check_fence
+    deadline = time.time() + seconds
+    last_token = None
+
+    while time.time() < deadline:
+        if lease.acquire_or_renew() and lease.token != last_token:
+            last_token = lease.token
+            events.put(('leader', lease.holder, lease.token))
+
+        if lease.is_leader():
+            if rng.random() < stall_rate:
+                # Пауза дольше TTL без продления, затем запись по старому представлению о роли
+                time.sleep(ttl * 1.5)
+                events.put(('stall', lease.holder, lease.token))
+            for article in db.pick_reserve_news(1):
+                events.put(('claim', lease.holder, lease.token, article.id))
+                db.mark_news_as_posted(article)
+
+        time.sleep(ttl / 10)
+
+    lease.release()
+    events.put(('done', lease.holder))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--ttl', type=float, default=1.0, help='срок аренды, с')
+    parser.add_argument('--stall-rate', type=float, default=0.03)
+    parser.add_argument('--articles', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'contention.db')
+        prepare_database(path, args.articles)
+
+        events = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, args.seconds, args.ttl, args.stall_rate, seed, events))
+            for seed in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        records = []
+        finished = 0
+        while finished < args.workers:
+            record = events.get()
+            records.append(record)
+            finished += record[0] == 'done'
+        for process in processes:
+            process.join()
+
+        db = DatabaseManager(path)
+        posted = db.get_connection().execute('SELECT COUNT(*) FROM posted_news').fetchone()[0]
+
+    claims = [record for record in records if record[0] == 'claim']
+    holders_by_token = defaultdict(set)
+    for record in records:
+        if record[0] == 'leader':
+            holders_by_token[record[2]].add(record[1])
+
+    duplicate_claims = sum(count - 1 for count in Counter(claim[3] for claim in claims).values() if count > 1)
+    shared_tokens = [token for token, holders in holders_by_token.items() if len(holders) > 1]
+    stalls = sum(record[0] == 'stall' for record in records)
+
+    print(f"Процессов: {args.workers}, смен публикатора: {len(holders_by_token)}, зависаний: {stalls}")
+    print(f"Забрано из резерва: {len(claims)}, отмечено опубликованными: {posted}")
+    print(f"Повторных захватов: {duplicate_claims}, токенов с несколькими владельцами: {len(shared_tokens)}")
+
+    if duplicate_claims or shared_tokens:
+        raise SystemExit("❌ Нарушена единственность публикатора")
+    print("✅ Каждая новость забрана один раз, у каждого токена один владелец")
+
+
+if __name__ == '__main__':
+    main()
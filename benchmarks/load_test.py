@@ -0,0 +1,203 @@
+"""Нагрузочный тест веб-приложения во время циклов публикации.
+
+Для каждого сервера запускается отдельный процесс: приложение app.py с
+ботом на синтетических лентах (simulation.py), который без пауз гоняет
+циклы публикации - со сбором, разбором тел лент в потоках (нагрузка на GIL),
+резервом и записью в базу. Клиенты из этого процесса в --clients потоков
+с keep-alive запрашивают /health и /stats. Отчет: запросов в секунду,
+p50/p99 задержки по эндпоинтам и сколько циклов публикации успело пройти.
+
+    python -m benchmarks.load_test [--servers dev waitress] [--clients 16] [--duration 15]
+
+dev - встроенный сервер Flask (app.run), waitress - serve.run_server.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+PATHS = ('/health', '/stats')
+
+
+# ---------- Процесс сервера ----------
+def serve(server: str, port: int, db_path: str, parse_bodies: int):
+    os.environ['BOT_AUTOSTART'] = '0'
+    import asyncio
+    import logging
+
+    logging.disable(logging.CRITICAL)
+
+    import app as web
+    from benchmarks.parse_pool_bench import LIMIT, make_fixture
+    from bot import DatabaseManager, NewsBot
+    from simulation import EmptyHTMLParser, FakeTelegram, FixtureFeeds, NoImageEnricher, VirtualClock
+
+    clock = VirtualClock(datetime(2025, 1, 6, 7, 0))
+    feeds = FixtureFeeds(clock, sources=50, rate=2.0, variant_rate=0.1, seed=42)
+    fixture = make_fixture(parse_bodies)
+    parse_feeds = feeds.parse_feeds
+
+    async def parse_feeds_with_cpu():
+        # Разбор настоящих тел лент в пуле потоков, как RSSParser в режиме 'thread'
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(None, func, body, LIMIT) for func, body in fixture))
+        return await parse_feeds()
+
+    feeds.parse_feeds = parse_feeds_with_cpu
+    db = DatabaseManager(db_path, clock=clock)
+    db.init_database()
+    bot = NewsBot(db=db, telegram=FakeTelegram(clock, 0.0, 42), rss_parser=feeds,
+                  html_parser=EmptyHTMLParser(), clock=clock, image_enricher=NoImageEnricher())
+    web.news_bot = bot
+
+    cycles = []
+
+    def publish_forever():
+        while True:
+            clock.current += timedelta(hours=1)
+            bot.lease.acquire_or_renew()
+            started = time.perf_counter()
+            asyncio.run(bot.publish_news())
+            cycles.append((time.perf_counter() - started) * 1000)
+
+    if server == 'waitress':
+        from waitress import create_server
+
+        httpd = create_server(web.app, host='127.0.0.1', port=port, threads=8)
+        run = httpd.run
+    else:
+        from werkzeug.serving import make_server
+
+        # Как app.run: поток на запрос
+        httpd = make_server('127.0.0.1', port, web.app, threaded=True)
+        run = httpd.serve_forever
+    threading.Thread(target=run, daemon=True).start()
+
+    print('READY', flush=True)
+    # Команда от родителя: начать публикации, затем (EOF) - отчет и выход
+    sys.stdin.readline()
+    cycles.clear()
+    threading.Thread(target=publish_forever, daemon=True).start()
+    sys.stdin.read()
+    print(json.dumps({'cycles': len(cycles), 'cycle_ms_p50': statistics.median(cycles) if cycles else None}),
+          flush=True)
+    os._exit(0)
+
+
+# ---------- Клиенты ----------
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def client(port: int, deadline: float, latencies: dict, errors: list, offset: int):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    i = offset
+    local = defaultdict(list)
+    while time.perf_counter() < deadline:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        local[path].append((time.perf_counter() - started) * 1000)
+    conn.close()
+    for path, values in local.items():
+        latencies[path].extend(values)
+
+
+def percentile(values, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run_server_test(server: str, clients: int, duration: float, parse_bodies: int) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.load_test', '--serve', server, '--port', str(port),
+             '--db', os.path.join(tmp, 'load.db'), '--parse-bodies', str(parse_bodies)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        try:
+            assert process.stdout.readline().strip() == 'READY'
+            process.stdin.write('start\n')
+            process.stdin.flush()
+            time.sleep(1)  # первый цикл публикации уже идет
+
+            latencies = defaultdict(list)
+            errors = []
+            deadline = time.perf_counter() + duration
+            threads = [threading.Thread(target=client, args=(port, deadline, latencies, errors, i))
+                       for i in range(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            process.stdin.close()
+            publish = json.loads(process.stdout.readline())
+        finally:
+            process.kill()
+            process.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        'server': server,
+        'rps': total / duration,
+        'errors': len(errors),
+        'latency': {path: (statistics.median(values), percentile(values, 0.99))
+                    for path, values in latencies.items()},
+        **publish,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=['dev', 'waitress'], default=['dev', 'waitress'])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--parse-bodies', type=int, default=10, help='тел лент, разбираемых за цикл')
+    parser.add_argument('--serve', choices=['dev', 'waitress'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.db, args.parse_bodies)
+        return
+
+    print(f"Клиентов: {args.clients}, {args.duration:.0f} с на сервер, ядер: {os.cpu_count()}")
+    print(f"{'сервер':<10}{'запр/с':>8}{'ошибок':>8}"
+          + ''.join(f"{path + ' p50':>14}{path + ' p99':>14}" for path in PATHS)
+          + f"{'циклов':>8}{'цикл p50, мс':>14}")
+    for server in args.servers:
+        result = run_server_test(server, args.clients, args.duration, args.parse_bodies)
+        latency = ''.join(f"{p50:>14.1f}{p99:>14.1f}"
+                          for p50, p99 in (result['latency'].get(path, (0, 0)) for path in PATHS))
+        cycle_ms = result['cycle_ms_p50']
+        print(f"{server:<10}{result['rps']:>8.0f}{result['errors']:>8}{latency}{result['cycles']:>8}"
+              f"{cycle_ms if cycle_ms is not None else float('nan'):>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
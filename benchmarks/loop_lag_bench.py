@@ -0,0 +1,103 @@
+"""Бенчмарк задержки цикла событий во время работы с базой.
+
+Корутина-зонд просыпается каждую миллисекунду и записывает, на сколько
+позже запланированного она проснулась. Параллельно выполняются циклы
+публикации в миниатюре (добавление в резерв, выбор, отметка, счетчик) -
+синхронными вызовами DatabaseManager и через AsyncDatabase. Запуск из
+корня проекта:
+    python -m benchmarks.loop_lag_bench [--reserve 50000] [--cycles 30]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from async_db import AsyncDatabase
+from bot import DatabaseManager, NewsArticle
+
+PROBE_INTERVAL = 0.001
+
+
+def make_articles(start: int, count: int):
+    return [
+        NewsArticle(f'Новость {i}', f'https://news.example/{i}', f'Источник {i % 5}', 'games',
+                    'Описание синтетической новости ' * 10, None)
+        for i in range(start, start + count)
+    ]
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def sync_cycle(db: DatabaseManager, batch_start: int):
+    db.add_to_reserve(make_articles(batch_start, 30))
+    for article in db.pick_reserve_news(1):
+        db.mark_news_as_posted(article)
+    db.get_reserve_count()
+
+
+async def async_cycle(store: AsyncDatabase, batch_start: int):
+    await store.add_to_reserve(make_articles(batch_start, 30))
+    for article in await store.pick_reserve_news(1):
+        await store.mark_news_as_posted(article)
+    await store.get_reserve_count()
+
+
+async def measure(cycle, target, cycles: int, offset: int) -> dict:
+    lags = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    for i in range(cycles):
+        await cycle(target, offset + i * 30)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await prober
+    lags.sort()
+    return {
+        'p50': statistics.median(lags),
+        'p99': lags[min(len(lags) - 1, int(len(lags) * 0.99))],
+        'max': lags[-1],
+        'cycle_ms': elapsed / cycles * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reserve', type=int, default=50000)
+    parser.add_argument('--cycles', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'lag.db'))
+        db.init_database()
+        for start in range(0, args.reserve, 5000):
+            db.add_to_reserve(make_articles(10 ** 7 + start, min(5000, args.reserve - start)))
+        store = AsyncDatabase(db)
+
+        results = {
+            'синхронно': asyncio.run(measure(sync_cycle, db, args.cycles, 0)),
+            'AsyncDatabase': asyncio.run(measure(async_cycle, store, args.cycles, 10 ** 6)),
+        }
+        store.close()
+
+    print(f"Резерв: {args.reserve} строк, циклов: {args.cycles}")
+    print(f"{'режим':<15}{'lag p50, мс':>13}{'lag p99, мс':>13}{'lag max, мс':>13}{'цикл, мс':>11}")
+    for name, result in results.items():
+        print(f"{name:<15}{result['p50']:>13.2f}{result['p99']:>13.2f}{result['max']:>13.2f}"
+              f"{result['cycle_ms']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Бенчмарк разбора цикла сбора: пул потоков против пула процессов.
+
+Фикстура - 50 источников: ленты с HTML-сущностями вне CDATA (&nbsp;,
+&mdash; - потоковый XML-разбор отказывается, и работает feedparser) и
+страницы в разметке DTF (BeautifulSoup). Оба варианта разбирают одни и те же
+тела; замеряется полное время цикла. Пул потоков упирается в GIL, пул
+процессов масштабируется по ядрам (на машине с одним ядром выигрыша не будет).
+Запуск из корня проекта:
+    python -m benchmarks.parse_pool_bench [--workers 1 2 4] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from feeds import parse_dtf_html, parse_feed_body
+from parse_pool import ParsePool
+
+LIMIT = 15
+PARAGRAPH = 'Разработчики анонсировали продолжение&nbsp;серии &mdash; релиз запланирован на осень. '
+
+
+def make_feed(source: int, items: int = 60) -> bytes:
+    entries = []
+    for i in range(items):
+        entries.append(
+            f'<item><title>Новость {source}-{i}&nbsp;дня</title><link>https://news{source}.example/{i}</link>'
+            f'<description>{PARAGRAPH * 20}</description>'
+            f'<pubDate>Mon, 06 Jan 2025 10:00:00 +0300</pubDate>'
+            f'<enclosure url="https://news{source}.example/{i}.jpg" type="image/jpeg"/></item>'
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>Лента</title>'
+        + ''.join(entries) + '</channel></rss>'
+    ).encode('utf-8')
+
+
+def make_dtf_page(source: int, items: int = 40) -> bytes:
+    articles = []
+    for i in range(items):
+        articles.append(
+            f'<article><div class="content-header"><h2 class="content-title">'
+            f'<a href="/games/{source}-{i}">Статья {source}-{i}</a></h2></div>'
+            f'<div class="content-description">{PARAGRAPH * 10}</div>'
+            f'<img src="//leonardo.osnova.io/{source}-{i}.jpg"><div class="comments">'
+            + '<span class="like">1</span>' * 50 + '</div></article>'
+        )
+    return ('<html><body><main>' + ''.join(articles) + '</main></body></html>').encode('utf-8')
+
+
+def make_fixture(sources: int = 50, html_share: int = 5):
+    """(функция разбора, тело) для каждого источника: каждый html_share-й - HTML-страница"""
+    return [
+        (parse_dtf_html, make_dtf_page(i)) if i % html_share == 0 else (parse_feed_body, make_feed(i))
+        for i in range(sources)
+    ]
+
+
+def run_threads(fixture, workers: int):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda job: job[0](job[1], LIMIT), fixture))
+
+
+def run_processes(pool: ParsePool, fixture):
+    futures = [pool.executor.submit(func, body, LIMIT) for func, body in fixture]
+    return [future.result() for future in futures]
+
+
+def measure(func, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--sources', type=int, default=50)
+    args = parser.parse_args()
+
+    fixture = make_fixture(args.sources)
+    size_kb = sum(len(body) for _, body in fixture) / 1024
+    print(f"Источников: {len(fixture)}, тела: {size_kb:.0f} КБ, ядер: {os.cpu_count()}")
+
+    expected = run_threads(fixture, 1)
+    assert all(len(records) == LIMIT for records in expected)
+
+    print(f"{'воркеров':>9}{'потоки, мс':>12}{'процессы, мс':>14}{'ускорение':>11}")
+    for workers in args.workers:
+        threads_ms = measure(lambda: run_threads(fixture, workers), args.runs)
+
+        pool = ParsePool(workers)
+        pool.start()
+        try:
+            assert run_processes(pool, fixture) == expected
+            processes_ms = measure(lambda: run_processes(pool, fixture), args.runs)
+        finally:
+            pool.shutdown()
+
+        print(f"{workers:>9}{threads_ms:>12.0f}{processes_ms:>14.0f}{threads_ms / processes_ms:>10.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Бенчмарк выбора новости из резерва: рейтинг против размера резерва.
+
+Запуск из корня проекта:
+    python -m benchmarks.ranking_bench [--rows 100000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from ranking import ReserveRanker
+
+SOURCES = [
+    ('DTF Игры', 'games'), ('StopGame', 'news'), ('Igromania', 'news'),
+    ('Kanobu', 'news'), ('Cybersport.ru', 'esports'),
+]
+
+SCHEMA = '''
+    CREATE TABLE posted_news (
+        id TEXT PRIMARY KEY, title TEXT NOT NULL, link TEXT NOT NULL,
+        posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, source TEXT, category TEXT, description TEXT
+    );
+    CREATE TABLE news_reserve (
+        id TEXT PRIMARY KEY, title TEXT NOT NULL, link TEXT NOT NULL, image_url TEXT,
+        source TEXT, description TEXT, category TEXT,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, used BOOLEAN DEFAULT FALSE, published_at TIMESTAMP
+    );
+'''
+
+
+def build_database(path: str, rows: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    ReserveRanker().ensure_indexes(conn.cursor())
+
+    now = datetime.now(timezone.utc)
+    fmt = '%Y-%m-%d %H:%M:%S'
+
+    def reserve_rows():
+        for i in range(rows):
+            source, category = random.choice(SOURCES)
+            added = now - timedelta(minutes=rows - i)
+            yield (f'{i:032x}', f'Новость {i}', f'https://example.com/{i}',
+                   'https://example.com/i.jpg' if i % 3 else None, source, '', category,
+                   added.strftime(fmt), i % 4 == 0, added.strftime(fmt))
+
+    conn.executemany('INSERT INTO news_reserve VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', reserve_rows())
+    conn.executemany(
+        'INSERT INTO posted_news (id, title, link, posted_at, source, category) VALUES (?, ?, ?, ?, ?, ?)',
+        ((f'p{i:031x}', f'Пост {i}', f'https://example.com/p{i}',
+          (now - timedelta(hours=i)).strftime(fmt), *random.choice(SOURCES)) for i in range(rows // 10))
+    )
+    conn.commit()
+    conn.execute('ANALYZE')
+    return conn
+
+
+def measure(conn: sqlite3.Connection, repeats: int) -> list:
+    ranker = ReserveRanker()
+    cursor = conn.cursor()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        ranker.rank(cursor, 1)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (args.rows // 100, args.rows // 10, args.rows):
+            conn = build_database(os.path.join(tmp, f'reserve_{rows}.db'), rows)
+            timings = measure(conn, args.repeats)
+            print(f'{rows:>9} строк: медиана {statistics.median(timings):.3f} мс, '
+                  f'p95 {sorted(timings)[int(len(timings) * 0.95)]:.3f} мс')
+            conn.close()
+
+        conn = sqlite3.connect(os.path.join(tmp, f'reserve_{args.rows}.db'))
+        print('\nПлан запроса:')
+        plan = conn.execute('EXPLAIN QUERY PLAN ' + ReserveRanker.RANK_QUERY, {
+            'now': '', 'count': 1, 'recent_posts': 1, 'per_source': 1, 'recency_weight': 1,
+            'half_life': 1, 'image_bonus': 0, 'source_penalty': 0, 'category_penalty': 0,
+        })
+        for row in plan:
+            print('  ', row[-1])
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Бенчмарк холодного старта веб-процесса.
+
+Каждый замер - новый интерпретатор: импорт app, первый ответ /health и
+импорт bot. Дополнительно проверяется, что тяжелые модули не загружаются
+при импорте. Запуск из корня проекта:
+    python -m benchmarks.startup_bench [--runs 5] [--budget-ms 1500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('telegram', 'feedparser', 'bs4', 'requests')
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/health')
+answered = time.perf_counter()
+import bot
+bot_imported = time.perf_counter()
+print(json.dumps({
+    'import_app_ms': (imported - start) * 1000,
+    'first_health_ms': (answered - start) * 1000,
+    'import_bot_ms': (bot_imported - answered) * 1000,
+    'status': response.status_code,
+    'heavy_loaded': [name for name in %r if name in sys.modules],
+}))
+''' % (HEAVY_MODULES,)
+
+
+def run_probe() -> dict:
+    env = dict(os.environ, BOT_AUTOSTART='0')
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='завершиться с ошибкой, если медиана первого ответа больше бюджета')
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.runs)]
+    for key in ('import_app_ms', 'first_health_ms', 'import_bot_ms'):
+        values = [sample[key] for sample in samples]
+        print(f'{key:>16}: медиана {statistics.median(values):7.1f} мс, макс {max(values):7.1f} мс')
+
+    heavy = sorted({name for sample in samples for name in sample['heavy_loaded']})
+    print(f'{"heavy modules":>16}: {", ".join(heavy) if heavy else "не загружены"}')
+
+    failed = bool(heavy) or any(sample['status'] != 200 for sample in samples)
+    if args.budget_ms is not None:
+        failed |= statistics.median(sample['first_health_ms'] for sample in samples) > args.budget_ms
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,47 @@
 import os
 import asyncio
 import logging
-import schedule
 import time
 import sqlite3
-import hashlib
 import random
-from datetime import datetime, timedelta
-from telegram import Bot
+import itertools
+import threading
+from datetime import datetime, timedelta, timezone
 from config import BOT_TOKEN, CHANNEL_ID, DB_CONFIG
-import feedparser
-import requests
-from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
+import feeds
+from clock import SystemClock
+from contextlib import contextmanager
+from html_text import html_to_text
+from archive import NewsArchive, default_archive_dir
+from async_db import AsyncDatabase
+from breaking import BreakingLane
+from canonical import KEY_PROBES, LinkResolver, canonical_id, news_key
+from image_enricher import ImageEnricher
+from leader import PublisherLease
+from parse_cache import ParseCache
+from parse_pool import ParsePool
+from profiling import profiler
+from ranking import ReserveRanker
+from scheduler import SlotScheduler
+from stats_rollup import StatsRollup
+from renderer import ArticleRenderer, RenderedMessage
+from watchdog import Heartbeat
+
+# Тяжелые зависимости (telegram, feedparser, requests, bs4) импортируются там,
+# где используются: импорт модуля должен оставаться дешевым для холодного старта веб-процесса.
 
 # ==================== НАСТРОЙКА ЛОГГИРОВАНИЯ ====================
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('news_bot.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+def setup_logging():
+    """Логирование в файл и консоль при самостоятельном запуске бота (см. log_setup)"""
+    import log_setup
+
+    log_setup.setup_logging()
+
+
 # ==================== КОНФИГУРАЦИЯ ====================
 class Config:
     BOT_TOKEN = BOT_TOKEN
@@ -33,9 +49,56 @@ class Config:
 
     # Базовые часы (с 7:00 до 00:00)
     BASE_HOURS = list(range(7, 24)) + [0]  # [7, 8, 9, ..., 23, 0]
-    MAX_MESSAGE_LENGTH = 1024
+    MAX_MESSAGE_LENGTH = 1024  # подпись к фото, в единицах UTF-16
+    MAX_TEXT_LENGTH = 4096  # текстовое сообщение
+
+    # При старте не публикуем сразу, если последний пост был недавно
+    STARTUP_PUBLISH_MIN_GAP = timedelta(minutes=60)
+
+    TICK_SECONDS = 30  # период проверки расписания
+    SCHEDULE_REFRESH_HOUR = 6  # час генерации нового случайного расписания
     RSS_LIMIT = 15
     HTML_LIMIT = 10
+    REQUEST_TIMEOUT = 15
+    DESCRIPTION_LIMIT = 400  # символов видимого текста в описании
+
+    # Поиск og:image для новостей без картинки
+    IMAGE_ENRICHMENT = True
+    IMAGE_ENRICH_WORKERS = 4
+    IMAGE_CACHE_TTL = 7 * 24 * 3600  # секунд
+    PARSE_CACHE_SIZE = 64  # тел ответов в кэше разбора
+    FEED_CHUNK_SIZE = 16 * 1024  # байт за чтение при потоковом разборе лент
+    FETCH_CONCURRENCY = 8  # одновременных загрузок лент
+    # Разбор: 'thread' - потоковый в пуле потоков, 'process' - в пуле процессов (см. parse_pool)
+    PARSE_BACKEND = os.environ.get('PARSE_BACKEND', 'thread')
+    PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', '0')) or None  # None - по числу ядер
+    RESOLVE_REDIRECTS = True  # раскрывать ссылки-редиректы (t.co, /go?url=) перед расчетом id
+
+    # Срочная полоса: частый дешевый опрос быстрых источников между слотами
+    BREAKING_NEWS = True
+    BREAKING_SOURCES = ['StopGame', 'Igromania', 'Cybersport.ru']
+    BREAKING_POLL_SECONDS = 120
+    BREAKING_ENTRIES = 5  # записей с начала ленты
+    BREAKING_HOURLY_CAP = 2
+    BREAKING_SLOT_GAP = timedelta(minutes=30)  # слоты расписания не ближе этого к срочному посту
+
+    # Несколько экземпляров на одной базе: публикует только владелец аренды
+    LEADER_ELECTION = True
+    LEASE_TTL = 90  # секунд; резерв перехватывает роль не позже чем через TTL
+
+    # Дайджест: несколько новостей одним альбомом или сообщением - в слоты
+    # DIGEST_HOURS и в любой слот, когда резерв больше порога
+    DIGEST_ENABLED = True
+    DIGEST_HOURS = [13, 21]
+    DIGEST_SIZE = 5
+    DIGEST_MIN_ARTICLES = 3
+    DIGEST_RESERVE_THRESHOLD = 100
+    MEDIA_GROUP_LIMIT = 10  # фото в альбоме (ограничение Telegram)
+
+    # Публикации старше окна переносятся в помесячный архив (см. archive.py)
+    ARCHIVE_ENABLED = True
+    ARCHIVE_AFTER_DAYS = 90
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR')  # по умолчанию archive/ рядом с базой
 
     @staticmethod
     def generate_random_schedule():
@@ -52,18 +115,19 @@ class Config:
 # ==================== МОДЕЛИ ДАННЫХ ====================
 class NewsArticle:
     def __init__(self, title: str, link: str, source: str, category: str = "general",
-                 description: str = "", image_url: str = None):
+                 description: str = "", image_url: str = None, published_at: datetime = None):
         self.title = title
         self.link = link
         self.source = source
         self.category = category
         self.description = description
         self.image_url = image_url
+        self.published_at = published_at  # UTC, если источник указал дату
         self.id = self.generate_id()
 
     def generate_id(self) -> str:
-        content = f"{self.title}{self.link}".encode('utf-8')
-        return hashlib.md5(content).hexdigest()
+        # От канонической ссылки: трекинговые параметры и правки заголовка не создают новую новость
+        return canonical_id(self.link)
 
     def to_dict(self) -> Dict:
         return {
@@ -79,47 +143,99 @@ class NewsArticle:
 
 # ==================== БАЗА ДАННЫХ ====================
 class DatabaseManager:
-    def __init__(self):
+    # PRAGMA user_version: 1 - id новостей считаются от канонической ссылки,
+    # 2 - ключ строки - 64-битное число вместо hex-строки,
+    # 3 - из ссылок удаляются только трекеры, ?url= разворачивается только у редиректов
+    SCHEMA_VERSION = 3
+
+    # id - первые 8 байт md5 канонической ссылки (rowid, отдельного индекса нет),
+    # digest - полный md5: сверяется при поиске и отличает коллизии (см. canonical.news_key)
+    TABLES = {
+        'posted_news': '''
+            CREATE TABLE IF NOT EXISTS {name} (
+                id INTEGER PRIMARY KEY,
+                digest BLOB NOT NULL,
+                title TEXT NOT NULL,
+                link TEXT NOT NULL,
+                posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                source TEXT,
+                category TEXT,
+                description TEXT
+            )
+        ''',
+        'news_reserve': '''
+            CREATE TABLE IF NOT EXISTS {name} (
+                id INTEGER PRIMARY KEY,
+                digest BLOB NOT NULL,
+                title TEXT NOT NULL,
+                link TEXT NOT NULL,
+                image_url TEXT,
+                source TEXT,
+                description TEXT,
+                category TEXT,
+                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                used BOOLEAN DEFAULT FALSE,
+                published_at TIMESTAMP
+            )
+        ''',
+    }
+    # Строка новости: ключ в окне проб и совпадающий digest
+    KEY_MATCH = 'id BETWEEN ? AND ? AND digest = ?'
+
+    def __init__(self, db_path: str = None, clock=None):
+        self.db_path = db_path or DB_CONFIG['database']
+        self.clock = clock or SystemClock()
         self.connection = None
+        self.ranker = ReserveRanker()
+        self.stats = StatsRollup()
+        self.archive = None
+        if Config.ARCHIVE_ENABLED:
+            self.archive = NewsArchive(Config.ARCHIVE_DIR or default_archive_dir(self.db_path))
+        # Проверка fencing-токена публикатора внутри пишущей транзакции (см. leader.PublisherLease)
+        self.fence = None
+        self._in_batch = False
 
     def get_connection(self):
         if not self.connection:
             try:
-                self.connection = sqlite3.connect(DB_CONFIG['database'], check_same_thread=False)
+                # Несколько экземпляров бота могут работать с одной базой: WAL и ожидание блокировки
+                self.connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+                self.connection.execute('PRAGMA journal_mode=WAL')
             except Exception as e:
                 logger.error(f"Ошибка подключения к БД: {e}")
                 raise
         return self.connection
 
+    def close(self):
+        """Закрывает соединение (при следующем обращении оно откроется заново) и файлы архива"""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        if self.archive:
+            self.archive.close()
+
     def init_database(self):
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS posted_news (
-                    id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    link TEXT NOT NULL,
-                    posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    source TEXT,
-                    category TEXT
-                )
-            ''')
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS news_reserve (
-                    id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    link TEXT NOT NULL,
-                    image_url TEXT,
-                    source TEXT,
-                    description TEXT,
-                    category TEXT,
-                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    used BOOLEAN DEFAULT FALSE
-                )
-            ''')
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posted_news'")
+            fresh = cursor.fetchone() is None
+            for table, schema in self.TABLES.items():
+                cursor.execute(schema.format(name=table))
+            if fresh:
+                cursor.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+            # Колонки, которых нет в базах старых версий
+            self._ensure_column(cursor, 'posted_news', 'description', 'TEXT')
+            self._ensure_column(cursor, 'news_reserve', 'published_at', 'TIMESTAMP')
+
+            self._init_search_index(cursor)
+            self.ranker.ensure_indexes(cursor)
+            self.stats.ensure_tables(cursor)
+            if self.archive:
+                self.archive.ensure_tables(cursor)
+            self._migrate(cursor)
 
             conn.commit()
             logger.info("✅ База данных SQLite инициализирована")
@@ -130,97 +246,385 @@ class DatabaseManager:
         finally:
             cursor.close()
 
+    def _migrate(self, cursor):
+        cursor.execute('PRAGMA user_version')
+        version = cursor.fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+
+        if version < 1:
+            self._migrate_canonical_ids(cursor)
+        if version < 2:
+            self._migrate_integer_keys(cursor)
+        if version < 3:
+            self._migrate_query_ids(cursor)
+        cursor.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+    @staticmethod
+    def _migrate_canonical_ids(cursor):
+        """Пересчитывает id по канонической ссылке (раньше - md5 заголовка и ссылки).
+
+        Строки, ставшие дублями, удаляются: из опубликованных остается самая
+        ранняя, из резерва уходят уже опубликованные и повторы.
+        """
+        posted_ids = set()
+        removed = 0
+        for table, order in (('posted_news', 'posted_at'), ('news_reserve', 'added_at')):
+            seen = set()
+            rows = cursor.execute(f'SELECT rowid, id, link FROM {table} ORDER BY {order}, rowid').fetchall()
+            for rowid, old_id, link in rows:
+                new_id = canonical_id(link)
+                if new_id in seen or (table == 'news_reserve' and new_id in posted_ids):
+                    cursor.execute(f'DELETE FROM {table} WHERE rowid = ?', (rowid,))
+                    removed += 1
+                    continue
+                seen.add(new_id)
+                if new_id != old_id:
+                    cursor.execute(f'UPDATE {table} SET id = ? WHERE rowid = ?', (new_id, rowid))
+            if table == 'posted_news':
+                posted_ids = seen
+
+        if posted_ids or removed:
+            logger.info(f"🔗 Идентификаторы пересчитаны по каноническим ссылкам, удалено дублей: {removed}")
+
+    def _migrate_integer_keys(self, cursor, chunk_size: int = 5000):
+        """Переносит posted_news и news_reserve с id TEXT (hex md5) на 64-битные ключи.
+
+        Таблицы пересоздаются (rowid меняются), поэтому после переноса заново
+        создаются индексы и триггеры, а поисковые индексы перестраиваются.
+        """
+        started = time.perf_counter()
+        moved = 0
+        for table, schema in self.TABLES.items():
+            new_table = f'{table}_v2'
+            cursor.execute(f'DROP TABLE IF EXISTS {new_table}')
+            cursor.execute(schema.format(name=new_table))
+            columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()
+                       if row[1] != 'id']
+            column_list = ', '.join(columns)
+            placeholders = ', '.join('?' for _ in columns)
+            insert = f'INSERT OR IGNORE INTO {new_table} (id, digest, {column_list}) VALUES (?, ?, {placeholders})'
+
+            rows = self.get_connection().execute(f'SELECT id, link, {column_list} FROM {table} ORDER BY rowid')
+            while True:
+                chunk = rows.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                prepared = []
+                for news_id, link, *values in chunk:
+                    try:
+                        key, digest = news_key(news_id)
+                    except (TypeError, ValueError):
+                        # Не hex md5 (очень старые записи) - считаем заново по ссылке
+                        key, digest = news_key(canonical_id(link))
+                    prepared.append((key, digest, *values))
+                cursor.executemany(insert, prepared)
+                if cursor.rowcount != len(prepared):
+                    # Коллизия первых 8 байт: такие строки занимают следующие ключи
+                    for key, digest, *values in prepared:
+                        row_key = self.allocate_row_key(cursor, new_table, digest.hex())
+                        if row_key is not None:
+                            cursor.execute(insert, (row_key, digest, *values))
+                moved += len(prepared)
+
+            cursor.execute(f'DROP TABLE {table}')
+            cursor.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+
+        self._init_search_index(cursor)
+        self.ranker.ensure_indexes(cursor)
+        for _, fts in self.SEARCH_TABLES.values():
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+        if moved:
+            logger.info(f"🔢 Ключи новостей переведены на 64-битные числа: {moved} строк "
+                        f"за {time.perf_counter() - started:.1f} с")
+
+    def _migrate_query_ids(self, cursor):
+        """Пересчитывает id строк, чьи ссылки с параметрами раньше канонизировались иначе.
+
+        Строка переписывается (DELETE + INSERT), чтобы триггеры обновили поисковый
+        индекс; если новость с новым id уже есть, строка удаляется как дубль.
+        Архив не трогается: старые новости в ленты уже не вернутся.
+        """
+        changed = 0
+        for table in self.TABLES:
+            columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()
+                       if row[1] not in ('id', 'digest')]
+            column_list = ', '.join(columns)
+            rows = cursor.execute(
+                f"SELECT id, digest, {column_list} FROM {table} WHERE link LIKE '%?%'"
+            ).fetchall()
+            for row_key, digest, *values in rows:
+                new_id = canonical_id(values[columns.index('link')])
+                if new_id == digest.hex():
+                    continue
+                cursor.execute(f'DELETE FROM {table} WHERE id = ?', (row_key,))
+                new_key = self.allocate_row_key(cursor, table, new_id)
+                if new_key is not None:
+                    cursor.execute(
+                        f'INSERT INTO {table} (id, digest, {column_list}) '
+                        f'VALUES (?, ?, {", ".join("?" for _ in columns)})',
+                        (new_key, bytes.fromhex(new_id), *values)
+                    )
+                changed += 1
+        if changed:
+            logger.info(f"🔗 Идентификаторы пересчитаны по новым правилам канонизации: {changed} строк")
+
+    @staticmethod
+    def _key_params(news_id: str) -> tuple:
+        """Параметры KEY_MATCH для hex-идентификатора новости"""
+        key, digest = news_key(news_id)
+        return key, key + KEY_PROBES, digest
+
+    def find_row_key(self, cursor, table: str, news_id: str) -> Optional[int]:
+        cursor.execute(f'SELECT id FROM {table} WHERE {self.KEY_MATCH}', self._key_params(news_id))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _is_posted(self, cursor, news_id: str) -> bool:
+        """Опубликована: в posted_news или, если новость старая, в архиве"""
+        if self.find_row_key(cursor, 'posted_news', news_id) is not None:
+            return True
+        return self.archive is not None and self.find_row_key(cursor, 'archive_index', news_id) is not None
+
+    def allocate_row_key(self, cursor, table: str, news_id: str) -> Optional[int]:
+        """Свободный ключ для новой строки или None, если новость уже в таблице"""
+        key, high, digest = self._key_params(news_id)
+        cursor.execute(f'SELECT id, digest FROM {table} WHERE id BETWEEN ? AND ?', (key, high))
+        taken = {}
+        for row_key, row_digest in cursor.fetchall():
+            taken[row_key] = row_digest
+        if digest in taken.values():
+            return None
+        for row_key in range(key, high + 1):
+            if row_key not in taken:
+                return row_key
+        raise sqlite3.IntegrityError(f'{table}: все {KEY_PROBES + 1} ключей для {news_id} заняты')
+
+    @contextmanager
+    def batch(self):
+        """Одна транзакция на несколько операций (см. async_db.AsyncDatabase).
+
+        Внутри пакета операции не открывают и не фиксируют транзакцию сами;
+        откат операции возвращает к ее точке сохранения (savepoint), не трогая
+        остальные операции пакета.
+        """
+        conn = self.get_connection()
+        conn.execute('BEGIN IMMEDIATE')
+        self._in_batch = True
+        try:
+            yield
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._in_batch = False
+
+    def run_in_batch(self, func, *args, **kwargs):
+        """Выполняет операцию пакета под собственной точкой сохранения"""
+        conn = self.get_connection()
+        conn.execute('SAVEPOINT operation')
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            conn.execute('ROLLBACK TO operation')
+            raise
+        finally:
+            conn.execute('RELEASE operation')
+
+    def _begin(self, cursor):
+        if not self._in_batch:
+            cursor.execute('BEGIN IMMEDIATE')
+
+    def _commit(self, conn):
+        if not self._in_batch:
+            conn.commit()
+
+    def _rollback(self, conn):
+        if self._in_batch:
+            conn.execute('ROLLBACK TO operation')
+        else:
+            conn.rollback()
+
+    @staticmethod
+    def _ensure_column(cursor, table: str, column: str, definition: str):
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
     def is_news_posted(self, news_id: str) -> bool:
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
-            cursor.execute('SELECT id FROM posted_news WHERE id = ?', (news_id,))
-            return cursor.fetchone() is not None
+            return self._is_posted(cursor, news_id)
         except Exception as e:
             logger.error(f"❌ Ошибка проверки новости: {e}")
             return False
         finally:
             cursor.close()
 
-    def mark_news_as_posted(self, article: NewsArticle):
+    def get_known_ids(self, news_ids: List[str]) -> set:
+        """Какие из news_ids уже есть в опубликованных или в резерве"""
+        if not news_ids:
+            return set()
         conn = self.get_connection()
         cursor = conn.cursor()
 
         try:
+            # Каждая проверка - короткий диапазон по rowid
+            return {news_id for news_id in set(news_ids)
+                    if self._is_posted(cursor, news_id)
+                    or self.find_row_key(cursor, 'news_reserve', news_id) is not None}
+        except Exception as e:
+            logger.error(f"❌ Ошибка проверки известных новостей: {e}")
+            return set()
+        finally:
+            cursor.close()
+
+    def mark_news_as_posted(self, article: NewsArticle) -> bool:
+        """Записывает отправленную новость в опубликованные. False - запись не удалась"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            self._begin(cursor)
+            # Новость уже в канале: без записи ее потеряют дедупликация, история и поиск.
+            # Повторная запись невозможна (allocate_row_key), поэтому аренда здесь не ограничивает
+            if self.fence is not None and not self.fence(cursor):
+                logger.warning(f"🚧 Аренда публикатора потеряна после отправки, записываем публикацию: "
+                               f"{article.title[:50]}...")
+            row_key = self.allocate_row_key(cursor, 'posted_news', article.id)
+            if row_key is None:
+                raise sqlite3.IntegrityError(f'новость {article.id} уже опубликована')
             cursor.execute(
-                'INSERT INTO posted_news (id, title, link, source, category) VALUES (?, ?, ?, ?, ?)',
-                (article.id, article.title, article.link, article.source, article.category)
+                '''INSERT INTO posted_news (id, digest, title, link, source, category, description, posted_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                (row_key, bytes.fromhex(article.id), article.title, article.link, article.source,
+                 article.category, article.description, _format_timestamp(self.clock.utcnow()))
             )
-            conn.commit()
+            # Новость могла попасть в резерв раньше (срочная полоса, запасная новость)
+            cursor.execute(f'UPDATE news_reserve SET used = TRUE WHERE {self.KEY_MATCH} AND used = FALSE',
+                           self._key_params(article.id))
+            self._commit(conn)
             logger.info(f"✅ Новость добавлена в опубликованные: {article.title[:50]}...")
+            return True
         except Exception as e:
             logger.error(f"❌ Ошибка добавления новости: {e}")
-            conn.rollback()
+            self._rollback(conn)
+            return False
         finally:
             cursor.close()
 
-    def add_to_reserve(self, articles: List[NewsArticle]):
+    def add_to_reserve(self, articles: List[NewsArticle]) -> List[NewsArticle]:
+        """Добавляет в резерв новые новости; возвращает действительно добавленные"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        added_count = 0
+        added = []
+        added_at = _format_timestamp(self.clock.utcnow())
 
         try:
             for article in articles:
                 if not self.is_news_posted(article.id):
-                    cursor.execute('SELECT id FROM news_reserve WHERE id = ?', (article.id,))
-                    if not cursor.fetchone():
+                    row_key = self.allocate_row_key(cursor, 'news_reserve', article.id)
+                    if row_key is not None:
                         cursor.execute(
                             '''INSERT INTO news_reserve 
-                            (id, title, link, image_url, source, description, category) 
-                            VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                            (article.id, article.title, article.link, article.image_url,
-                             article.source, article.description, article.category)
+                            (id, digest, title, link, image_url, source, description, category, published_at,
+                             added_at) 
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                            (row_key, bytes.fromhex(article.id), article.title, article.link, article.image_url,
+                             article.source, article.description, article.category,
+                             _format_timestamp(article.published_at), added_at)
                         )
-                        added_count += 1
+                        added.append(article)
 
-            conn.commit()
-            logger.info(f"💾 В резерв добавлено новостей: {added_count}")
+            self._commit(conn)
+            logger.info(f"💾 В резерв добавлено новостей: {len(added)}")
 
         except Exception as e:
             logger.error(f"❌ Ошибка добавления в резерв: {e}")
-            conn.rollback()
+            self._rollback(conn)
+            added = []
         finally:
             cursor.close()
 
-    def get_reserve_news(self, count: int = 1) -> List[NewsArticle]:
+        return added
+
+    def pick_reserve_news(self, count: int = 1, now: datetime = None) -> List[NewsArticle]:
+        """Атомарно забирает из резерва лучшие по рейтингу новости (см. ReserveRanker)"""
         conn = self.get_connection()
         cursor = conn.cursor()
         articles = []
 
         try:
-            cursor.execute('''
-                SELECT id, title, link, image_url, source, description, category 
-                FROM news_reserve 
-                WHERE used = FALSE 
-                ORDER BY added_at 
-                LIMIT ?
-            ''', (count,))
-
-            for row in cursor.fetchall():
-                news_id, title, link, image_url, source, description, category = row
-                article = NewsArticle(title, link, source, category, description, image_url)
-                article.id = news_id
-                articles.append(article)
+            # IMMEDIATE берет блокировку записи сразу: выбор и пометка - одна атомарная операция
+            self._begin(cursor)
+            if not self._fenced(cursor):
+                self._rollback(conn)
+                return articles
+            for row_key, score in self.ranker.rank(cursor, count, now or self.clock.utcnow()):
+                cursor.execute('UPDATE news_reserve SET used = TRUE WHERE id = ? AND used = FALSE', (row_key,))
+                if cursor.rowcount != 1:
+                    continue
 
-                cursor.execute('UPDATE news_reserve SET used = TRUE WHERE id = ?', (news_id,))
+                cursor.execute('''
+                    SELECT digest, title, link, image_url, source, description, category, published_at
+                    FROM news_reserve WHERE id = ?
+                ''', (row_key,))
+                digest, title, link, image_url, source, description, category, published_at = cursor.fetchone()
+                article = NewsArticle(title, link, source, category, description, image_url,
+                                      _parse_timestamp(published_at))
+                article.id = digest.hex()
+                articles.append(article)
+                logger.info(f"🏅 Рейтинг {score:.2f}: {title[:50]}...")
 
-            conn.commit()
-            logger.info(f"📥 Из резерва получено новостей: {len(articles)}")
+            self._commit(conn)
+            logger.info(f"📥 Из резерва выбрано новостей: {len(articles)}")
 
         except Exception as e:
-            logger.error(f"❌ Ошибка получения из резерва: {e}")
-            conn.rollback()
+            logger.error(f"❌ Ошибка выбора из резерва: {e}")
+            self._rollback(conn)
         finally:
             cursor.close()
 
         return articles
 
+    def _fenced(self, cursor) -> bool:
+        """True, если запись разрешена: публикатор не настроен или его аренда все еще действительна"""
+        if self.fence is None or self.fence(cursor):
+            return True
+        logger.warning("🚧 Запись отклонена: аренда публикатора перехвачена другим экземпляром")
+        return False
+
+    def release_reserve_news(self, news_id: str):
+        """Возвращает новость в резерв, если ее не удалось опубликовать"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(f'UPDATE news_reserve SET used = FALSE WHERE {self.KEY_MATCH}', self._key_params(news_id))
+            self._commit(conn)
+        except Exception as e:
+            logger.error(f"❌ Ошибка возврата в резерв: {e}")
+            self._rollback(conn)
+        finally:
+            cursor.close()
+
+    def get_last_posted_at(self) -> Optional[datetime]:
+        """Время последней публикации (UTC) или None, если публикаций не было"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('SELECT MAX(posted_at) FROM posted_news')
+            return _parse_timestamp(cursor.fetchone()[0])
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения времени последней публикации: {e}")
+            return None
+        finally:
+            cursor.close()
+
     def get_reserve_count(self) -> int:
         conn = self.get_connection()
         cursor = conn.cursor()
@@ -234,14 +638,327 @@ class DatabaseManager:
         finally:
             cursor.close()
 
+    def record_stats(self, posted: List[NewsArticle], collected: List[NewsArticle], failures: int = 0,
+                     send_ms: Optional[float] = None, cycles: int = 1):
+        """Добавляет итоги цикла публикации в почасовую и дневную статистику (см. StatsRollup)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            self._begin(cursor)
+            cursor.execute('SELECT COUNT(*) FROM news_reserve WHERE used = FALSE')
+            reserve_depth = cursor.fetchone()[0]
+            self.stats.record(cursor, self.clock.utcnow(), posted, collected, failures, send_ms, reserve_depth, cycles)
+            self._commit(conn)
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи статистики: {e}")
+            self._rollback(conn)
+        finally:
+            cursor.close()
+
+    def archive_old_news(self, now: datetime = None) -> int:
+        """Переносит публикации старше ARCHIVE_AFTER_DAYS в архив (только публикатор)"""
+        if not self.archive:
+            return 0
+        cutoff = (now or self.clock.utcnow()) - timedelta(days=Config.ARCHIVE_AFTER_DAYS)
+        try:
+            return self.archive.archive_before(self.get_connection(), cutoff, fenced=self._fenced)
+        except Exception as e:
+            logger.error(f"❌ Ошибка архивации публикаций: {e}")
+            return 0
+
+    def get_stats_history(self, granularity: str, start: datetime, end: datetime,
+                          by_source: bool = False) -> List[Dict]:
+        cursor = self.get_connection().cursor()
+        try:
+            return self.stats.history(cursor, granularity, start, end, by_source)
+        finally:
+            cursor.close()
+
+    # ---------- Полнотекстовый поиск ----------
+    SEARCH_TABLES = {
+        'posted': ('posted_news', 'posted_news_fts'),
+        'reserve': ('news_reserve', 'news_reserve_fts'),
+    }
+
+    def _init_search_index(self, cursor):
+        """Создает FTS5-индексы над posted_news и news_reserve и триггеры синхронизации.
+
+        Индексы external-content: текст хранится только в исходных таблицах,
+        FTS хранит лишь инвертированный индекс по rowid.
+        """
+        for table, fts in self.SEARCH_TABLES.values():
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+            exists = cursor.fetchone() is not None
+
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    title, description, source, category,
+                    content='{table}', content_rowid='rowid',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+
+            columns = 'title, description, source, category'
+            new_values = 'new.title, new.description, new.source, new.category'
+            old_values = 'old.title, old.description, old.source, old.category'
+
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts} (rowid, {columns}) VALUES (new.rowid, {new_values});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+                    INSERT INTO {fts} (rowid, {columns}) VALUES (new.rowid, {new_values});
+                END
+            ''')
+
+            if not exists:
+                # Заголовок важнее описания, источник и категория - слабый сигнал
+                cursor.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 1.0)')")
+                cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+                logger.info(f"🔎 Поисковый индекс {fts} построен")
+
+    def rebuild_search_index(self):
+        """Полностью перестраивает поисковые индексы (например, после VACUUM)."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            for _, fts in self.SEARCH_TABLES.values():
+                cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+            conn.commit()
+            logger.info("🔎 Поисковые индексы перестроены")
+        except Exception as e:
+            logger.error(f"❌ Ошибка перестройки поискового индекса: {e}")
+            conn.rollback()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _build_match_query(query: str) -> str:
+        """Превращает пользовательский ввод в безопасный FTS5-запрос.
+
+        Каждое слово берется в кавычки (операторы FTS5 не интерпретируются),
+        последнее слово ищется по префиксу, чтобы работал поиск "на ходу".
+        """
+        terms = [term.replace('"', '""') for term in query.split()]
+        if not terms:
+            return ''
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search_news(self, query: str, limit: int = 20, offset: int = 0,
+                    kind: Optional[str] = None) -> Dict:
+        """Ранжированный поиск по опубликованным и резервным новостям.
+
+        kind: 'posted', 'reserve' или None (обе таблицы).
+        Возвращает {'total': int, 'results': [...]}, результаты отсортированы по bm25.
+        """
+        match = self._build_match_query(query)
+        if not match:
+            return {'total': 0, 'results': []}
+
+        kinds = [kind] if kind else list(self.SEARCH_TABLES)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        results = []
+        total = 0
+
+        try:
+            for name in kinds:
+                table, fts = self.SEARCH_TABLES[name]
+                # Использованные новости из резерва уже есть в posted_news
+                used_filter = 'AND t.used = FALSE' if name == 'reserve' else ''
+                timestamp = 't.posted_at' if name == 'posted' else 't.added_at'
+
+                cursor.execute(f'''
+                    SELECT COUNT(*) FROM {fts} JOIN {table} t ON t.rowid = {fts}.rowid
+                    WHERE {fts} MATCH ? {used_filter}
+                ''', (match,))
+                total += cursor.fetchone()[0]
+
+                # Из каждой таблицы достаточно взять лучшие offset + limit
+                cursor.execute(f'''
+                    SELECT lower(hex(t.digest)), t.title, t.link, t.source, t.category, {timestamp},
+                           snippet({fts}, -1, '', '', '…', 16), {fts}.rank
+                    FROM {fts} JOIN {table} t ON t.rowid = {fts}.rowid
+                    WHERE {fts} MATCH ? {used_filter}
+                    ORDER BY {fts}.rank
+                    LIMIT ?
+                ''', (match, offset + limit))
+
+                for news_id, title, link, source, category, timestamp_value, snippet, rank in cursor:
+                    results.append({
+                        'id': news_id,
+                        'kind': name,
+                        'title': title,
+                        'link': link,
+                        'source': source,
+                        'category': category,
+                        'timestamp': timestamp_value,
+                        'snippet': snippet,
+                        'score': -rank
+                    })
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка поиска новостей: {e}")
+            return {'total': 0, 'results': []}
+        finally:
+            cursor.close()
+
+        if self.archive and 'posted' in kinds:
+            try:
+                archived = self.archive.search(match, offset + limit)
+                total += archived['total']
+                results.extend(archived['results'])
+            except Exception as e:
+                logger.error(f"❌ Ошибка поиска по архиву: {e}")
+
+        results.sort(key=lambda item: item['score'], reverse=True)
+        return {'total': total, 'results': results[offset:offset + limit]}
+
+
+def _format_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """datetime -> строка в формате CURRENT_TIMESTAMP SQLite (UTC)"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
 
 # ==================== ПАРСЕРЫ НОВОСТЕЙ ====================
 class NewsParser:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    def __init__(self, parse_cache: ParseCache = None, parse_pool: ParsePool = None):
+        self.parse_cache = parse_cache
+        self.parse_pool = parse_pool
+        self._local = threading.local()
+        # Сколько байт от начала ленты понадобилось в прошлый раз: ключ кэша для потокового разбора
+        self._prefix_hints: Dict[str, int] = {}
+
+    @property
+    def session(self):
+        """Своя сессия requests у каждого потока: ленты загружаются параллельно"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            self._local.session = session
+        return session
+
+    def _fetch(self, url: str) -> bytes:
+        response = self.session.get(url, timeout=Config.REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+
+    def _parse_cached(self, body: bytes, parse_func, limit: int, source: str) -> List[Dict]:
+        """Разбирает тело ответа, пропуская разбор, если такое же тело уже встречалось"""
+        if self.parse_cache is None:
+            return parse_func(body, limit)
+
+        cache_key = self.parse_cache.make_key(body, f"{parse_func.__name__}:{limit}")
+        records = self.parse_cache.get(cache_key)
+        if records is None:
+            records = parse_func(body, limit)
+            self.parse_cache.put(cache_key, records, source)
+        else:
+            logger.info(f"🗃️ {source}: тело не изменилось, разбор пропущен")
+        return records
+
+    def _parse_in_pool(self, body: bytes, parse_func, limit: int, source: str) -> List[Dict]:
+        """Как _parse_cached, но разбор выполняется в пуле процессов"""
+        cache_key = None
+        if self.parse_cache is not None:
+            cache_key = self.parse_cache.make_key(body, f"{parse_func.__name__}:{limit}")
+            records = self.parse_cache.get(cache_key)
+            if records is not None:
+                logger.info(f"🗃️ {source}: тело не изменилось, разбор пропущен")
+                return records
+
+        records = self.parse_pool.parse_sync(parse_func, body, limit)
+        if cache_key:
+            self.parse_cache.put(cache_key, records, source)
+        return records
+
+    def _fetch_feed_records(self, url: str, limit: int, source: str) -> List[Dict]:
+        """Потоковый разбор ленты: читается только начало ответа до limit записей"""
+        response = self.session.get(url, timeout=Config.REQUEST_TIMEOUT, stream=True)
+        try:
+            response.raise_for_status()
+            return self._parse_feed_stream(response.iter_content(Config.FEED_CHUNK_SIZE), limit, source)
+        finally:
+            response.close()
+
+    def _parse_feed_stream(self, chunks, limit: int, source: str) -> List[Dict]:
+        """Кэш потокового разбора - по хэшу того же префикса, что понадобился в прошлый раз.
+
+        Изменения ленты дальше префикса не влияют на первые limit записей,
+        поэтому совпадение префикса означает совпадение результата.
+        """
+        if self.parse_cache is None:
+            return feeds.parse_feed_stream(chunks, limit)
+
+        chunks = iter(chunks)
+        namespace = f"stream:{limit}"
+        received = []
+        hint = self._prefix_hints.get(source)
+        if hint:
+            size = 0
+            for chunk in chunks:
+                received.append(chunk)
+                size += len(chunk)
+                if size >= hint:
+                    break
+            head = b''.join(received)[:hint]
+            if len(head) == hint:
+                records = self.parse_cache.get(self.parse_cache.make_key(head, namespace))
+                if records is not None:
+                    logger.info(f"🗃️ {source}: начало ленты не изменилось, разбор пропущен")
+                    return records
+
+        consumed = []
+
+        def tracked():
+            for chunk in itertools.chain(received, chunks):
+                consumed.append(chunk)
+                yield chunk
+
+        records = feeds.parse_feed_stream(tracked(), limit)
+        head = b''.join(consumed)
+        self._prefix_hints[source] = len(head)
+        self.parse_cache.put(self.parse_cache.make_key(head, namespace), records, source)
+        return records
+
+    @staticmethod
+    def _article_from_record(record: Dict, source: str, category: str) -> NewsArticle:
+        return NewsArticle(
+            title=record['title'],
+            link=record['link'],
+            source=source,
+            category=category,
+            description=record['summary'],
+            image_url=record['image_url'],
+            published_at=_parse_timestamp(record['published'])
+        )
 
 
 class RSSParser(NewsParser):
@@ -255,15 +972,28 @@ class RSSParser(NewsParser):
 
     async def parse_feeds(self) -> List[NewsArticle]:
         logger.info("📡 Запуск парсинга RSS-лент")
-        all_articles = []
-
-        for source in self.RSS_SOURCES:
-            try:
-                articles = await self.parse_single_feed(source)
-                all_articles.extend(articles)
-                logger.info(f"✅ {source['name']}: {len(articles)} новостей")
-            except Exception as e:
-                logger.error(f"❌ Ошибка парсинга {source['name']}: {e}")
+        semaphore = asyncio.Semaphore(Config.FETCH_CONCURRENCY)
+
+        async def parse_source(source: Dict) -> List[NewsArticle]:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    articles = await self.parse_single_feed(source)
+                    logger.info(f"✅ {source['name']}: {len(articles)} новостей", extra={
+                        'event': 'feed_parsed', 'source': source['name'], 'articles': len(articles),
+                        'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+                    })
+                    return articles
+                except Exception as e:
+                    logger.error(f"❌ Ошибка парсинга {source['name']}: {e}", extra={
+                        'event': 'feed_failed', 'source': source['name'],
+                        'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+                    })
+                    return []
+
+        # Порядок источников в результате сохраняется
+        results = await asyncio.gather(*(parse_source(source) for source in self.RSS_SOURCES))
+        all_articles = [article for articles in results for article in articles]
 
         logger.info(f"📡 Всего RSS-новостей: {len(all_articles)}")
         return all_articles
@@ -272,38 +1002,56 @@ class RSSParser(NewsParser):
         articles = []
 
         loop = asyncio.get_event_loop()
-        feed = await loop.run_in_executor(None, feedparser.parse, source['url'])
-
-        for entry in feed.entries[:Config.RSS_LIMIT]:
-            if hasattr(entry, 'published_parsed'):
-                published_time = datetime(*entry.published_parsed[:6])
-                if datetime.now() - published_time > timedelta(hours=48):
-                    continue
-
-            article = NewsArticle(
-                title=entry.title,
-                link=entry.link,
-                source=source['name'],
-                category=source['category'],
-                description=getattr(entry, 'summary', ''),
-                image_url=self.find_image_in_entry(entry)
+        if self.parse_pool:
+            records = await loop.run_in_executor(None, self._fetch_and_parse_in_pool, source)
+        else:
+            records = await loop.run_in_executor(
+                None, self._fetch_feed_records, source['url'], Config.RSS_LIMIT, source['name']
             )
+
+        for record in records:
+            article = self._article_from_record(record, source['name'], source['category'])
+            if article.published_at and datetime.now() - article.published_at > timedelta(hours=48):
+                continue
             articles.append(article)
 
         return articles
 
-    def find_image_in_entry(self, entry) -> Optional[str]:
-        if hasattr(entry, 'links'):
-            for link in entry.links:
-                if hasattr(link, 'type') and link.type and 'image' in link.type:
-                    return link.href
+    def _fetch_and_parse_in_pool(self, source: Dict) -> List[Dict]:
+        body = self._fetch(source['url'])
+        return self._parse_in_pool(body, feeds.parse_feed_body, Config.RSS_LIMIT, source['name'])
 
-        if hasattr(entry, 'media_content'):
-            for media in entry.media_content:
-                if media.get('type', '').startswith('image'):
-                    return media['url']
 
-        return None
+class BreakingFeedPoller(NewsParser):
+    """Опрос ленты для срочной полосы: условный запрос и разбор только первых записей"""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self._validators: Dict[str, Dict[str, str]] = {}
+
+    def poll(self, source: Dict) -> Optional[List[NewsArticle]]:
+        """Первые limit записей ленты или None, если лента не изменилась (304)"""
+        url = source['url']
+        response = self.session.get(url, headers=self._validators.get(url, {}),
+                                    timeout=Config.REQUEST_TIMEOUT, stream=True)
+        try:
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+
+            validators = {}
+            if response.headers.get('ETag'):
+                validators['If-None-Match'] = response.headers['ETag']
+            if response.headers.get('Last-Modified'):
+                validators['If-Modified-Since'] = response.headers['Last-Modified']
+            self._validators[url] = validators
+
+            records = feeds.parse_feed_stream(response.iter_content(8 * 1024), self.limit)
+        finally:
+            response.close()
+
+        return [self._article_from_record(record, source['name'], source['category']) for record in records]
 
 
 class HTMLParser(NewsParser):
@@ -312,41 +1060,12 @@ class HTMLParser(NewsParser):
         articles = []
 
         try:
-            url = "https://dtf.ru/games"
-            response = self.session.get(url, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            for article_tag in soup.find_all('article')[:Config.HTML_LIMIT]:
-                title_tag = article_tag.find('h2', class_='content-title')
-                if not title_tag:
-                    continue
-
-                link_tag = title_tag.find('a')
-                if not link_tag:
-                    continue
-
-                title = link_tag.text.strip()
-                link = "https://dtf.ru" + link_tag['href']
-
-                description_tag = article_tag.find('div', class_='content-description')
-                description = description_tag.text.strip() if description_tag else ""
-
-                image_url = None
-                img_tag = article_tag.find('img')
-                if img_tag and img_tag.get('src'):
-                    image_url = img_tag['src']
-                    if image_url.startswith('//'):
-                        image_url = 'https:' + image_url
-
-                article = NewsArticle(
-                    title=title,
-                    link=link,
-                    source='DTF',
-                    category='games',
-                    description=description,
-                    image_url=image_url
-                )
-                articles.append(article)
+            body = self._fetch("https://dtf.ru/games")
+            if self.parse_pool:
+                records = self._parse_in_pool(body, feeds.parse_dtf_html, Config.HTML_LIMIT, 'DTF')
+            else:
+                records = self._parse_cached(body, feeds.parse_dtf_html, Config.HTML_LIMIT, 'DTF')
+            articles = [self._article_from_record(record, 'DTF', 'games') for record in records]
 
             logger.info(f"✅ DTF HTML: {len(articles)} новостей")
 
@@ -367,57 +1086,49 @@ class ContentEnhancer:
 
     CATEGORY_DESCRIPTIONS = {
         'games': {
-            'intro': '🎯 **Новость из мира видеоигр**'
+            'emoji': '🎯',
+            'intro': 'Новость из мира видеоигр'
         },
         'esports': {
-            'intro': '🏆 **Новости киберспорта**'
+            'emoji': '🏆',
+            'intro': 'Новости киберспорта'
         },
         'news': {
-            'intro': '📢 **Актуальная новость**'
+            'emoji': '📢',
+            'intro': 'Актуальная новость'
         }
     }
 
     def enhance(self, article: NewsArticle) -> Dict:
+        """Готовит поля новости для ArticleRenderer (без разметки - оформление задается сущностями)"""
         category = article.category
         emoji = self.CATEGORY_EMOJIS.get(category, '📢')
         desc_config = self.CATEGORY_DESCRIPTIONS.get(category, self.CATEGORY_DESCRIPTIONS['news'])
 
-        description = self._format_description(article, desc_config)
-        link_text = self._format_link(article.link)
-
         return {
             'title': article.title,
-            'description': description,
-            'link_text': link_text,
+            'intro_emoji': desc_config['emoji'],
+            'intro': desc_config['intro'],
+            'description': self._format_description(article),
+            'source': article.source,
+            'link': article.link,
+            'link_label': self._format_link(article.link),
             'image_url': article.image_url,
             'has_image': article.image_url is not None,
             'category': category,
             'emoji': emoji
         }
 
-    def _format_description(self, article: NewsArticle, config: Dict) -> str:
+    def _format_description(self, article: NewsArticle) -> str:
         # Используем оригинальное описание или генерируем умное
-        if article.description and len(article.description.strip()) > 50:
-            description = self._clean_description(article.description)
-        else:
-            description = self._generate_smart_description(article.title)
-
-        return f"""{config['intro']}
-
-📊 {description}
-
-💬 *Обсуждение в комментариях приветствуется!*
-
-🌐 **Источник:** {article.source}"""
+        description = self._clean_description(article.description) if article.description else ''
+        if len(description) > 50:
+            return description
+        return self._generate_smart_description(article.title)
 
     def _clean_description(self, text: str) -> str:
-        """Очищает описание от HTML-тегов"""
-        import re
-        text = re.sub(r'<[^>]+>', '', text)
-        text = re.sub(r'\s+', ' ', text)
-        if len(text) > 400:
-            text = text[:400] + '...'
-        return text.strip()
+        """Очищает описание от HTML-тегов; разбирается только начало разметки (см. html_text)"""
+        return html_to_text(text, Config.DESCRIPTION_LIMIT)
 
     def _generate_smart_description(self, title: str) -> str:
         """Генерирует умное описание на основе заголовка"""
@@ -436,64 +1147,104 @@ class ContentEnhancer:
 
     def _format_link(self, link: str) -> str:
         if 'steam' in link.lower():
-            return f"[🎮 Steam]({link})"
+            return "🎮 Steam"
         elif 'dtf' in link.lower():
-            return f"[📝 DTF]({link})"
+            return "📝 DTF"
         else:
-            return f"[🌐 Читать далее]({link})"
+            return "🌐 Читать далее"
 
 
 # ==================== ТЕЛЕГРАМ БОТ ====================
 class TelegramBot:
     def __init__(self):
+        from telegram import Bot
+
         self.bot = Bot(token=Config.BOT_TOKEN)
         self.enhancer = ContentEnhancer()
+        self.renderer = ArticleRenderer()
 
     async def send_news(self, article: NewsArticle) -> bool:
         try:
             enhanced = self.enhancer.enhance(article)
-            message = self._format_message(enhanced)
 
             if enhanced['has_image']:
-                return await self._send_with_photo(message, enhanced)
+                return await self._send_with_photo(article, enhanced)
             else:
-                return await self._send_text_message(message)
+                return await self._send_text_message(article, enhanced)
 
         except Exception as e:
             logger.error(f"❌ Ошибка отправки новости: {e}")
             return False
 
-    def _format_message(self, enhanced: Dict) -> str:
-        message = f"""{enhanced['emoji']} **{enhanced['title']}**
+    async def send_digest(self, articles: List[NewsArticle]) -> List[NewsArticle]:
+        """Отправляет новости одним альбомом (подпись на первом фото) или одним сообщением.
 
-{enhanced['description']}
+        Возвращает новости, вошедшие в отправленное сообщение; не вошедшие
+        (не хватило лимита) и все при ошибке остаются неопубликованными.
+        """
+        try:
+            enhanced = [self.enhancer.enhance(article) for article in articles]
+
+            caption, count = self.renderer.render_digest(enhanced, Config.MAX_MESSAGE_LENGTH)
+            photos = [item['image_url'] for item in enhanced[:count] if item['has_image']]
+            if len(photos) >= 2:
+                try:
+                    await self._send_media_group(photos[:Config.MEDIA_GROUP_LIMIT], caption)
+                    return articles[:count]
+                except Exception as e:
+                    logger.warning(f"⚠️ Не удалось отправить альбом: {e}")
+
+            message, count = self.renderer.render_digest(enhanced, Config.MAX_TEXT_LENGTH)
+            await self.bot.send_message(
+                chat_id=Config.CHANNEL_ID,
+                text=message.text,
+                entities=self._to_entities(message),
+                disable_web_page_preview=True
+            )
+            return articles[:count]
+
+        except Exception as e:
+            logger.error(f"❌ Ошибка отправки дайджеста: {e}")
+            return []
 
-🔗 {enhanced['link_text']}"""
+    async def _send_media_group(self, photos: List[str], caption: RenderedMessage):
+        from telegram import InputMediaPhoto
 
-        if len(message) > Config.MAX_MESSAGE_LENGTH:
-            message = message[:Config.MAX_MESSAGE_LENGTH - 3] + "..."
+        media = [InputMediaPhoto(media=photos[0], caption=caption.text,
+                                 caption_entities=self._to_entities(caption))]
+        media.extend(InputMediaPhoto(media=photo) for photo in photos[1:])
+        await self.bot.send_media_group(chat_id=Config.CHANNEL_ID, media=media)
 
-        return message
+    def _format_message(self, article: NewsArticle, enhanced: Dict, limit: int) -> RenderedMessage:
+        return self.renderer.render(article.id, enhanced, limit)
 
-    async def _send_with_photo(self, message: str, enhanced: Dict) -> bool:
+    @staticmethod
+    def _to_entities(rendered: RenderedMessage) -> list:
+        from telegram import MessageEntity
+
+        return [MessageEntity(**entity) for entity in rendered.entities]
+
+    async def _send_with_photo(self, article: NewsArticle, enhanced: Dict) -> bool:
+        message = self._format_message(article, enhanced, Config.MAX_MESSAGE_LENGTH)
         try:
             await self.bot.send_photo(
                 chat_id=Config.CHANNEL_ID,
                 photo=enhanced['image_url'],
-                caption=message,
-                parse_mode='Markdown'
+                caption=message.text,
+                caption_entities=self._to_entities(message)
             )
             return True
         except Exception as e:
             logger.warning(f"⚠️ Не удалось отправить с фото: {e}")
-            return await self._send_text_message(message)
+            return await self._send_text_message(article, enhanced)
 
-    async def _send_text_message(self, message: str) -> bool:
+    async def _send_text_message(self, article: NewsArticle, enhanced: Dict) -> bool:
+        message = self._format_message(article, enhanced, Config.MAX_TEXT_LENGTH)
         try:
             await self.bot.send_message(
                 chat_id=Config.CHANNEL_ID,
-                text=message,
-                parse_mode='Markdown',
+                text=message.text,
+                entities=self._to_entities(message),
                 disable_web_page_preview=True
             )
             return True
@@ -504,87 +1255,257 @@ class TelegramBot:
 
 # ==================== ОСНОВНОЙ КЛАСС БОТА ====================
 class NewsBot:
-    def __init__(self):
-        self.db = DatabaseManager()
-        self.telegram = TelegramBot()
-        self.rss_parser = RSSParser()
-        self.html_parser = HTMLParser()
+    def __init__(self, db: DatabaseManager = None, telegram: TelegramBot = None,
+                 rss_parser: RSSParser = None, html_parser: HTMLParser = None, clock=None,
+                 image_enricher: ImageEnricher = None, lease: PublisherLease = None,
+                 link_resolver: LinkResolver = None, breaking_poller=None, breaking_sources: List[Dict] = None,
+                 parse_cache: ParseCache = None):
+        # Все зависимости можно подменить - так работает симуляция (simulation.py)
+        self.clock = clock or SystemClock()
+        self.db = db or DatabaseManager(clock=self.clock)
+        # Корутины публикации обращаются к базе только через поток базы
+        self.store = AsyncDatabase(self.db)
+        self.telegram = telegram or TelegramBot()
+        self.parse_cache = parse_cache or ParseCache(self.db.db_path, Config.PARSE_CACHE_SIZE)
+        self.parse_pool = ParsePool(Config.PARSE_WORKERS) if Config.PARSE_BACKEND == 'process' else None
+        self.rss_parser = rss_parser or RSSParser(self.parse_cache, self.parse_pool)
+        self.html_parser = html_parser or HTMLParser(self.parse_cache, self.parse_pool)
+        if image_enricher is None and Config.IMAGE_ENRICHMENT:
+            image_enricher = ImageEnricher(self.db.db_path, Config.IMAGE_ENRICH_WORKERS, Config.IMAGE_CACHE_TTL)
+        self.image_enricher = image_enricher
+        if link_resolver is None and Config.RESOLVE_REDIRECTS:
+            link_resolver = LinkResolver(self.db.db_path)
+        self.link_resolver = link_resolver
+        if lease is None and Config.LEADER_ELECTION:
+            lease = PublisherLease(self.db.db_path, ttl=Config.LEASE_TTL, clock=self.clock)
+        self.lease = lease
+        if lease:
+            self.db.fence = lease.check_fence
+        self.breaking = None
+        if Config.BREAKING_NEWS:
+            self.breaking = BreakingLane(
+                self.store, self.telegram, self.clock,
+                breaking_poller or BreakingFeedPoller(Config.BREAKING_ENTRIES),
+                breaking_sources or [source for source in RSSParser.RSS_SOURCES
+                                     if source['name'] in Config.BREAKING_SOURCES],
+                hourly_cap=Config.BREAKING_HOURLY_CAP, on_published=self._after_breaking_post
+            )
+        self.next_breaking_poll = None
+        self.scheduler = SlotScheduler(self.clock)
         self.daily_schedule = []
+        self.next_schedule_refresh = None
+        self.heartbeat = Heartbeat()
+        self.stop_event = threading.Event()
+
+    @staticmethod
+    @contextmanager
+    def _stage(timings: Dict[str, float], name: str):
+        """Замер этапа для структурного лога (и для профилировщика, если он включен)"""
+        started = time.perf_counter()
+        try:
+            with profiler.stage(name):
+                yield
+        finally:
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
 
     async def collect_news(self) -> List[NewsArticle]:
-        logger.info("🕸️ Сбор новостей со всех источников")
-        all_articles = []
+        with profiler.cycle('collect_news'):
+            logger.info("🕸️ Сбор новостей со всех источников")
+            all_articles = []
+            timings = {}
 
-        rss_articles = await self.rss_parser.parse_feeds()
-        all_articles.extend(rss_articles)
+            with self._stage(timings, 'rss'):
+                rss_articles = await self.rss_parser.parse_feeds()
+            all_articles.extend(rss_articles)
 
-        if len(all_articles) < 3:
-            html_articles = self.html_parser.parse_dtf()
-            all_articles.extend(html_articles)
+            if len(all_articles) < 3:
+                with self._stage(timings, 'html'):
+                    html_articles = self.html_parser.parse_dtf()
+                all_articles.extend(html_articles)
 
-        unique_articles = self._remove_duplicates(all_articles)
-        logger.info(f"✅ Уникальных новостей: {len(unique_articles)}")
+            if self.link_resolver:
+                with self._stage(timings, 'canonical'):
+                    await self._canonicalize_links(all_articles)
 
-        return unique_articles
+            unique_articles = self._remove_duplicates(all_articles)
+
+            if self.image_enricher:
+                with self._stage(timings, 'images'):
+                    await self._enrich_images(unique_articles)
+
+            logger.info(f"✅ Уникальных новостей: {len(unique_articles)}", extra={
+                'event': 'collect_cycle', 'articles': len(all_articles),
+                'unique_articles': len(unique_articles), 'timings_ms': timings
+            })
+
+            return unique_articles
+
+    async def _enrich_images(self, articles: List[NewsArticle]):
+        """Ищет картинки только для новостей, которых еще нет ни в резерве, ни в опубликованных"""
+        known_ids = await self.store.get_known_ids([article.id for article in articles if not article.image_url])
+        new_articles = [article for article in articles if article.id not in known_ids]
+        try:
+            await self.image_enricher.enrich(new_articles)
+        except Exception as e:
+            logger.error(f"❌ Ошибка поиска картинок: {e}")
+
+    async def _canonicalize_links(self, articles: List[NewsArticle]):
+        """Заменяет ссылки-редиректы их конечным адресом и пересчитывает id.
+
+        Остальные ссылки не меняются: id и так считается от канонической формы
+        """
+        try:
+            targets = await self.link_resolver.resolve(article.link for article in articles)
+        except Exception as e:
+            logger.error(f"❌ Ошибка раскрытия ссылок: {e}")
+            return
+
+        for article in articles:
+            link = targets.get(article.link, article.link)
+            if link != article.link:
+                article.link = link
+                article.id = article.generate_id()
 
     def _remove_duplicates(self, articles: List[NewsArticle]) -> List[NewsArticle]:
+        seen_ids = set()
         seen_titles = set()
         unique_articles = []
 
         for article in articles:
-            if article.title not in seen_titles:
+            if article.id not in seen_ids and article.title not in seen_titles:
+                seen_ids.add(article.id)
                 seen_titles.add(article.title)
                 unique_articles.append(article)
 
         return unique_articles
 
     async def publish_news(self):
+        with profiler.cycle('publish_news'):
+            await self._publish_news()
+
+    async def _publish_news(self):
         logger.info("🚀 Запуск публикации новостей")
+        timings = {}
+        outcome = 'error'
+        article_to_publish = None
+        digest = []
+        fresh_articles = []
+        reserved_articles = []
+        posted_articles = []
 
         try:
-
-
-            fresh_articles = await self.collect_news()
-            # ... остальной код
-
-            if not fresh_articles:
-                logger.warning("📭 Новости не найдены, используем резерв")
-                fresh_articles = self._get_fallback_news()
-
-            if len(fresh_articles) > 1:
-                reserve_articles = fresh_articles[1:]
-                self.db.add_to_reserve(reserve_articles)
-
-            article_to_publish = await self._select_article_to_publish(fresh_articles)
+            with self._stage(timings, 'collect'):
+                fresh_articles = await self.collect_news()
+
+            # Все свежие новости попадают в резерв, откуда выбирается лучшая по рейтингу
+            with self._stage(timings, 'reserve'):
+                if fresh_articles:
+                    reserved_articles = await self.store.add_to_reserve(fresh_articles)
+                else:
+                    logger.warning("📭 Новости не найдены, используем резерв")
+
+            with self._stage(timings, 'select'):
+                digest = await self._select_digest()
+                if not digest:
+                    article_to_publish = await self._select_article_to_publish()
+
+            if digest:
+                outcome, posted_articles = await self._publish_digest(digest, timings)
+                return
 
             if not article_to_publish:
+                outcome = 'empty'
                 logger.warning("📭 Нет подходящих новостей для публикации")
                 return
 
-            success = await self.telegram.send_news(article_to_publish)
+            with self._stage(timings, 'send'):
+                success = await self.telegram.send_news(article_to_publish)
 
             if success:
-                self.db.mark_news_as_posted(article_to_publish)
+                outcome = 'posted'
+                posted_articles = [article_to_publish]
+                with self._stage(timings, 'mark_posted'):
+                    if not await self.store.mark_news_as_posted(article_to_publish):
+                        logger.error(f"❌ Новость отправлена, но не записана в базу: {article_to_publish.link}")
                 logger.info(f"✅ Новость опубликована: {article_to_publish.title[:50]}...")
 
-                reserve_count = self.db.get_reserve_count()
+                reserve_count = await self.store.get_reserve_count()
                 logger.info(f"💾 Новостей в резерве: {reserve_count}")
             else:
+                outcome = 'send_failed'
+                await self.store.release_reserve_news(article_to_publish.id)
                 logger.error("❌ Не удалось опубликовать новость")
 
         except Exception as e:
             logger.error(f"❌ Критическая ошибка публикации: {e}")
+        finally:
+            logger.info("📊 Цикл публикации завершен", extra={
+                'event': 'publish_cycle', 'outcome': outcome, 'timings_ms': timings,
+                'article_id': article_to_publish.id if article_to_publish else None,
+                'source': article_to_publish.source if article_to_publish else None,
+                'digest_size': len(digest)
+            })
+            # collected - только новые для резерва: окно ленты перечитывается каждый слот
+            await self._record_stats(outcome, posted_articles, reserved_articles, timings)
+
+    async def _record_stats(self, outcome: str, posted: List[NewsArticle], collected: List[NewsArticle],
+                            timings: Dict[str, float]):
+        try:
+            await self.store.record_stats(posted, collected, int(outcome in ('send_failed', 'error')),
+                                          timings.get('send'))
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи статистики: {e}")
+
+    async def _select_digest(self) -> List[NewsArticle]:
+        """Новости для дайджеста, если слот дайджестный или резерв переполнен, иначе []"""
+        if not Config.DIGEST_ENABLED:
+            return []
+
+        if self.clock.now().hour not in Config.DIGEST_HOURS:
+            reserve_count = await self.store.get_reserve_count()
+            if reserve_count <= Config.DIGEST_RESERVE_THRESHOLD:
+                return []
+            logger.info(f"📚 В резерве {reserve_count} новостей - публикуем дайджест")
+
+        articles = await self.store.pick_reserve_news(Config.DIGEST_SIZE)
+        if len(articles) < Config.DIGEST_MIN_ARTICLES:
+            await asyncio.gather(*(self.store.release_reserve_news(article.id) for article in articles))
+            return []
+        return articles
 
-    async def _select_article_to_publish(self, fresh_articles: List[NewsArticle]) -> Optional[NewsArticle]:
-        if fresh_articles:
-            for article in fresh_articles:
-                if not self.db.is_news_posted(article.id):
-                    return article
-
-        reserve_articles = self.db.get_reserve_news(1)
+    async def _publish_digest(self, articles: List[NewsArticle], timings: Dict[str, float]):
+        """Возвращает исход цикла и опубликованные новости"""
+        with self._stage(timings, 'send'):
+            sent = await self.telegram.send_digest(articles)
+
+        sent_ids = {article.id for article in sent}
+        with self._stage(timings, 'mark_posted'):
+            # Операции уходят в поток базы вместе и фиксируются одной транзакцией
+            recorded = await asyncio.gather(*(
+                self.store.mark_news_as_posted(article) if article.id in sent_ids
+                else self.store.release_reserve_news(article.id)
+                for article in articles
+            ))
+        for article, ok in zip(articles, recorded):
+            if article.id in sent_ids and not ok:
+                logger.error(f"❌ Новость дайджеста отправлена, но не записана в базу: {article.link}")
+
+        if not sent:
+            logger.error("❌ Не удалось опубликовать дайджест")
+            return 'send_failed', []
+
+        logger.info(f"✅ Дайджест опубликован: {len(sent)} из {len(articles)} новостей")
+        return 'digest', sent
+
+    async def _select_article_to_publish(self) -> Optional[NewsArticle]:
+        reserve_articles = await self.store.pick_reserve_news(1)
         if reserve_articles:
             return reserve_articles[0]
 
+        for article in self._get_fallback_news():
+            if not await self.store.is_news_posted(article.id):
+                return article
+
         return None
 
     def _get_fallback_news(self) -> List[NewsArticle]:
@@ -600,26 +1521,109 @@ class NewsBot:
         """Настраивает случайное расписание на день"""
         self.daily_schedule = Config.generate_random_schedule()
 
-        # Очищаем старое расписание
-        schedule.clear()
+        # Новое расписание заменяет старое
+        self.scheduler.set_daily(self.daily_schedule, self._run_slot)
 
-        # Создаем новое расписание
-        for time_str in self.daily_schedule:
-            schedule.every().day.at(time_str).do(lambda: asyncio.run(self.publish_news()))
+        # Следующее обновление - ближайшие SCHEDULE_REFRESH_HOUR:00
+        now = self.clock.now()
+        refresh = now.replace(hour=Config.SCHEDULE_REFRESH_HOUR, minute=0, second=0, microsecond=0)
+        if refresh <= now:
+            refresh += timedelta(days=1)
+        self.next_schedule_refresh = refresh
 
         logger.info(f"⏰ Расписание на день настроено:")
         for i, time_str in enumerate(self.daily_schedule, 1):
             logger.info(f"   {i:2d}. {time_str}")
 
+    def _is_publisher(self) -> bool:
+        """Публикует только владелец аренды; остальные экземпляры - горячий резерв"""
+        return self.lease is None or self.lease.is_leader()
+
+    def _run_slot(self):
+        if not self._is_publisher():
+            logger.info("🪑 Слот пропущен: публикует другой экземпляр")
+            return
+        self._run_async(self.publish_news(), 'publish')
+
+    def _run_async(self, coro, name: str):
+        """Асинхронный цикл под наблюдением сторожа (задержка цикла событий, длительность)"""
+        return asyncio.run(self.heartbeat.watch(coro, name))
+
+    def _after_breaking_post(self, posted_at: datetime):
+        """После срочного поста ближайший слот не должен выйти сразу следом"""
+        until = self.clock.now() + Config.BREAKING_SLOT_GAP
+        if self.scheduler.postpone_until(until):
+            logger.info(f"⏩ Ближайший слот перенесен на {until:%H:%M} после срочной новости")
+
+    def _poll_breaking(self):
+        now = self.clock.now()
+        if self.next_breaking_poll and now < self.next_breaking_poll:
+            return
+        self.next_breaking_poll = now + timedelta(seconds=Config.BREAKING_POLL_SECONDS)
+
+        # Срочные новости - в рабочие часы канала и только у публикатора
+        if now.hour in Config.BASE_HOURS and self._is_publisher():
+            self._run_async(self.breaking.run(), 'breaking')
+
+    def _should_publish_on_startup(self) -> bool:
+        if not self._is_publisher():
+            return False
+
+        last_posted_at = self.db.get_last_posted_at()
+        if last_posted_at is None:
+            return True
+
+        elapsed = self.clock.utcnow() - last_posted_at
+        if elapsed < Config.STARTUP_PUBLISH_MIN_GAP:
+            logger.info(f"⏭️ Последняя публикация была {int(elapsed.total_seconds() // 60)} мин. назад, "
+                        f"первый запуск пропущен")
+            return False
+        return True
+
+    def tick(self):
+        """Одна итерация основного цикла: аренда публикатора, наступившие слоты и
+        ежедневное обновление расписания"""
+        if self.lease:
+            self.lease.acquire_or_renew()
+
+        self.scheduler.run_pending()
+
+        if self.breaking:
+            self._poll_breaking()
+
+        # Каждый день в SCHEDULE_REFRESH_HOUR:00 обновляем расписание и переносим старые публикации в архив
+        if self.clock.now() >= self.next_schedule_refresh:
+            logger.info("🔄 Обновление расписания на новый день...")
+            self.setup_schedule()
+            if self._is_publisher():
+                self.db.archive_old_news()
+
+    def stop(self):
+        """Остановка по команде сторожа: цикл завершится после текущего тика, а аренда
+        отдается сразу - даже если этот поток завис, публикует уже новый рантайм"""
+        self.stop_event.set()
+        if self.lease:
+            self.lease.release()
+
     def run(self):
         logger.info("🚀 Запуск умного бота новостей...")
 
         self.db.init_database()
         self.setup_schedule()
 
-        # Первый запуск
-        logger.info("🎯 Первый запуск публикации...")
-        asyncio.run(self.publish_news())
+        if self.lease:
+            # Между тиками (и во время долгой публикации) аренду продлевает фоновый поток
+            self.lease.acquire_or_renew()
+            self.lease.start_heartbeat()
+
+        if self.parse_pool:
+            # Процессы поднимаются и прогреваются до первой публикации
+            self.parse_pool.start()
+
+        # Первый запуск - только если канал давно не обновлялся
+        if self._should_publish_on_startup():
+            logger.info("🎯 Первый запуск публикации...")
+            self._run_async(self.publish_news(), 'publish')
 
         logger.info("\n⏰ Бот работает по расписанию...")
         logger.info("📅 Рабочее время: 7:00 - 00:00 (18 публикаций в день)")
@@ -630,21 +1634,30 @@ class NewsBot:
 
         # Основной цикл
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(30)  # Проверяем каждые 30 секунд
-
-                # Каждый день в 6:00 обновляем расписание
-                if datetime.now().hour == 6 and datetime.now().minute == 0:
-                    logger.info("🔄 Обновление расписания на новый день...")
-                    self.setup_schedule()
-                    time.sleep(60)  # Ждем минуту чтобы не сработало повторно
+            while not self.stop_event.is_set():
+                self.tick()
+                self.heartbeat.tick()
+                self.clock.sleep(Config.TICK_SECONDS)
 
         except KeyboardInterrupt:
             logger.info("\n🛑 Бот остановлен пользователем")
+        finally:
+            # Сторож пересоздает бота после сбоя: потоки и соединения этого экземпляра не должны оставаться
+            self.store.close()
+            if self.parse_pool:
+                self.parse_pool.shutdown()
+            if self.image_enricher:
+                self.image_enricher.close()
+            if self.link_resolver:
+                self.link_resolver.close()
+            self.parse_cache.close()
+            if self.lease:
+                self.lease.release()
+            self.db.close()
 
 
 # ==================== ЗАПУСК ====================
 if __name__ == "__main__":
+    setup_logging()
     bot = NewsBot()
     bot.run()
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""Быстрая полоса для срочных новостей между слотами расписания.
+
+Самые быстрые источники опрашиваются часто и дешево: условные запросы
+(If-None-Match / If-Modified-Since, ответ 304 без тела) и потоковый разбор
+только нескольких первых записей. Новые записи оцениваются по ключевым
+словам; подходящая публикуется сразу, не чаще hourly_cap раз в час, после
+чего ближайший слот расписания сдвигается, чтобы сохранить интервал между
+постами. Для каждой срочной публикации замеряется задержка от обнаружения
+(и от времени публикации источником) до отправки.
+"""
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEYWORDS = {
+    'срочно': 3.0, 'официально': 2.0, 'анонсирова': 2.0, 'анонс': 1.0, 'утечк': 1.5, 'слив': 1.5,
+    'вышла': 1.0, 'вышел': 1.0, 'релиз': 1.0, 'закрыва': 2.0, 'увольнен': 1.5, 'купила': 1.5,
+    'приобрела': 1.5, 'gta 6': 3.0, 'gta vi': 3.0, 'half-life 3': 3.0, 'nintendo direct': 2.0,
+    'state of play': 2.0, 'the game awards': 2.0, 'summer game fest': 2.0,
+}
+
+
+class KeywordMatcher:
+    """Приоритет новости по ключевым словам: совпадения в заголовке - полный вес,
+    в описании - половина. Срочной считается новость с приоритетом от threshold."""
+
+    def __init__(self, keywords: Dict[str, float] = None, threshold: float = 3.0):
+        self.keywords = {word.lower(): weight for word, weight in (keywords or DEFAULT_KEYWORDS).items()}
+        self.threshold = threshold
+
+    def score(self, title: str, description: str = '') -> float:
+        title = (title or '').lower()
+        description = (description or '').lower()
+        score = 0.0
+        for word, weight in self.keywords.items():
+            if word in title:
+                score += weight
+            elif word in description:
+                score += weight / 2
+        return score
+
+
+class LatencyStats:
+    """Последние замеры задержки срочных публикаций"""
+
+    def __init__(self, size: int = 200):
+        self.detect_to_post_ms = deque(maxlen=size)
+        self.publish_to_post_s = deque(maxlen=size)
+        self.posted = 0
+
+    def add(self, detect_to_post_ms: float, publish_to_post_s: Optional[float]):
+        self.posted += 1
+        self.detect_to_post_ms.append(detect_to_post_ms)
+        if publish_to_post_s is not None:
+            self.publish_to_post_s.append(publish_to_post_s)
+
+    @staticmethod
+    def _summary(values) -> Optional[Dict[str, float]]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return {
+            'p50': round(statistics.median(ordered), 1),
+            'p95': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+            'max': round(ordered[-1], 1),
+        }
+
+    def report(self) -> Dict:
+        return {
+            'posted': self.posted,
+            'detect_to_post_ms': self._summary(self.detect_to_post_ms),
+            'publish_to_post_s': self._summary(self.publish_to_post_s),
+        }
+
+
+class BreakingLane:
+    def __init__(self, store, telegram, clock, poller, sources: List[Dict], matcher: KeywordMatcher = None,
+                 hourly_cap: int = 2, max_age: timedelta = timedelta(hours=3),
+                 on_published: Callable[[datetime], None] = None):
+        self.store = store
+        self.telegram = telegram
+        self.clock = clock
+        self.poller = poller
+        self.sources = sources
+        self.matcher = matcher or KeywordMatcher()
+        self.hourly_cap = hourly_cap
+        self.max_age = max_age
+        self.on_published = on_published
+        self.latency = LatencyStats()
+        self._posted_at = deque()
+        self._seen: Dict[str, datetime] = {}  # id -> когда новость впервые увидели
+        self._baseline_done = set()
+
+    def _cap_reached(self, now: datetime) -> bool:
+        while self._posted_at and now - self._posted_at[0] >= timedelta(hours=1):
+            self._posted_at.popleft()
+        return len(self._posted_at) >= self.hourly_cap
+
+    async def _poll_source(self, source: Dict) -> List:
+        loop = asyncio.get_running_loop()
+        try:
+            articles = await loop.run_in_executor(None, self.poller.poll, source)
+        except Exception as e:
+            logger.debug(f"Срочная полоса: {source['name']} недоступен: {e}")
+            return []
+        if articles is None:  # 304 Not Modified
+            return []
+
+        now = self.clock.utcnow()
+        new_articles = [article for article in articles if article.id not in self._seen]
+        for article in new_articles:
+            self._seen[article.id] = now
+
+        # Первый опрос источника - точка отсчета: то, что уже было в ленте, не срочно
+        if source['name'] not in self._baseline_done:
+            self._baseline_done.add(source['name'])
+            return []
+        return new_articles
+
+    async def run(self) -> int:
+        """Один опрос быстрых источников; возвращает число срочных публикаций"""
+        # Источники опрашиваются по очереди: запросы маленькие, а сессия requests не потокобезопасна
+        fresh = []
+        for source in self.sources:
+            fresh.extend(await self._poll_source(source))
+        now = self.clock.utcnow()
+
+        candidates = []
+        for article in fresh:
+            if article.published_at and now - article.published_at > self.max_age:
+                continue
+            score = self.matcher.score(article.title, article.description)
+            if score >= self.matcher.threshold:
+                candidates.append((score, article))
+        self._forget_old(now)
+
+        published = 0
+        for score, article in sorted(candidates, key=lambda item: item[0], reverse=True):
+            if self._cap_reached(self.clock.utcnow()):
+                logger.info(f"⚡ Лимит срочных публикаций ({self.hourly_cap} в час) исчерпан")
+                break
+            if await self.store.is_news_posted(article.id):
+                continue
+            if await self._publish(article, score):
+                published += 1
+        return published
+
+    async def _publish(self, article, score: float) -> bool:
+        started = time.perf_counter()
+        sent = await self.telegram.send_news(article)
+        send_ms = round((time.perf_counter() - started) * 1000, 1)
+        if not sent:
+            logger.error(f"❌ Не удалось опубликовать срочную новость: {article.title[:50]}...")
+            await self._record_stats([], 1, None)
+            return False
+
+        if not await self.store.mark_news_as_posted(article):
+            logger.error(f"❌ Срочная новость отправлена, но не записана в базу: {article.link}")
+        posted_at = self.clock.utcnow()
+        self._posted_at.append(posted_at)
+
+        detect_to_post_ms = (posted_at - self._seen.get(article.id, posted_at)).total_seconds() * 1000
+        publish_to_post_s = (posted_at - article.published_at).total_seconds() if article.published_at else None
+        self.latency.add(detect_to_post_ms, publish_to_post_s)
+        logger.info(f"⚡ Срочная новость опубликована (приоритет {score:.1f}): {article.title[:50]}...", extra={
+            'event': 'breaking_post', 'article_id': article.id, 'source': article.source,
+            'detect_to_post_ms': round(detect_to_post_ms, 1), 'publish_to_post_s': publish_to_post_s
+        })
+
+        await self._record_stats([article], 0, send_ms)
+        if self.on_published:
+            self.on_published(posted_at)
+        return True
+
+    async def _record_stats(self, posted: List, failures: int, send_ms: Optional[float]):
+        """Срочные публикации учитываются в той же статистике, что и слоты расписания"""
+        try:
+            await self.store.record_stats(posted, [], failures, send_ms, cycles=0)
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи статистики срочной новости: {e}")
+
+    def _forget_old(self, now: datetime):
+        """Идентификаторы из _seen нужны, пока новость может оставаться в ленте"""
+        horizon = now - timedelta(hours=48)
+        for news_id in [news_id for news_id, seen_at in self._seen.items() if seen_at < horizon]:
+            del self._seen[news_id]
@@ -0,0 +1,258 @@
+"""Канонические ссылки на новости.
+
+Одна и та же история приходит с трекинговыми параметрами (utm_*, from=rss),
+с разным написанием хоста или через редирект-эндпоинт (/go?url=..., t.co).
+Идентификатор новости считается от канонической ссылки, поэтому такие
+варианты - одна новость. Публикуется при этом исходная ссылка: каноническая
+форма (https, без www и параметров вроде source) нужна только для id.
+Редиректы раскрываются сетевым запросом только для ссылок, похожих на
+редирект, и результат хранится в таблице url_redirects: каждая ссылка
+раскрывается один раз, а в пост идет конечный адрес редиректа.
+"""
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Только параметры рекламных и аналитических систем: from, ref, source, share и
+# подобные на многих сайтах адресуют содержимое, и их удаление склеило бы разные новости
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'gbraid', 'wbraid', 'dclid', 'yclid', 'ysclid', 'msclkid', 'igshid', 'twclid',
+    'ttclid', 'li_fat_id', 'mc_cid', 'mc_eid', 'mkt_tok', '_ga', '_openstat', 'spm',
+    'pk_campaign', 'pk_kwd', 'pk_source', 'pk_medium', 'pk_content', 'at_medium', 'at_campaign'
+})
+TRACKING_PREFIXES = ('utm_', 'hmb_')
+# Параметры редирект-эндпоинтов, в которых лежит целевая ссылка (только для looks_like_redirect)
+TARGET_PARAMS = ('url', 'u', 'to', 'target', 'link', 'redirect')
+REDIRECT_HOSTS = frozenset({
+    't.co', 'bit.ly', 'goo.gl', 'vk.cc', 'clck.ru', 'tinyurl.com', 'ow.ly', 'feedproxy.google.com',
+    'feeds.feedburner.com', 'away.vk.com'
+})
+REDIRECT_PATH_PARTS = frozenset({'go', 'away', 'redirect', 'out'})
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Ключ строки новости - первые 8 байт md5 как int64; при коллизии строка
+# занимает один из следующих KEY_PROBES ключей (см. DatabaseManager)
+KEY_PROBES = 8
+MAX_KEY = 2 ** 63 - 1
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """Каноническая форма ссылки без сети: https, хост в нижнем регистре без www,
+    без порта по умолчанию, фрагмента, трекинговых параметров и завершающего '/';
+    оставшиеся параметры отсортированы. Редирект-эндпоинт (см. looks_like_redirect)
+    с целевой ссылкой в параметре (/go?url=https://...) разворачивается."""
+    if not url:
+        return url
+    url = url.strip()
+    parts = urlsplit(url)
+    if parts.scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    target = _target_from_query(query) if looks_like_redirect(url) else None
+    if target and target != url:
+        return canonicalize_url(target)
+
+    host = parts.hostname.lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port != DEFAULT_PORTS[parts.scheme]:
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    params = sorted((name, value) for name, value in query if not _is_tracking(name))
+    return urlunsplit(('https', host, path, urlencode(params), ''))
+
+
+def _target_from_query(query) -> Optional[str]:
+    for name, value in query:
+        if name.lower() in TARGET_PARAMS:
+            if value.startswith(('http://', 'https://')):
+                return value
+    return None
+
+
+def canonical_id(link: str) -> str:
+    """Идентификатор новости - md5 канонической ссылки"""
+    return hashlib.md5(canonicalize_url(link).encode('utf-8')).hexdigest()
+
+
+def news_key(news_id: str) -> Tuple[int, bytes]:
+    """hex-идентификатор новости -> (базовый ключ строки, полный md5)"""
+    digest = bytes.fromhex(news_id)
+    key = int.from_bytes(digest[:8], 'big', signed=True)
+    # Окно проб не должно выходить за int64
+    return min(key, MAX_KEY - KEY_PROBES), digest
+
+
+def looks_like_redirect(url: str) -> bool:
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if host in REDIRECT_HOSTS:
+        return True
+    segments = [segment for segment in parts.path.lower().split('/') if segment]
+    return bool(segments) and segments[0] in REDIRECT_PATH_PARTS
+
+
+class LinkResolver:
+    """Раскрытие редиректов с постоянным кэшем url -> каноническая ссылка"""
+
+    def __init__(self, db_path: str, max_workers: int = 4, timeout: float = 5.0, per_cycle_limit: int = 30):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.per_cycle_limit = per_cycle_limit
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='link-resolver')
+        self.connection = None
+        self._local = threading.local()
+
+    def get_connection(self):
+        if not self.connection:
+            self.connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS url_redirects (
+                    url TEXT PRIMARY KEY,
+                    canonical TEXT NOT NULL,
+                    resolved_at REAL NOT NULL,
+                    target TEXT
+                )
+            ''')
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(url_redirects)')]
+            if 'target' not in columns:
+                # Старые записи хранили только каноническую форму - такие ссылки раскроются заново
+                self.connection.execute('ALTER TABLE url_redirects ADD COLUMN target TEXT')
+            self.connection.commit()
+        return self.connection
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+
+            session = requests.Session()
+            session.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
+            self._local.session = session
+        return session
+
+    def lookup(self, urls: Iterable[str]) -> Dict[str, str]:
+        """url -> конечный адрес для уже раскрытых ссылок"""
+        urls = list(urls)
+        if not urls:
+            return {}
+        placeholders = ', '.join('?' for _ in urls)
+        rows = self.get_connection().execute(
+            f'SELECT url, target FROM url_redirects WHERE url IN ({placeholders}) AND target IS NOT NULL', urls
+        )
+        return dict(rows.fetchall())
+
+    def store(self, resolved: Dict[str, str]):
+        conn = self.get_connection()
+        now = time.time()
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO url_redirects (url, canonical, target, resolved_at) VALUES (?, ?, ?, ?)',
+                [(url, canonicalize_url(target), target, now) for url, target in resolved.items()]
+            )
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи кэша редиректов: {e}")
+            conn.rollback()
+
+    def follow(self, url: str) -> Optional[str]:
+        """Конечный адрес цепочки редиректов (HEAD, при отказе - GET без чтения тела)"""
+        session = self._session()
+        try:
+            response = session.head(url, allow_redirects=True, timeout=self.timeout)
+            if response.status_code >= 400:
+                response = session.get(url, allow_redirects=True, timeout=self.timeout, stream=True)
+                response.close()
+            if response.status_code >= 400:
+                return None
+            return response.url
+        except Exception as e:
+            logger.debug(f"Не удалось раскрыть {url}: {e}")
+            return None
+
+    async def resolve(self, links: Iterable[str]) -> Dict[str, str]:
+        """link -> конечный адрес для ссылок-редиректов; сеть - только для ранее не раскрытых.
+        Остальных ссылок в результате нет: они публикуются как есть."""
+        result = {}
+        redirects = {}
+        for link in set(links):
+            canonical = canonicalize_url(link)
+            if looks_like_redirect(canonical):
+                redirects[link] = canonical
+
+        if redirects:
+            # Кэш - синхронный sqlite: обращения к нему, как и запросы, идут в пуле потоков
+            loop = asyncio.get_running_loop()
+            known = await loop.run_in_executor(self.executor, self.lookup, set(redirects.values()))
+            to_follow = [url for url in set(redirects.values()) if url not in known][:self.per_cycle_limit]
+            if to_follow:
+                followed = await asyncio.gather(*(
+                    loop.run_in_executor(self.executor, self.follow, url) for url in to_follow
+                ))
+                # Неудачные попытки не кэшируются - повторим в следующем цикле
+                fresh = {url: target for url, target in zip(to_follow, followed) if target}
+                await loop.run_in_executor(self.executor, self.store, fresh)
+                known.update(fresh)
+                logger.info(f"↪️ Раскрыто редиректов: {len(fresh)} из {len(to_follow)}")
+
+            for link, canonical in redirects.items():
+                if canonical in known:
+                    result[link] = known[canonical]
+
+        return result
+
+
+# Ссылка -> ожидаемая каноническая форма; проверка: python canonical.py
+CHECKS = (
+    ('http://www.News.site:80/a/b/?utm_source=tg&fbclid=x#top', 'https://news.site/a/b'),
+    ('https://news.site/view?b=2&a=1&yclid=7', 'https://news.site/view?a=1&b=2'),
+    ('https://site.ru/go?url=https://news.site/a', 'https://news.site/a'),
+    ('https://away.vk.com/away.php?to=https%3A%2F%2Fnews.site%2Fa', 'https://news.site/a'),
+    # Содержательные параметры остаются, обычные url/link не разворачиваются
+    ('https://news.site/view?source=42', 'https://news.site/view?source=42'),
+    ('https://news.site/list?from=100&ref=main', 'https://news.site/list?from=100&ref=main'),
+    ('https://example.com/article?id=5&link=https://other.com/x',
+     'https://example.com/article?id=5&link=https%3A%2F%2Fother.com%2Fx'),
+)
+
+
+def main():
+    failed = [(url, expected, canonicalize_url(url)) for url, expected in CHECKS
+              if canonicalize_url(url) != expected]
+    for url, expected, actual in failed:
+        print(f"❌ {url}\n   ожидалось {expected}\n   получено  {actual}")
+    if canonical_id('https://news.site/view?source=42') == canonical_id('https://news.site/view?source=43'):
+        failed.append('source=42/43')
+        print("❌ Разные source склеились в одну новость")
+    if failed:
+        raise SystemExit(1)
+    print(f"✅ Канонические ссылки: {len(CHECKS) + 1} проверок пройдено")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import time
+from datetime import datetime, timezone
+
+
+class SystemClock:
+    """Реальное время. NewsBot и DatabaseManager получают часы через конструктор,
+    чтобы симуляция (simulation.py) могла подменить их виртуальными."""
+
+    def now(self) -> datetime:
+        """Локальное время без часового пояса (как datetime.now())"""
+        return datetime.now()
+
+    def utcnow(self) -> datetime:
+        """UTC без часового пояса - формат, в котором SQLite хранит CURRENT_TIMESTAMP"""
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def time(self) -> float:
+        """Unix-время - общее для всех процессов (сроки аренды в leader.py)"""
+        return time.time()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
@@ -1,8 +1,9 @@
 import sqlite3
-import hashlib
 import logging
 from typing import List, Dict, Optional
 
+from canonical import canonical_id
+
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
@@ -165,5 +166,5 @@ class DatabaseManager:
             cursor.close()
 
 def generate_news_id(title: str, link: str) -> str:
-    content = f"{title}{link}".encode('utf-8')
-    return hashlib.md5(content).hexdigest()
\ No newline at end of file
+    """id новости - от канонической ссылки (title оставлен для совместимости вызовов)"""
+    return canonical_id(link)
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""Разбор тел ответов источников в компактные записи.
+
+Функции принимают сырые байты и возвращают список словарей с полями
+title, link, summary, published (UTC, 'YYYY-MM-DD HH:MM:SS' или None) и image_url.
+Записи сериализуются в JSON, поэтому их можно кэшировать между запусками.
+
+RSS/Atom разбираются потоково (parse_feed_stream): XML подается парсеру
+кусками по мере чтения ответа, разобранные элементы сразу удаляются из
+дерева, а чтение прекращается после limit записей. Память и время зависят
+от limit, а не от размера ленты. Некорректный XML разбирается feedparser'ом.
+"""
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+RSS1 = '{http://purl.org/rss/1.0/}'
+MEDIA = '{http://search.yahoo.com/mrss/}'
+CONTENT = '{http://purl.org/rss/1.0/modules/content/}'
+ITEM_TAGS = frozenset({'item', RSS1 + 'item', ATOM + 'entry'})
+FEED_ROOTS = frozenset({'rss', 'feed', 'RDF'})
+DATE_TAGS = ('pubDate', 'published', 'date')  # как published_parsed у feedparser
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class FeedFormatError(Exception):
+    """Документ не похож на RSS/Atom - разбор передается feedparser'у"""
+
+
+def find_image_in_entry(entry) -> Optional[str]:
+    if hasattr(entry, 'links'):
+        for link in entry.links:
+            if hasattr(link, 'type') and link.type and 'image' in link.type:
+                return link.href
+
+    if hasattr(entry, 'media_content'):
+        for media in entry.media_content:
+            if media.get('type', '').startswith('image'):
+                return media['url']
+
+    return None
+
+
+def parse_feed_bytes(body: bytes, limit: int) -> List[Dict]:
+    """RSS/Atom -> записи первых limit элементов ленты"""
+    import feedparser
+
+    feed = feedparser.parse(body)
+    records = []
+
+    for entry in feed.entries[:limit]:
+        published = None
+        if getattr(entry, 'published_parsed', None):
+            published = datetime(*entry.published_parsed[:6]).strftime(TIMESTAMP_FORMAT)
+
+        records.append({
+            'title': entry.title,
+            'link': entry.link,
+            'summary': getattr(entry, 'summary', ''),
+            'published': published,
+            'image_url': find_image_in_entry(entry)
+        })
+
+    return records
+
+
+def _split_tag(tag: str):
+    if tag.startswith('{'):
+        namespace, _, name = tag[1:].partition('}')
+        return '{' + namespace + '}', name
+    return '', tag
+
+
+def _text(element) -> str:
+    return ''.join(element.itertext()).strip()
+
+
+def _parse_date(value: str) -> Optional[str]:
+    """RFC 822 (RSS) или ISO 8601 (Atom) -> UTC в формате записей"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+def _record_from_item(item) -> Optional[Dict]:
+    """Поля, которые использует бот, из элемента item/entry (как их отдает feedparser)"""
+    title = link = summary = content = None
+    dates = {}
+    link_image = media_image = None
+
+    for child in item:
+        namespace, name = _split_tag(child.tag)
+
+        if name == 'title' and title is None:
+            title = _text(child)
+        elif name == 'link':
+            href = child.get('href')
+            if href is None:
+                link = link or (child.text or '').strip()
+            elif 'image' in child.get('type', '') and link_image is None:
+                link_image = href
+            elif child.get('rel', 'alternate') == 'alternate' and link is None:
+                link = href
+        elif name == 'enclosure' and 'image' in child.get('type', '') and link_image is None:
+            link_image = child.get('url')
+        elif namespace == MEDIA and name == 'content' and media_image is None:
+            if child.get('type', '').startswith('image') or child.get('medium') == 'image':
+                media_image = child.get('url')
+        elif name in ('description', 'summary') and summary is None:
+            summary = _text(child)
+        elif (namespace == CONTENT and name == 'encoded') or (namespace == ATOM and name == 'content'):
+            content = content or _text(child)
+        elif name in DATE_TAGS:
+            dates.setdefault(name, (child.text or '').strip())
+
+    if not title or not link:
+        return None
+
+    published = None
+    for name in DATE_TAGS:
+        published = _parse_date(dates.get(name))
+        if published:
+            break
+
+    return {
+        'title': title,
+        'link': link,
+        'summary': summary if summary is not None else (content or ''),
+        'published': published,
+        'image_url': link_image or media_image
+    }
+
+
+def parse_feed_stream(chunks: Iterable[bytes], limit: int) -> List[Dict]:
+    """RSS/Atom из потока кусков тела -> записи первых limit элементов.
+
+    Куски читаются лениво: после limit-го элемента итератор больше не
+    продвигается, и вызывающий код может закрыть соединение. При ошибке XML
+    прочитанное и оставшееся тело разбирается feedparser'ом.
+    """
+    chunks = iter(chunks)
+    received = []
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    stack = []
+    records = []
+
+    try:
+        for chunk in chunks:
+            received.append(chunk)
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == 'start':
+                    if not stack and _split_tag(element.tag)[1] not in FEED_ROOTS:
+                        raise FeedFormatError(element.tag)
+                    stack.append(element)
+                    continue
+
+                stack.pop()
+                if element.tag not in ITEM_TAGS:
+                    continue
+
+                # Разобранный элемент больше не нужен - дерево не растет
+                if stack:
+                    stack[-1].remove(element)
+                record = _record_from_item(element)
+                if record:
+                    records.append(record)
+                    if len(records) >= limit:
+                        return records
+        parser.close()
+    except (ET.ParseError, FeedFormatError) as e:
+        logger.debug(f"Потоковый разбор не удался ({e}), используем feedparser")
+        return parse_feed_bytes(b''.join(received) + b''.join(chunks), limit)
+
+    return records
+
+
+def parse_feed_body(body: bytes, limit: int, chunk_size: int = 16 * 1024) -> List[Dict]:
+    """То же, что parse_feed_stream, для уже загруженного тела (разбор в пуле процессов)"""
+    view = memoryview(body)
+    return parse_feed_stream((bytes(view[start:start + chunk_size]) for start in range(0, len(body), chunk_size)),
+                             limit)
+
+
+def parse_dtf_html(body: bytes, limit: int) -> List[Dict]:
+    """Страница https://dtf.ru/games -> записи первых limit статей"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(body, 'html.parser')
+    records = []
+
+    for article_tag in soup.find_all('article')[:limit]:
+        title_tag = article_tag.find('h2', class_='content-title')
+        if not title_tag:
+            continue
+
+        link_tag = title_tag.find('a')
+        if not link_tag:
+            continue
+
+        description_tag = article_tag.find('div', class_='content-description')
+
+        image_url = None
+        img_tag = article_tag.find('img')
+        if img_tag and img_tag.get('src'):
+            image_url = img_tag['src']
+            if image_url.startswith('//'):
+                image_url = 'https:' + image_url
+
+        records.append({
+            'title': link_tag.text.strip(),
+            'link': "https://dtf.ru" + link_tag['href'],
+            'summary': description_tag.text.strip() if description_tag else "",
+            'published': None,
+            'image_url': image_url
+        })
+
+    return records
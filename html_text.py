@@ -0,0 +1,100 @@
+"""Потоковое извлечение видимого текста из HTML.
+
+Разметка подается парсеру кусками, и разбор прекращается, как только
+набрано достаточно текста: время очистки описания пропорционально длине
+результата, а не размеру исходного HTML. Содержимое script/style/figure и
+подобных тегов пропускается, HTML-сущности декодируются.
+"""
+import re
+from html.parser import HTMLParser
+
+SKIP_TAGS = frozenset({
+    'script', 'style', 'figure', 'figcaption', 'noscript', 'iframe', 'svg', 'video',
+    'audio', 'object', 'picture', 'template', 'head', 'form', 'button', 'select'
+})
+BLOCK_TAGS = frozenset({
+    'p', 'br', 'div', 'li', 'ul', 'ol', 'tr', 'td', 'th', 'table', 'blockquote', 'section',
+    'article', 'header', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'pre'
+})
+CHUNK_SIZE = 2048
+_WHITESPACE = re.compile(r'\s+')
+
+
+class _Enough(Exception):
+    """Текста набрано достаточно - разбор можно прекратить"""
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self, limit: int):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts = []
+        self.length = 0
+        self.skip_depth = 0
+        self.pending_space = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.pending_space = True
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self.skip_depth:
+                self.skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self.pending_space = True
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.pending_space = True
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+
+        text = _WHITESPACE.sub(' ', data)
+        if not text.strip():
+            self.pending_space = self.pending_space or bool(text)
+            return
+
+        if text[0] == ' ':
+            self.pending_space = True
+            text = text.lstrip()
+        trailing_space = text[-1] == ' '
+        text = text.rstrip()
+
+        if self.pending_space and self.length:
+            self.parts.append(' ')
+            self.length += 1
+        self.parts.append(text)
+        self.length += len(text)
+        self.pending_space = trailing_space
+
+        if self.length > self.limit:
+            raise _Enough()
+
+
+def html_to_text(markup: str, limit: int = 400, ellipsis: str = '...') -> str:
+    """Видимый текст разметки; если он длиннее limit - обрезка по слову с ellipsis"""
+    if not markup:
+        return ''
+
+    extractor = _TextExtractor(limit)
+    try:
+        for start in range(0, len(markup), CHUNK_SIZE):
+            extractor.feed(markup[start:start + CHUNK_SIZE])
+        extractor.close()
+    except _Enough:
+        pass
+
+    text = ''.join(extractor.parts)
+    if len(text) <= limit:
+        return text
+
+    cut = text[:limit]
+    space = cut.rfind(' ')
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip(' ,.;:-—') + ellipsis
@@ -0,0 +1,227 @@
+"""Поиск картинок для новостей без изображения по og:image/twitter:image.
+
+Для новостей, у которых в ленте нет картинки, страница статьи загружается
+параллельно (ограниченный пул потоков), причем читается только начало
+документа до </head> (запрос Range, обрыв соединения после head). Результат,
+в том числе отрицательный, кладется в постоянный кэш link -> image_url с TTL,
+так что каждая страница загружается не чаще раза за TTL. Сбои сети и ответы
+429/5xx не кэшируются: такая страница будет загружена в следующем цикле.
+"""
+import asyncio
+import codecs
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+META_KEYS = ('og:image:secure_url', 'og:image', 'twitter:image', 'twitter:image:src')
+HEAD_END = b'</head'
+# <meta charset="..."> или <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+
+
+class _HeadDone(Exception):
+    pass
+
+
+class TemporaryFetchError(Exception):
+    """Сервер временно не ответил по существу (429, 5xx) - результат не кэшируется"""
+
+
+class _MetaImageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found: Dict[str, str] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            raise _HeadDone()
+        if tag != 'meta':
+            return
+        attributes = dict(attrs)
+        key = (attributes.get('property') or attributes.get('name') or '').lower()
+        content = attributes.get('content')
+        if key in META_KEYS and content and key not in self.found:
+            self.found[key] = content.strip()
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            raise _HeadDone()
+
+
+def head_encoding(head: bytes, content_type: str) -> str:
+    """Кодировка начала документа: из заголовка Content-Type, иначе из <meta charset>, иначе UTF-8.
+
+    response.encoding не подходит: без charset в заголовке requests для text/html
+    сообщает ISO-8859-1, и кириллица в ссылке на картинку превращается в кракозябры.
+    """
+    candidates = re.findall(r'charset\s*=\s*["\']?([\w.:-]+)', content_type or '', re.IGNORECASE)
+    match = META_CHARSET.search(head)
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    for name in candidates:
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+def extract_meta_image(head: str, base_url: str) -> Optional[str]:
+    """Картинка из og:/twitter:-метатегов начала HTML-документа"""
+    parser = _MetaImageParser()
+    try:
+        parser.feed(head)
+        parser.close()
+    except _HeadDone:
+        pass
+    except Exception as e:
+        logger.debug(f"Ошибка разбора head {base_url}: {e}")
+
+    for key in META_KEYS:
+        if parser.found.get(key):
+            return urljoin(base_url, parser.found[key])
+    return None
+
+
+class ImageEnricher:
+    def __init__(self, db_path: str, max_workers: int = 4, ttl_seconds: int = 7 * 24 * 3600,
+                 max_head_bytes: int = 64 * 1024, timeout: float = 5.0, per_cycle_limit: int = 30):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_head_bytes = max_head_bytes
+        self.timeout = timeout
+        self.per_cycle_limit = per_cycle_limit
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='og-image')
+        self.connection = None
+        self._local = threading.local()
+
+    def get_connection(self):
+        if not self.connection:
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS image_cache (
+                    link TEXT PRIMARY KEY,
+                    image_url TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            ''')
+            self.connection.commit()
+        return self.connection
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def _session(self):
+        # requests.Session не гарантирует потокобезопасность - у каждого потока свой
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                'Accept': 'text/html',
+            })
+            self._local.session = session
+        return session
+
+    def lookup(self, links: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Свежие записи кэша: link -> image_url (None - картинки на странице нет)"""
+        links = list(links)
+        if not links:
+            return {}
+        conn = self.get_connection()
+        placeholders = ', '.join('?' for _ in links)
+        rows = conn.execute(
+            f'SELECT link, image_url FROM image_cache WHERE link IN ({placeholders}) AND fetched_at > ?',
+            (*links, time.time() - self.ttl_seconds)
+        )
+        return {link: image_url for link, image_url in rows}
+
+    def store(self, results: Dict[str, Optional[str]]):
+        conn = self.get_connection()
+        now = time.time()
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO image_cache (link, image_url, fetched_at) VALUES (?, ?, ?)',
+                [(link, image_url, now) for link, image_url in results.items()]
+            )
+            conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи кэша картинок: {e}")
+            conn.rollback()
+
+    def fetch_image(self, link: str) -> Optional[str]:
+        """Читает страницу только до </head> и достает из нее og:image"""
+        response = self._session().get(
+            link, stream=True, timeout=self.timeout,
+            headers={'Range': f'bytes=0-{self.max_head_bytes - 1}'}
+        )
+        try:
+            if response.status_code == 429 or response.status_code >= 500:
+                raise TemporaryFetchError(f'HTTP {response.status_code}')
+            if response.status_code >= 400:
+                return None
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and 'html' not in content_type:
+                return None
+
+            head = b''
+            for chunk in response.iter_content(4096):
+                head += chunk
+                if HEAD_END in head[-len(chunk) - len(HEAD_END):].lower() or len(head) >= self.max_head_bytes:
+                    break
+        finally:
+            response.close()
+
+        encoding = head_encoding(head, content_type)
+        return extract_meta_image(head.decode(encoding, errors='replace'), response.url or link)
+
+    def _fetch_safely(self, link: str) -> Tuple[bool, Optional[str]]:
+        """(получен ли ответ, image_url); при сбое ответа нет и кэшировать нечего"""
+        try:
+            return True, self.fetch_image(link)
+        except Exception as e:
+            logger.debug(f"Не удалось получить картинку для {link}: {e}")
+            return False, None
+
+    async def enrich(self, articles: List) -> int:
+        """Проставляет image_url новостям без картинки, возвращает число найденных картинок"""
+        targets = [article for article in articles if not article.image_url][:self.per_cycle_limit]
+        if not targets:
+            return 0
+
+        # Кэш - синхронный sqlite: обращения к нему, как и загрузки, идут в пуле потоков
+        loop = asyncio.get_running_loop()
+        known = await loop.run_in_executor(self.executor, self.lookup, [article.link for article in targets])
+        to_fetch = list({article.link for article in targets if article.link not in known})
+
+        if to_fetch:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(self.executor, self._fetch_safely, link) for link in to_fetch
+            ))
+            # Неудачные загрузки не кэшируются - повторим в следующем цикле
+            fetched = {link: image_url for link, (ok, image_url) in zip(to_fetch, results) if ok}
+            await loop.run_in_executor(self.executor, self.store, fetched)
+            known.update(fetched)
+
+        found = 0
+        for article in targets:
+            if known.get(article.link):
+                article.image_url = known[article.link]
+                found += 1
+
+        logger.info(f"🖼️ Картинки найдены для {found} из {len(targets)} новостей "
+                    f"(загружено страниц: {len(to_fetch)})")
+        return found
@@ -0,0 +1,144 @@
+"""Выбор единственного публикатора среди нескольких экземпляров бота.
+
+Во время деплоя на Render несколько экземпляров могут работать с одной
+базой одновременно. Роль публикатора - это аренда (строка в таблице leases)
+с ограниченным сроком: владелец продлевает ее heartbeat'ом, остальные
+экземпляры работают в горячем резерве и перехватывают аренду, когда она
+истекла. Каждый новый владелец получает увеличенный fencing-токен, и записи
+публикатора (захват новости из резерва, отметка о публикации) проходят только
+в транзакции, где токен все еще действителен - "зависший" бывший лидер не
+сможет ничего записать после перехвата.
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class PublisherLease:
+    def __init__(self, db_path: str, name: str = 'publisher', holder: str = None,
+                 ttl: float = 90.0, clock=None):
+        self.db_path = db_path
+        self.name = name
+        self.holder = holder or default_holder_id()
+        self.ttl = ttl
+        self.clock = clock
+        self.token: Optional[int] = None
+        self.expires_at = 0.0
+        self.connection = None
+        self._lock = threading.Lock()
+        self._heartbeat = None
+        self._stop = threading.Event()
+
+    def _now(self) -> float:
+        return self.clock.time() if self.clock else time.time()
+
+    def get_connection(self):
+        if not self.connection:
+            self.connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                                              isolation_level=None)
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    token INTEGER NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+        return self.connection
+
+    def is_leader(self) -> bool:
+        """Локальная оценка: аренда наша и не истекла (с запасом на задержки)"""
+        return self.token is not None and self._now() < self.expires_at - self.ttl * 0.1
+
+    def acquire_or_renew(self) -> bool:
+        """Продлевает аренду, если она наша, или захватывает истекшую. Возвращает is_leader()"""
+        with self._lock:
+            conn = self.get_connection()
+            now = self._now()
+            was_leader = self.token is not None
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute('SELECT holder, token, expires_at FROM leases WHERE name = ?',
+                                   (self.name,)).fetchone()
+
+                if row is None:
+                    token = 1
+                    conn.execute('INSERT INTO leases (name, holder, token, expires_at) VALUES (?, ?, ?, ?)',
+                                 (self.name, self.holder, token, now + self.ttl))
+                elif row[0] == self.holder and row[1] == self.token and row[2] > now:
+                    token = self.token
+                    conn.execute('UPDATE leases SET expires_at = ? WHERE name = ?', (now + self.ttl, self.name))
+                elif row[2] <= now:
+                    token = row[1] + 1
+                    conn.execute('UPDATE leases SET holder = ?, token = ?, expires_at = ? WHERE name = ?',
+                                 (self.holder, token, now + self.ttl, self.name))
+                else:
+                    token = None
+
+                conn.execute('COMMIT')
+            except Exception as e:
+                logger.error(f"❌ Ошибка продления аренды публикатора: {e}")
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                return self.is_leader()
+
+            self.token = token
+            self.expires_at = now + self.ttl if token is not None else 0.0
+
+        if token is not None and not was_leader:
+            logger.info(f"👑 Экземпляр {self.holder} стал публикатором (токен {token})")
+        elif token is None and was_leader:
+            logger.warning(f"🪑 Экземпляр {self.holder} потерял роль публикатора, переходим в резерв")
+        return self.is_leader()
+
+    def check_fence(self, cursor: sqlite3.Cursor) -> bool:
+        """Вызывается внутри пишущей транзакции: токен все еще текущий и аренда не истекла"""
+        if self.token is None:
+            return False
+        cursor.execute('SELECT 1 FROM leases WHERE name = ? AND holder = ? AND token = ? AND expires_at > ?',
+                       (self.name, self.holder, self.token, self._now()))
+        return cursor.fetchone() is not None
+
+    def release(self):
+        """Отдает аренду сразу (при штатной остановке), чтобы резерв не ждал TTL"""
+        self.stop_heartbeat()
+        with self._lock:
+            if self.token is None:
+                return
+            try:
+                self.get_connection().execute(
+                    'UPDATE leases SET expires_at = 0 WHERE name = ? AND holder = ? AND token = ?',
+                    (self.name, self.holder, self.token)
+                )
+            except Exception as e:
+                logger.error(f"❌ Ошибка освобождения аренды: {e}")
+            self.token = None
+            self.expires_at = 0.0
+
+    def start_heartbeat(self, interval: float = None):
+        """Фоновое продление аренды - публикация не теряет ее во время долгого цикла"""
+        if self._heartbeat and self._heartbeat.is_alive():
+            return
+        interval = interval or self.ttl / 3
+        self._stop.clear()
+
+        def beat():
+            while not self._stop.wait(interval):
+                self.acquire_or_renew()
+
+        self._heartbeat = threading.Thread(target=beat, name='lease-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        self._stop.set()
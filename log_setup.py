@@ -0,0 +1,84 @@
+"""Неблокирующее логирование.
+
+Все логгеры пишут в QueueHandler: запись в лог - это постановка записи в
+очередь, без обращения к диску из event loop'а или потока сбора новостей.
+Отдельный поток QueueListener пишет в консоль (читаемый формат) и в файл с
+ротацией (JSON по строке на событие). Поля, переданные через extra=,
+попадают в JSON как есть, например:
+
+    logger.info("✅ Новость опубликована", extra={'event': 'publish_cycle', 'timings_ms': {...}})
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime, timezone
+
+LOG_FILE = 'news_bot.log'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+QUEUE_SIZE = 10000
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_STANDARD_ATTRS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна строка JSON на запись: время, уровень, логгер, сообщение и поля из extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Если писатель не успевает и очередь заполнена, запись отбрасывается, а не блокирует вызывающего"""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def setup_logging(level: int = logging.INFO, log_file: str = LOG_FILE) -> logging.handlers.QueueListener:
+    """Настраивает корневой логгер (повторный вызов ничего не меняет)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.Queue(QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(log_queue, console, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    return _listener
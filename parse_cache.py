@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ParseCache:
+    """Кэш результатов разбора, ключ - хэш тела ответа.
+
+    Многие источники (DTF /r/games/go, Cybersport) не отдают ETag, но тело
+    ответа между слотами часто не меняется. Если хэш тела уже встречался,
+    готовые записи берутся из кэша и feedparser/BeautifulSoup не запускаются.
+
+    Кэш ограничен max_entries записями с вытеснением по LRU и хранится в
+    SQLite (таблица parse_cache), чтобы переживать перезапуски. Позиция в LRU
+    записывается в базу не на каждое попадание, а не чаще раза в touch_interval
+    секунд на запись: для вытеснения этого достаточно, а лишние записи спорили бы
+    за блокировку базы с параллельными загрузками и веб-сервером.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 64, touch_interval: float = 600.0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.connection = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(body: bytes, namespace: str = '') -> str:
+        """namespace отделяет разные разборщики/лимиты для одного и того же тела"""
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        return f"{namespace}:{digest}" if namespace else digest
+
+    def get_connection(self):
+        if not self.connection:
+            # Та же база, что у DatabaseManager: WAL и ожидание блокировки
+            self.connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS parse_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    source TEXT,
+                    records TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            self.connection.commit()
+            self._load()
+        return self.connection
+
+    def close(self):
+        with self._lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
+
+    def _load(self):
+        rows = self.connection.execute(
+            'SELECT cache_key, records, last_used FROM parse_cache ORDER BY last_used DESC LIMIT ?',
+            (self.max_entries,)
+        ).fetchall()
+        for cache_key, records, last_used in reversed(rows):
+            self._entries[cache_key] = json.loads(records)
+            self._last_used[cache_key] = last_used
+        # Если лимит уменьшили, лишние строки удаляются сразу
+        self.connection.execute('''
+            DELETE FROM parse_cache WHERE cache_key NOT IN (
+                SELECT cache_key FROM parse_cache ORDER BY last_used DESC LIMIT ?
+            )
+        ''', (self.max_entries,))
+        self.connection.commit()
+        logger.info(f"🗃️ Кэш разбора загружен: {len(self._entries)} записей")
+
+    def get(self, cache_key: str) -> Optional[List[Dict]]:
+        with self._lock:
+            try:
+                conn = self.get_connection()
+                records = self._entries.get(cache_key)
+                if records is None:
+                    self.misses += 1
+                    return None
+
+                self._entries.move_to_end(cache_key)
+                now = time.time()
+                if now - self._last_used.get(cache_key, 0) >= self.touch_interval:
+                    conn.execute('UPDATE parse_cache SET last_used = ? WHERE cache_key = ?', (now, cache_key))
+                    conn.commit()
+                    self._last_used[cache_key] = now
+                self.hits += 1
+                return records
+            except Exception as e:
+                logger.error(f"❌ Ошибка чтения кэша разбора: {e}")
+                return None
+
+    def put(self, cache_key: str, records: List[Dict], source: str = None):
+        with self._lock:
+            try:
+                conn = self.get_connection()
+                self._entries[cache_key] = records
+                self._entries.move_to_end(cache_key)
+                self._last_used[cache_key] = time.time()
+
+                conn.execute(
+                    'INSERT OR REPLACE INTO parse_cache (cache_key, source, records, last_used) VALUES (?, ?, ?, ?)',
+                    (cache_key, source, json.dumps(records, ensure_ascii=False), self._last_used[cache_key])
+                )
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._last_used.pop(evicted, None)
+                    conn.execute('DELETE FROM parse_cache WHERE cache_key = ?', (evicted,))
+                conn.commit()
+            except Exception as e:
+                logger.error(f"❌ Ошибка записи в кэш разбора: {e}")
+                if self.connection:
+                    self.connection.rollback()
@@ -0,0 +1,68 @@
+"""Пул процессов для разбора лент и HTML.
+
+feedparser и BeautifulSoup - чистый Python: в потоках они делят GIL с
+циклом событий и веб-сервером. В пуле процессов разбор идет на отдельных
+ядрах; в процесс передаются сырые байты ответа, обратно возвращаются
+компактные записи (списки словарей из feeds), которые дешево сериализуются.
+
+Процессы создаются через forkserver (spawn вне Linux): fork из процесса с
+потоками небезопасен. Рабочие процессы прогреваются при старте - импорт
+feedparser/bs4 выполняется заранее, а не в первом цикле публикации.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    """Ядра минус одно под цикл событий и веб-сервер, но не меньше одного и не больше 8"""
+    return max(1, min((os.cpu_count() or 1) - 1, 8))
+
+
+def _warm_up():
+    # Тяжелые импорты - один раз на рабочий процесс
+    import bs4  # noqa: F401
+    import feedparser  # noqa: F401
+
+    import feeds  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ParsePool:
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or default_workers()
+        self.executor = None
+
+    def start(self):
+        if self.executor:
+            return
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context(method), initializer=_warm_up
+        )
+        # Процессы пула запускаются по требованию - заставляем стартовать все сразу
+        pids = {future.result() for future in [self.executor.submit(_ping) for _ in range(self.workers * 2)]}
+        logger.info(f"⚙️ Пул разбора запущен: {self.workers} процессов ({method}, прогрето {len(pids)})")
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    async def parse(self, func: Callable[[bytes, int], List[Dict]], body: bytes, limit: int) -> List[Dict]:
+        """func - функция модуля feeds (должна импортироваться в рабочем процессе)"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, body, limit)
+
+    def parse_sync(self, func: Callable[[bytes, int], List[Dict]], body: bytes, limit: int) -> List[Dict]:
+        self.start()
+        return self.executor.submit(func, body, limit).result()
@@ -1,8 +1,11 @@
+import logging
 import requests
 from bs4 import BeautifulSoup
 import random
 import time
 
+logger = logging.getLogger(__name__)
+
 # Глобальные настройки для избежания таймаутов на хостинге
 REQUEST_TIMEOUT = 15
 HEADERS = {
@@ -14,7 +17,7 @@ def get_dtf_russian_news():
     """Парсер DTF (русский)"""
     try:
         url = "https://dtf.ru/games"
-        print(f"🌐 Парсим DTF...")
+        logger.info(f"🌐 Парсим DTF...")
 
         response = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()  # Проверяем статус ответа
@@ -68,17 +71,17 @@ def get_dtf_russian_news():
                         })
 
             except Exception as e:
-                print(f"⚠️ Ошибка обработки статьи {i}: {e}")
+                logger.warning(f"⚠️ Ошибка обработки статьи {i}: {e}")
                 continue
 
-        print(f"✅ DTF новостей: {len(news)}")
+        logger.info(f"✅ DTF новостей: {len(news)}")
         return news
 
     except requests.exceptions.Timeout:
-        print("❌ Таймаут при парсинге DTF")
+        logger.error("❌ Таймаут при парсинге DTF")
         return []
     except Exception as e:
-        print(f"❌ Ошибка DTF: {e}")
+        logger.error(f"❌ Ошибка DTF: {e}")
         return []
 
 
@@ -86,7 +89,7 @@ def get_igromania_russian_news():
     """Парсер Игромании (русский)"""
     try:
         url = "https://www.igromania.ru/news/"
-        print(f"🌐 Парсим Игроманию...")
+        logger.info(f"🌐 Парсим Игроманию...")
 
         response = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
@@ -131,17 +134,17 @@ def get_igromania_russian_news():
                     })
 
             except Exception as e:
-                print(f"⚠️ Ошибка обработки статьи: {e}")
+                logger.warning(f"⚠️ Ошибка обработки статьи: {e}")
                 continue
 
-        print(f"✅ Игромания новостей: {len(news)}")
+        logger.info(f"✅ Игромания новостей: {len(news)}")
         return news
 
     except requests.exceptions.Timeout:
-        print("❌ Таймаут при парсинге Игромании")
+        logger.error("❌ Таймаут при парсинге Игромании")
         return []
     except Exception as e:
-        print(f"❌ Ошибка Игромании: {e}")
+        logger.error(f"❌ Ошибка Игромании: {e}")
         return []
 
 
@@ -176,7 +179,7 @@ def get_manual_russian_news():
 
 def get_all_gaming_news():
     """Основная функция - оптимизированная для хостинга"""
-    print("🕸️  Быстрый парсинг новостей...")
+    logger.info("🕸️  Быстрый парсинг новостей...")
 
     all_news = []
 
@@ -184,11 +187,11 @@ def get_all_gaming_news():
     all_news.extend(get_dtf_russian_news())
     all_news.extend(get_igromania_russian_news())
 
-    print(f"📊 Найдено новостей: {len(all_news)}")
+    logger.info(f"📊 Найдено новостей: {len(all_news)}")
 
     # Если ничего не нашли - используем резервные
     if not all_news:
-        print("⚠️  Новости не найдены, используем резервные")
+        logger.warning("⚠️  Новости не найдены, используем резервные")
         all_news = get_manual_russian_news()
 
     # Быстрая фильтрация дубликатов
@@ -204,12 +207,13 @@ def get_all_gaming_news():
     # Простой выбор новостей (без сложной логики)
     result = unique_news[:3]  # Просто берем первые 3
 
-    print(f"✅ Выбрано для публикации: {len(result)}")
+    logger.info(f"✅ Выбрано для публикации: {len(result)}")
     return result
 
 
 # Тест
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     news = get_all_gaming_news()
     print(f"\n=== РЕЗУЛЬТАТ: {len(news)} новостей ===")
     for i, item in enumerate(news, 1):
@@ -0,0 +1,168 @@
+"""Профилирование циклов публикации по запросу.
+
+Профилировщик включается на N следующих циклов (publish_news / collect_news)
+через отладочный эндпоинт app.py. Для каждого цикла сохраняются cProfile,
+снимок tracemalloc и время этапов; результаты лежат в кольцевом буфере.
+
+Пока профилирование не включено, cycle() и stage() возвращают общий
+пустой контекстный менеджер - это одна проверка атрибута на вызов.
+cProfile видит только поток цикла (event loop), но не потоки run_in_executor.
+"""
+import cProfile
+import io
+import itertools
+import logging
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_NULL_CONTEXT = nullcontext()
+
+
+class _StageTimer:
+    __slots__ = ('stages', 'name', 'started')
+
+    def __init__(self, stages: Dict[str, float], name: str):
+        self.stages = stages
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = (time.perf_counter() - self.started) * 1000
+        self.stages[self.name] = self.stages.get(self.name, 0.0) + elapsed
+        return False
+
+
+class CycleProfiler:
+    def __init__(self, history: int = 20, top_functions: int = 30, top_allocations: int = 15):
+        self.top_functions = top_functions
+        self.top_allocations = top_allocations
+        self.results = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._remaining = 0
+        self._trace_memory = True
+        self._stages: Optional[Dict[str, float]] = None
+
+    @property
+    def armed_cycles(self) -> int:
+        return self._remaining
+
+    def arm(self, cycles: int, trace_memory: bool = True):
+        """Профилировать следующие cycles циклов"""
+        with self._lock:
+            self._remaining = cycles
+            self._trace_memory = trace_memory
+        logger.info(f"🔬 Профилирование включено на {cycles} цикл(ов)")
+
+    def disarm(self):
+        with self._lock:
+            self._remaining = 0
+
+    def stage(self, name: str):
+        """Таймер этапа внутри профилируемого цикла"""
+        if self._stages is None:
+            return _NULL_CONTEXT
+        return _StageTimer(self._stages, name)
+
+    def cycle(self, name: str):
+        """Оборачивает цикл; вложенный цикл учитывается как этап внешнего"""
+        if self._stages is not None:
+            return _StageTimer(self._stages, name)
+        if self._remaining <= 0:
+            return _NULL_CONTEXT
+        return self._profile_cycle(name)
+
+    @contextmanager
+    def _profile_cycle(self, name: str):
+        with self._lock:
+            armed = self._remaining > 0
+            if armed:
+                self._remaining -= 1
+            trace_memory = self._trace_memory
+
+        if not armed:  # другой поток успел выключить профилирование
+            yield
+            return
+
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if trace_memory:
+            tracemalloc.reset_peak()
+
+        self._stages = {}
+        profile = cProfile.Profile()
+        started_at = time.time()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            duration = (time.perf_counter() - started) * 1000
+            stages, self._stages = self._stages, None
+
+            snapshot = None
+            peak = None
+            if trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+
+            self._store(name, started_at, duration, stages, profile, snapshot, peak)
+
+    def _store(self, name: str, started_at: float, duration: float, stages: Dict[str, float],
+               profile: cProfile.Profile, snapshot, peak: Optional[int]):
+        report = io.StringIO()
+        pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(self.top_functions)
+        profile.create_stats()
+
+        allocations = []
+        if snapshot is not None:
+            for stat in snapshot.statistics('lineno')[:self.top_allocations]:
+                allocations.append({'location': str(stat.traceback), 'size_kb': stat.size / 1024,
+                                    'count': stat.count})
+
+        result = {
+            'id': next(self._ids),
+            'name': name,
+            'started_at': started_at,
+            'duration_ms': duration,
+            'stages_ms': stages,
+            'memory_peak_kb': peak / 1024 if peak is not None else None,
+            'top_allocations': allocations,
+            'top_functions': report.getvalue(),
+            'profile': marshal.dumps(profile.stats),
+        }
+        with self._lock:
+            self.results.append(result)
+        logger.info(f"🔬 Профиль цикла {name} #{result['id']}: {duration:.0f} мс")
+
+    def summaries(self) -> List[Dict]:
+        with self._lock:
+            return [{key: value for key, value in result.items()
+                     if key not in ('profile', 'top_functions', 'top_allocations')}
+                    for result in self.results]
+
+    def get(self, result_id: int) -> Optional[Dict]:
+        with self._lock:
+            for result in self.results:
+                if result['id'] == result_id:
+                    return result
+        return None
+
+
+# Общий профилировщик процесса: его включает app.py, его используют циклы бота
+profiler = CycleProfiler()
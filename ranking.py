@@ -0,0 +1,98 @@
+import sqlite3
+from datetime import datetime, timezone
+from typing import List, Optional
+
+
+class RankingWeights:
+    """Веса модели ранжирования резерва"""
+    # Свежесть: вклад убывает гиперболически, вдвое за RECENCY_HALF_LIFE_HOURS
+    RECENCY_WEIGHT = 10.0
+    RECENCY_HALF_LIFE_HOURS = 6.0
+    # Бонус за наличие картинки (пост с фото заметнее в ленте)
+    IMAGE_BONUS = 1.5
+    # Штрафы за каждое совпадение с последними RECENT_POSTS публикациями
+    RECENT_POSTS = 6
+    SOURCE_PENALTY = 1.0
+    CATEGORY_PENALTY = 0.5
+    # Сколько самых свежих новостей каждого источника участвуют в отборе
+    CANDIDATES_PER_SOURCE = 8
+
+
+class ReserveRanker:
+    """Выбирает лучшую новость из резерва одним индексным запросом.
+
+    Оценка = свежесть + бонус за картинку - штрафы за источник/категорию,
+    повторяющие последние публикации. Штрафы зависят только от источника,
+    поэтому достаточно рассмотреть по CANDIDATES_PER_SOURCE самых свежих
+    новостей каждого источника: источники перечисляются skip-scan'ом по
+    индексу (used, source, added_at), кандидаты берутся тем же индексом.
+    Стоимость выбора - O(S * log n), где S - число источников в резерве.
+    """
+
+    INDEXES = (
+        'CREATE INDEX IF NOT EXISTS idx_reserve_rank ON news_reserve (used, source, added_at)',
+        'CREATE INDEX IF NOT EXISTS idx_posted_at ON posted_news (posted_at)',
+    )
+
+    RANK_QUERY = '''
+        WITH RECURSIVE
+        sources(source) AS (
+            SELECT MIN(source) FROM news_reserve WHERE used = FALSE
+            UNION ALL
+            SELECT (SELECT MIN(source) FROM news_reserve
+                    WHERE used = FALSE AND source > sources.source)
+            FROM sources WHERE sources.source IS NOT NULL
+        ),
+        recent AS (
+            SELECT source, category FROM posted_news ORDER BY posted_at DESC LIMIT :recent_posts
+        ),
+        candidates AS (
+            SELECT r.id, r.source, r.category, r.image_url,
+                   COALESCE(r.published_at, r.added_at) AS fresh_at
+            FROM sources s
+            JOIN news_reserve r ON r.rowid IN (
+                SELECT rowid FROM news_reserve
+                WHERE used = FALSE AND source = s.source
+                ORDER BY added_at DESC
+                LIMIT :per_source
+            )
+            WHERE s.source IS NOT NULL
+        )
+        SELECT c.id,
+               :recency_weight / (1.0 + MAX(0.0, (julianday(:now) - julianday(c.fresh_at)) * 24.0)
+                                  / :half_life)
+               + CASE WHEN c.image_url IS NOT NULL AND c.image_url != '' THEN :image_bonus ELSE 0 END
+               - :source_penalty * (SELECT COUNT(*) FROM recent WHERE recent.source = c.source)
+               - :category_penalty * (SELECT COUNT(*) FROM recent WHERE recent.category = c.category)
+               AS score
+        FROM candidates c
+        ORDER BY score DESC
+        LIMIT :count
+    '''
+
+    def __init__(self, weights: type = RankingWeights):
+        self.weights = weights
+
+    def ensure_indexes(self, cursor: sqlite3.Cursor):
+        for statement in self.INDEXES:
+            cursor.execute(statement)
+
+    def rank(self, cursor: sqlite3.Cursor, count: int = 1,
+             now: Optional[datetime] = None) -> List[tuple]:
+        """Возвращает [(id, score), ...] лучших неиспользованных новостей резерва."""
+        if now is None:
+            now = datetime.now(timezone.utc)
+        weights = self.weights
+
+        cursor.execute(self.RANK_QUERY, {
+            'now': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'count': count,
+            'recent_posts': weights.RECENT_POSTS,
+            'per_source': max(weights.CANDIDATES_PER_SOURCE, count),
+            'recency_weight': weights.RECENCY_WEIGHT,
+            'half_life': weights.RECENCY_HALF_LIFE_HOURS,
+            'image_bonus': weights.IMAGE_BONUS,
+            'source_penalty': weights.SOURCE_PENALTY,
+            'category_penalty': weights.CATEGORY_PENALTY,
+        })
+        return [(row[0], row[1]) for row in cursor.fetchall()]
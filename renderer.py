@@ -0,0 +1,176 @@
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Telegram считает длину текста и смещения сущностей в кодовых единицах UTF-16
+ELLIPSIS = '…'
+WORD_BOUNDARY_LOOKBACK = 40
+
+
+def utf16_len(text: str) -> int:
+    """Длина строки так, как ее считает Telegram (символы вне BMP занимают 2 единицы)"""
+    return len(text) + sum(1 for char in text if ord(char) > 0xFFFF)
+
+
+def truncate_utf16(text: str, limit: int) -> str:
+    """Обрезает строку до limit единиц UTF-16, не разрывая суррогатные пары и слова.
+
+    Если обрезка нужна, результат заканчивается многоточием и укладывается в limit.
+    """
+    if utf16_len(text) <= limit:
+        return text
+    budget = limit - utf16_len(ELLIPSIS)
+    if budget <= 0:
+        return ''
+
+    used = 0
+    end = 0
+    for index, char in enumerate(text):
+        width = 2 if ord(char) > 0xFFFF else 1
+        if used + width > budget:
+            break
+        used += width
+        end = index + 1
+
+    cut = text[:end]
+    # Предпочитаем резать по пробелу, если он недалеко
+    space = cut.rfind(' ', max(0, end - WORD_BOUNDARY_LOOKBACK))
+    if space > 0:
+        cut = cut[:space]
+    return cut.rstrip(' ,.;:-—') + ELLIPSIS
+
+
+class RenderedMessage(NamedTuple):
+    """Готовый текст и сущности форматирования (смещения в UTF-16)"""
+    text: str
+    entities: List[Dict]
+
+    @property
+    def length(self) -> int:
+        return utf16_len(self.text)
+
+
+class MessageBuilder:
+    """Собирает текст и список сущностей за один проход.
+
+    Форматирование передается в Telegram сущностями, а не разметкой, поэтому
+    пользовательский текст не нужно экранировать и он не может "сломать" Markdown.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._entities = []
+        self._offset = 0
+
+    def add(self, text: str, entity: Optional[str] = None, url: Optional[str] = None) -> 'MessageBuilder':
+        if not text:
+            return self
+        length = utf16_len(text)
+        if entity:
+            item = {'type': entity, 'offset': self._offset, 'length': length}
+            if url:
+                item['url'] = url
+            self._entities.append(item)
+        self._parts.append(text)
+        self._offset += length
+        return self
+
+    def build(self) -> RenderedMessage:
+        return RenderedMessage(''.join(self._parts), list(self._entities))
+
+
+class ArticleRenderer:
+    """Рендерит подготовленную ContentEnhancer'ом новость в сообщение Telegram.
+
+    При превышении лимита сначала сокращается описание, затем заголовок, так
+    что ссылка на источник и оформление всегда остаются целыми. Результат
+    кэшируется по (id новости, лимит).
+    """
+
+    def __init__(self, cache_size: int = 256):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def render(self, article_id: str, enhanced: Dict, limit: int) -> RenderedMessage:
+        key = (article_id, limit)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        rendered = self._render_within(enhanced, limit)
+        self._cache[key] = rendered
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return rendered
+
+    def _render_within(self, enhanced: Dict, limit: int) -> RenderedMessage:
+        title = enhanced['title']
+        description = enhanced['description']
+
+        rendered = self._layout(enhanced, title, description)
+        overflow = rendered.length - limit
+        if overflow <= 0:
+            return rendered
+
+        description_budget = utf16_len(description) - overflow
+        if description_budget > WORD_BOUNDARY_LOOKBACK:
+            return self._layout(enhanced, title, truncate_utf16(description, description_budget))
+
+        # Описания не хватает - убираем его целиком и сокращаем заголовок
+        rendered = self._layout(enhanced, title, '')
+        title_budget = utf16_len(title) - (rendered.length - limit)
+        return self._layout(enhanced, truncate_utf16(title, max(title_budget, 0)), '')
+
+    @staticmethod
+    def _layout(enhanced: Dict, title: str, description: str) -> RenderedMessage:
+        builder = MessageBuilder()
+        builder.add(f"{enhanced['emoji']} ").add(title, 'bold').add('\n\n')
+        builder.add(f"{enhanced['intro_emoji']} ").add(enhanced['intro'], 'bold').add('\n\n')
+        if description:
+            builder.add(f"📊 {description}\n\n")
+        builder.add('💬 ').add('Обсуждение в комментариях приветствуется!', 'italic').add('\n\n')
+        builder.add('🌐 ').add('Источник:', 'bold').add(f" {enhanced['source']}\n\n")
+        builder.add('🔗 ').add(enhanced['link_label'], 'text_link', enhanced['link'])
+        return builder.build()
+
+    def render_digest(self, items: List[Dict], limit: int) -> Tuple[RenderedMessage, int]:
+        """Несколько новостей в одном сообщении.
+
+        При превышении лимита описания сокращаются до равной доли, затем
+        убираются, затем с конца отбрасываются новости. Возвращает сообщение
+        и число вошедших в него новостей (первые count из items).
+        """
+        for count in range(len(items), 0, -1):
+            chosen = items[:count]
+            descriptions = [item['description'] for item in chosen]
+            rendered = self._digest_layout(chosen, descriptions)
+            overflow = rendered.length - limit
+            if overflow <= 0:
+                return rendered, count
+
+            budget = (sum(utf16_len(description) for description in descriptions) - overflow) // count
+            if budget > WORD_BOUNDARY_LOOKBACK:
+                rendered = self._digest_layout(chosen, [truncate_utf16(description, budget)
+                                                        for description in descriptions])
+                if rendered.length <= limit:
+                    return rendered, count
+
+            rendered = self._digest_layout(chosen, [''] * count)
+            if rendered.length <= limit:
+                return rendered, count
+
+        # Даже одна новость не помещается в формат дайджеста
+        return self._render_within(items[0], limit), 1
+
+    @staticmethod
+    def _digest_layout(items: List[Dict], descriptions: List[str]) -> RenderedMessage:
+        builder = MessageBuilder()
+        builder.add('🗞 ').add('Дайджест новостей', 'bold').add('\n\n')
+        for enhanced, description in zip(items, descriptions):
+            builder.add(f"{enhanced['emoji']} ").add(enhanced['title'], 'bold').add('\n')
+            if description:
+                builder.add(f"{description}\n")
+            builder.add('🔗 ').add(enhanced['link_label'], 'text_link', enhanced['link'])
+            builder.add(f" · {enhanced['source']}\n\n")
+        builder.add('💬 ').add('Обсуждение в комментариях приветствуется!', 'italic')
+        return builder.build()
@@ -1,8 +1,13 @@
-import feedparser
 import aiohttp
+import requests
 import asyncio
+import logging
 from datetime import datetime, timedelta
 
+import feeds
+
+logger = logging.getLogger(__name__)
+
 RSS_SOURCES = [
     {
         'name': 'DTF Игры',
@@ -38,65 +43,37 @@ async def parse_rss_feeds():
 
     for source in RSS_SOURCES:
         try:
-            print(f"📡 Парсим RSS: {source['name']}")
-            feed = feedparser.parse(source['url'])
+            logger.info(f"📡 Парсим RSS: {source['name']}")
 
-            # Проверяем успешность парсинга
-            if feed.bozo == 1:  # есть ошибки в RSS
-                print(f"⚠️ Ошибка RSS {source['name']}: {feed.bozo_exception}")
-                continue
+            # Потоковый разбор: читаем ленту только до 15 последних записей
+            response = requests.get(source['url'], timeout=15, stream=True)
+            try:
+                response.raise_for_status()
+                records = feeds.parse_feed_stream(response.iter_content(16 * 1024), 15)
+            finally:
+                response.close()
 
-            for entry in feed.entries[:15]:  # Берем 15 последних
-                # Безопасная проверка даты
+            for record in records:
                 published_time = None
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    try:
-                        published_time = datetime(*entry.published_parsed[:6])
-                        # Проверяем свежесть (не старше 48 часов)
-                        if datetime.now() - published_time > timedelta(hours=48):
-                            continue
-                    except (TypeError, ValueError):
-                        pass
+                if record['published']:
+                    published_time = datetime.strptime(record['published'], '%Y-%m-%d %H:%M:%S')
+                    # Проверяем свежесть (не старше 48 часов)
+                    if datetime.now() - published_time > timedelta(hours=48):
+                        continue
 
                 news.append({
-                    'title': entry.title,
-                    'link': entry.link,
-                    'description': getattr(entry, 'summary', ''),
+                    'title': record['title'],
+                    'link': record['link'],
+                    'description': record['summary'],
                     'source': source['name'],
                     'category': source['category'],
                     'published': published_time,
-                    'image_url': find_image_in_entry(entry)
+                    'image_url': record['image_url']
                 })
 
         except Exception as e:
-            print(f"❌ Ошибка парсинга {source['name']}: {e}")
+            logger.error(f"❌ Ошибка парсинга {source['name']}: {e}")
 
-    print(f"✅ RSS новостей собрано: {len(news)}")
+    logger.info(f"✅ RSS новостей собрано: {len(news)}")
     return news
 
-
-def find_image_in_entry(entry):
-    """Ищем картинку в RSS-записи"""
-    try:
-        # Проверяем медиа-контент
-        if hasattr(entry, 'media_content'):
-            for media in entry.media_content:
-                if media.get('type', '').startswith('image'):
-                    return media['url']
-
-        # Проверяем ссылки
-        if hasattr(entry, 'links'):
-            for link in entry.links:
-                if hasattr(link, 'type') and link.type and 'image' in link.type:
-                    return link.href
-
-        # Проверяем контент
-        if hasattr(entry, 'content'):
-            for content in entry.content:
-                if 'image' in getattr(content, 'type', ''):
-                    return getattr(content, 'value', '')
-
-    except Exception as e:
-        print(f"⚠️ Ошибка поиска картинки: {e}")
-
-    return None
\ No newline at end of file
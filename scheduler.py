@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SlotScheduler:
+    """Ежедневные слоты публикации 'HH:MM' поверх инжектируемых часов.
+
+    Замена глобальному планировщику библиотеки schedule: время берется из
+    clock.now(), поэтому то же расписание можно прогонять в виртуальном времени.
+    Как и schedule.every().day.at(...), каждый слот срабатывает один раз при
+    первой проверке после наступления и переносится на следующие сутки.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.job = None
+        self._runs = []
+
+    def set_daily(self, times: List[str], job: Callable):
+        """Заменяет расписание: job будет вызываться в каждое из времен times"""
+        now = self.clock.now()
+        self.job = job
+        self._runs = sorted(self._next_occurrence(now, time_str) for time_str in times)
+
+    def clear(self):
+        self.job = None
+        self._runs = []
+
+    @staticmethod
+    def _next_occurrence(now: datetime, time_str: str) -> datetime:
+        hour, minute = (int(part) for part in time_str.split(':'))
+        run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        return run_at
+
+    def postpone_until(self, until: datetime) -> int:
+        """Сдвигает слоты, наступающие раньше until, на until - например, чтобы выдержать
+        интервал после внеплановой публикации. Если таких слотов несколько, остается
+        один. Сдвиг действует до следующего set_daily. Возвращает число затронутых слотов."""
+        early = [run_at for run_at in self._runs if run_at < until]
+        if not early:
+            return 0
+        self._runs = sorted([run_at for run_at in self._runs if run_at >= until] + [until])
+        return len(early)
+
+    @property
+    def pending(self) -> List[datetime]:
+        return list(self._runs)
+
+    def next_run(self) -> Optional[datetime]:
+        return self._runs[0] if self._runs else None
+
+    def run_pending(self) -> int:
+        """Выполняет наступившие слоты, возвращает число запусков"""
+        now = self.clock.now()
+        executed = 0
+
+        while self._runs and self._runs[0] <= now:
+            run_at = self._runs.pop(0)
+            next_run = run_at + timedelta(days=1)
+            while next_run <= now:  # пропущенные сутки (например, после простоя) не догоняем
+                next_run += timedelta(days=1)
+            self._runs.append(next_run)
+            self._runs.sort()
+            executed += 1
+            try:
+                self.job()
+            except Exception as e:
+                logger.error(f"❌ Ошибка в задаче расписания: {e}")
+
+        return executed
@@ -0,0 +1,39 @@
+"""Запуск веб-приложения на production-сервере.
+
+waitress - многопоточный WSGI-сервер в одном процессе: запросы
+обслуживает пул из WEB_THREADS потоков, а бот работает в том же процессе
+ровно в одном экземпляре (app.py запускает его при импорте). Схема с
+несколькими процессами-воркерами (gunicorn -w N) здесь не подходит: каждый
+воркер импортирует app и поднял бы собственного бота.
+
+    python serve.py              # то же, что python app.py
+    WEB_THREADS=16 PORT=8080 python serve.py
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+WEB_THREADS = int(os.environ.get('WEB_THREADS', '8'))
+
+
+def run_server(wsgi_app, host: str = '0.0.0.0', port: int = 10000, threads: int = WEB_THREADS):
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning("⚠️ waitress не установлен, запускаем встроенный сервер Flask (только для разработки)")
+        wsgi_app.run(host=host, port=port, debug=False, threaded=True)
+        return
+
+    logger.info(f"🌐 Запускаем веб-сервер на порту {port} (waitress, потоков: {threads})")
+    serve(wsgi_app, host=host, port=port, threads=threads)
+
+
+def main():
+    from app import app
+
+    run_server(app, port=int(os.environ.get('PORT', 10000)))
+
+
+if __name__ == '__main__':
+    main()
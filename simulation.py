@@ -0,0 +1,335 @@
+"""Симуляция работы бота в виртуальном времени.
+
+Прогоняет настоящие NewsBot.run / setup_schedule / резерв на синтетических
+лентах и фиктивном Telegram: недели расписания проходят за секунды.
+Отчет: пропускная способность, глубина резерва по дням, рост файла БД,
+доля дублей и распределение времени обработки слота.
+
+Запуск из корня проекта:
+    python simulation.py --days 28 --sources 5 --rate 2.0
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from bot import Config, DatabaseManager, NewsArticle, NewsBot
+
+logger = logging.getLogger(__name__)
+
+
+class SimulationFinished(Exception):
+    """Виртуальное время дошло до конца симуляции"""
+
+
+class VirtualClock:
+    """Часы с тем же интерфейсом, что clock.SystemClock; sleep() лишь сдвигает время.
+
+    Локальное время и UTC в симуляции совпадают.
+    """
+
+    def __init__(self, start: datetime, end: datetime = None):
+        self.current = start
+        self.end = end
+        self.on_advance = None
+
+    def now(self) -> datetime:
+        return self.current
+
+    def utcnow(self) -> datetime:
+        return self.current
+
+    def monotonic(self) -> float:
+        return self.current.timestamp()
+
+    def time(self) -> float:
+        return self.current.timestamp()
+
+    def sleep(self, seconds: float):
+        self.current += timedelta(seconds=seconds)
+        if self.on_advance:
+            self.on_advance(self.current)
+        if self.end and self.current >= self.end:
+            raise SimulationFinished()
+
+
+class FixtureFeeds:
+    """Синтетические RSS-источники.
+
+    Каждый источник публикует истории пуассоновским потоком с интенсивностью
+    rate в час; лента отдает последние Config.RSS_LIMIT записей за 48 часов,
+    как настоящая. С вероятностью variant_rate история повторно появляется
+    в другом источнике с трекинговыми параметрами - это "дубль" для отчета.
+    """
+
+    CATEGORIES = ['games', 'news', 'esports']
+
+    def __init__(self, clock: VirtualClock, sources: int, rate: float, variant_rate: float, seed: int,
+                 breaking_rate: float = 0.02):
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.sources = [
+            {'name': f'Источник {i + 1}', 'category': self.CATEGORIES[i % len(self.CATEGORIES)]}
+            for i in range(sources)
+        ]
+        self.rate = rate
+        self.variant_rate = variant_rate
+        self.breaking_rate = breaking_rate
+        self.items: Dict[str, List[NewsArticle]] = {source['name']: [] for source in self.sources}
+        self.story_of_link: Dict[str, int] = {}
+        self._next_at = {source['name']: clock.now() for source in self.sources}
+        self._story_counter = 0
+
+    def _generate_until(self, now: datetime):
+        for source in self.sources:
+            name = source['name']
+            while self._next_at[name] <= now:
+                published_at = self._next_at[name]
+                self._story_counter += 1
+                story = self._story_counter
+                title = f'Срочно: новость {story}' if self.random.random() < self.breaking_rate else f'Новость {story}'
+                self._add(source, story, title, f'https://news.example/{story}', published_at)
+
+                if self.random.random() < self.variant_rate:
+                    other = self.random.choice(self.sources)
+                    self._add(other, story, f'Новость {story}!',
+                              f'https://news.example/{story}?utm_source={other["name"]}', published_at)
+
+                self._next_at[name] = published_at + timedelta(hours=self.random.expovariate(self.rate))
+
+    def _add(self, source: Dict, story: int, title: str, link: str, published_at: datetime):
+        self.story_of_link[link] = story
+        article = NewsArticle(title, link, source['name'], source['category'],
+                              'Описание синтетической новости ' * 5,
+                              'https://news.example/image.jpg' if story % 3 else None, published_at)
+        self.items[source['name']].append(article)
+
+    async def parse_feeds(self) -> List[NewsArticle]:
+        now = self.clock.now()
+        self._generate_until(now)
+        articles = []
+        for name, items in self.items.items():
+            fresh = [item for item in items if now - item.published_at <= timedelta(hours=48)]
+            self.items[name] = fresh
+            articles.extend(fresh[-Config.RSS_LIMIT:])
+        return articles
+
+    def poll(self, source: Dict) -> List[NewsArticle]:
+        """Опрос одного источника срочной полосой (BreakingFeedPoller.poll)"""
+        self._generate_until(self.clock.now())
+        return self.items[source['name']][-Config.BREAKING_ENTRIES:]
+
+
+class EmptyHTMLParser:
+    def parse_dtf(self) -> List[NewsArticle]:
+        return []
+
+
+class NoImageEnricher:
+    """Без обращений к страницам статей"""
+
+    async def enrich(self, articles: List[NewsArticle]) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+
+class NoLinkResolver:
+    """Без раскрытия редиректов: ссылки фикстур и так канонические"""
+
+    async def resolve(self, links) -> Dict[str, str]:
+        return {}
+
+    def close(self):
+        pass
+
+
+class NoParseCache:
+    """Без таблицы parse_cache: фикстуры не разбираются"""
+
+    @staticmethod
+    def make_key(body: bytes, namespace: str = '') -> str:
+        return namespace
+
+    def get(self, cache_key: str):
+        return None
+
+    def put(self, cache_key: str, records, source: str = None):
+        pass
+
+    def close(self):
+        pass
+
+
+class SoleLease:
+    """Единственный экземпляр - всегда публикатор, без таблицы аренды и потока продления"""
+
+    def is_leader(self) -> bool:
+        return True
+
+    def acquire_or_renew(self) -> bool:
+        return True
+
+    def check_fence(self, cursor) -> bool:
+        return True
+
+    def start_heartbeat(self, interval: float = None):
+        pass
+
+    def release(self):
+        pass
+
+
+class FakeTelegram:
+    """Записывает "отправленные" новости вместо обращения к API"""
+
+    def __init__(self, clock: VirtualClock, failure_rate: float, seed: int):
+        self.clock = clock
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.sent: List[tuple] = []
+        self.api_calls = 0
+
+    async def send_news(self, article: NewsArticle) -> bool:
+        self.api_calls += 1
+        if self.random.random() < self.failure_rate:
+            return False
+        self.sent.append((self.clock.now(), article))
+        return True
+
+    async def send_digest(self, articles: List[NewsArticle]) -> List[NewsArticle]:
+        self.api_calls += 1
+        if self.random.random() < self.failure_rate:
+            return []
+        self.sent.extend((self.clock.now(), article) for article in articles)
+        return articles
+
+
+class Simulation:
+    def __init__(self, days: int, sources: int, rate: float, variant_rate: float = 0.1,
+                 failure_rate: float = 0.0, seed: int = 42, db_path: str = None):
+        self.start = datetime(2025, 1, 6, 3, 0)
+        self.clock = VirtualClock(self.start, self.start + timedelta(days=days))
+        self.clock.on_advance = self._on_advance
+        self.days = days
+        # Без пути - временная база, а не рабочая DB_CONFIG['database']
+        self._tmp = None
+        if db_path is None:
+            self._tmp = tempfile.TemporaryDirectory()
+            db_path = os.path.join(self._tmp.name, 'simulation.db')
+        self.db_path = db_path
+        self.feeds = FixtureFeeds(self.clock, sources, rate, variant_rate, seed)
+        self.telegram = FakeTelegram(self.clock, failure_rate, seed)
+        self.slot_latencies: List[float] = []
+        self.reserve_depth: List[tuple] = []
+        self.db_size: List[tuple] = []
+        self._last_sample_day = None
+        self.bot = None
+
+    def _on_advance(self, now: datetime):
+        if now.date() != self._last_sample_day:
+            self._last_sample_day = now.date()
+            self.reserve_depth.append((now.date(), self.bot.db.get_reserve_count()))
+            self.db_size.append((now.date(), os.path.getsize(self.db_path)))
+
+    def _instrument(self, bot: NewsBot):
+        publish_news = bot.publish_news
+
+        async def timed_publish_news():
+            started = time.perf_counter()
+            await publish_news()
+            self.slot_latencies.append((time.perf_counter() - started) * 1000)
+
+        bot.publish_news = timed_publish_news
+
+    def run(self) -> Dict:
+        random.seed(0)  # расписание слотов воспроизводимо
+        db = DatabaseManager(self.db_path, clock=self.clock)
+        self.bot = NewsBot(db=db, telegram=self.telegram, rss_parser=self.feeds,
+                           html_parser=EmptyHTMLParser(), clock=self.clock,
+                           image_enricher=NoImageEnricher(), lease=SoleLease(), link_resolver=NoLinkResolver(),
+                           parse_cache=NoParseCache(), breaking_poller=self.feeds,
+                           breaking_sources=self.feeds.sources)
+        self._instrument(self.bot)
+
+        started = time.perf_counter()
+        try:
+            self.bot.run()
+        except SimulationFinished:
+            pass
+        elapsed = time.perf_counter() - started
+
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict:
+        stories = [self.feeds.story_of_link.get(article.link) for _, article in self.telegram.sent]
+        duplicates = sum(count - 1 for count in Counter(stories).values() if count > 1)
+        latencies = sorted(self.slot_latencies) or [0.0]
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            'virtual_days': self.days,
+            'wall_seconds': elapsed,
+            'slots': len(self.slot_latencies),
+            'posts': len(self.telegram.sent),
+            'posts_per_day': len(self.telegram.sent) / self.days,
+            'api_calls': self.telegram.api_calls,
+            'duplicate_rate': duplicates / len(stories) if stories else 0.0,
+            'latency_ms': {
+                'p50': statistics.median(latencies),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': latencies[-1],
+            },
+            'breaking': self.bot.breaking.latency.report() if self.bot.breaking else None,
+            'reserve_depth': self.reserve_depth,
+            'db_size_bytes': self.db_size,
+        }
+
+
+def print_report(report: Dict):
+    print(f"Виртуальных дней: {report['virtual_days']} за {report['wall_seconds']:.1f} с")
+    print(f"Слотов: {report['slots']}, публикаций: {report['posts']} "
+          f"({report['posts_per_day']:.1f} в день), вызовов API: {report['api_calls']}")
+    print(f"Доля дублей: {report['duplicate_rate']:.2%}")
+    latency = report['latency_ms']
+    print(f"Время слота, мс: p50 {latency['p50']:.1f}, p95 {latency['p95']:.1f}, "
+          f"p99 {latency['p99']:.1f}, max {latency['max']:.1f}")
+    breaking = report['breaking']
+    if breaking and breaking['publish_to_post_s']:
+        delay = breaking['publish_to_post_s']
+        print(f"Срочных публикаций: {breaking['posted']}, от публикации источником до поста, с: "
+              f"p50 {delay['p50']:.0f}, p95 {delay['p95']:.0f}, max {delay['max']:.0f}")
+    print("\nДень         резерв   размер БД")
+    for (day, depth), (_, size) in zip(report['reserve_depth'], report['db_size_bytes']):
+        print(f"{day}  {depth:>7}   {size / 1024:>8.0f} КБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--sources', type=int, default=5)
+    parser.add_argument('--rate', type=float, default=2.0, help='новостей в час на источник')
+    parser.add_argument('--variant-rate', type=float, default=0.1, help='доля историй, повторенных другим источником')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='доля неудачных отправок')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        simulation = Simulation(args.days, args.sources, args.rate, args.variant_rate,
+                                args.failure_rate, args.seed, os.path.join(tmp, 'simulation.db'))
+        print_report(simulation.run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+# Строка с пустыми source/category - итог по всем источникам за интервал
+TOTAL = ''
+GRANULARITIES = {
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d',
+}
+
+
+class StatsRollup:
+    """Предагрегированная статистика по часам и дням.
+
+    Каждый цикл публикации одной upsert-операцией на интервал увеличивает
+    счетчики (опубликовано, собрано, ошибки отправки, время отправки) по
+    источнику/категории и в итоговой строке, а также записывает глубину
+    резерва. Запрос истории читает по первичному ключу только нужные
+    интервалы - стоимость пропорциональна числу интервалов, а не размеру
+    posted_news.
+    """
+
+    TABLE = '''
+        CREATE TABLE IF NOT EXISTS stats_rollup (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            source TEXT NOT NULL,
+            category TEXT NOT NULL,
+            posted INTEGER NOT NULL DEFAULT 0,
+            collected INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            cycles INTEGER NOT NULL DEFAULT 0,
+            send_count INTEGER NOT NULL DEFAULT 0,
+            send_ms_total REAL NOT NULL DEFAULT 0,
+            send_ms_max REAL,
+            reserve_depth INTEGER,
+            reserve_depth_max INTEGER,
+            PRIMARY KEY (granularity, bucket, source, category)
+        ) WITHOUT ROWID
+    '''
+
+    UPSERT = '''
+        INSERT INTO stats_rollup (granularity, bucket, source, category, posted, collected, failures,
+                                  cycles, send_count, send_ms_total, send_ms_max, reserve_depth, reserve_depth_max)
+        VALUES (:granularity, :bucket, :source, :category, :posted, :collected, :failures,
+                :cycles, :send_count, :send_ms_total, :send_ms_max, :reserve_depth, :reserve_depth)
+        ON CONFLICT (granularity, bucket, source, category) DO UPDATE SET
+            posted = posted + excluded.posted,
+            collected = collected + excluded.collected,
+            failures = failures + excluded.failures,
+            cycles = cycles + excluded.cycles,
+            send_count = send_count + excluded.send_count,
+            send_ms_total = send_ms_total + excluded.send_ms_total,
+            send_ms_max = MAX(COALESCE(send_ms_max, 0), COALESCE(excluded.send_ms_max, 0)),
+            reserve_depth = COALESCE(excluded.reserve_depth, reserve_depth),
+            reserve_depth_max = MAX(COALESCE(reserve_depth_max, 0), COALESCE(excluded.reserve_depth_max, 0))
+    '''
+
+    def ensure_tables(self, cursor: sqlite3.Cursor):
+        cursor.execute(self.TABLE)
+
+    def record(self, cursor: sqlite3.Cursor, now: datetime, posted: Iterable = (), collected: Iterable = (),
+               failures: int = 0, send_ms: Optional[float] = None, reserve_depth: Optional[int] = None,
+               cycles: int = 1):
+        """Добавляет результаты одного цикла: posted/collected - новости с полями source и category.
+        Срочная публикация вне расписания передает cycles=0"""
+        posted_counts = Counter((article.source or '', article.category or '') for article in posted)
+        collected_counts = Counter((article.source or '', article.category or '') for article in collected)
+
+        rows = [{
+            'source': TOTAL, 'category': TOTAL,
+            'posted': sum(posted_counts.values()), 'collected': sum(collected_counts.values()),
+            'failures': failures, 'cycles': cycles,
+            'send_count': 1 if send_ms is not None else 0, 'send_ms_total': send_ms or 0.0,
+            'send_ms_max': send_ms, 'reserve_depth': reserve_depth,
+        }]
+        for source, category in set(posted_counts) | set(collected_counts):
+            rows.append({
+                'source': source, 'category': category,
+                'posted': posted_counts[(source, category)], 'collected': collected_counts[(source, category)],
+                'failures': 0, 'cycles': 0, 'send_count': 0, 'send_ms_total': 0.0,
+                'send_ms_max': None, 'reserve_depth': None,
+            })
+
+        for granularity, bucket_format in GRANULARITIES.items():
+            bucket = now.strftime(bucket_format)
+            cursor.executemany(self.UPSERT, [
+                dict(row, granularity=granularity, bucket=bucket) for row in rows
+            ])
+
+    def history(self, cursor: sqlite3.Cursor, granularity: str, start: datetime, end: datetime,
+                by_source: bool = False) -> List[Dict]:
+        """Интервалы [start, end]: итоговые строки или, при by_source, строки по источникам"""
+        bucket_format = GRANULARITIES[granularity]
+        source_filter = 'source != :total' if by_source else 'source = :total AND category = :total'
+        cursor.execute(f'''
+            SELECT bucket, source, category, posted, collected, failures, cycles,
+                   send_count, send_ms_total, send_ms_max, reserve_depth, reserve_depth_max
+            FROM stats_rollup
+            WHERE granularity = :granularity AND bucket BETWEEN :start AND :end AND {source_filter}
+            ORDER BY bucket, source, category
+        ''', {'granularity': granularity, 'start': start.strftime(bucket_format),
+              'end': end.strftime(bucket_format), 'total': TOTAL})
+
+        history = []
+        for (bucket, source, category, posted, collected, failures, cycles,
+             send_count, send_ms_total, send_ms_max, reserve_depth, reserve_depth_max) in cursor:
+            item = {'bucket': bucket, 'posted': posted, 'collected': collected}
+            if by_source:
+                item.update(source=source, category=category)
+            else:
+                item.update(
+                    failures=failures, cycles=cycles,
+                    send_avg_ms=round(send_ms_total / send_count, 1) if send_count else None,
+                    send_max_ms=send_ms_max, reserve_depth=reserve_depth, reserve_depth_max=reserve_depth_max,
+                )
+            history.append(item)
+        return history
@@ -0,0 +1,266 @@
+"""Потоковый экспорт и импорт истории публикаций и резерва.
+
+Формат - JSON Lines: первая строка - заголовок, далее по строке на запись
+{"table": ..., "row": {...}}. Файлы с расширением .gz, .bz2 или .xz
+сжимаются/распаковываются на лету.
+
+Экспорт читает таблицы курсором, импорт пишет большими пакетами в
+транзакциях; память не зависит от числа строк. Прогресс импорта
+сохраняется в той же транзакции, что и пакет, поэтому прерванный импорт
+продолжается с места остановки, а повторный не создает дублей
+(новость, которая уже есть в базе, пропускается). Идентификатор новости в
+файле - hex md5 канонической ссылки, независимо от формата ключей в базе.
+Архивные публикации (см. archive.py) выгружаются вместе с posted_news; при
+импорте новости, которые уже есть в архиве базы назначения (archive_index),
+пропускаются, а остальные попадают в posted_news и при необходимости снова
+уходят в архив штатной архивацией.
+
+    python transfer.py export backup.jsonl.gz
+    python transfer.py --db news_bot.db import backup.jsonl.gz
+"""
+import argparse
+import bz2
+import gzip
+import itertools
+import json
+import logging
+import lzma
+import os
+import sqlite3
+import time
+from typing import Dict, Iterator, List, TextIO
+
+from config import DB_CONFIG
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = 'novostnoyigro-export'
+FORMAT_VERSION = 1
+TABLES = ('posted_news', 'news_reserve')
+DEFAULT_BATCH_SIZE = 5000
+
+_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+def open_stream(path: str, mode: str) -> TextIO:
+    """Открывает файл в текстовом режиме, сжатие выбирается по расширению"""
+    opener = _OPENERS.get(os.path.splitext(path)[1], open)
+    return opener(path, mode + 't', encoding='utf-8')
+
+
+def iter_table(conn: sqlite3.Connection, table: str, chunk_size: int = 1000) -> Iterator[Dict]:
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+    if 'digest' in columns:
+        # 64-битный ключ строки - деталь хранения, в файл идет hex-идентификатор новости
+        columns = [column for column in columns if column != 'digest']
+        select = ', '.join('lower(hex(digest)) AS id' if column == 'id' else column for column in columns)
+    else:
+        select = '*'
+    cursor = conn.execute(f'SELECT {select} FROM {table}')
+    columns = [column[0] for column in cursor.description]
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        cursor.close()
+
+
+def iter_archive(db_path: str) -> Iterator[Dict]:
+    from archive import NewsArchive, default_archive_dir
+    from bot import Config
+
+    archive = NewsArchive(Config.ARCHIVE_DIR or default_archive_dir(db_path))
+    try:
+        yield from archive.iter_rows()
+    finally:
+        archive.close()
+
+
+def export_database(db_path: str, out_path: str, tables=TABLES) -> Dict[str, int]:
+    # sqlite3.connect создал бы на месте опечатки пустую базу, а экспорт - файл с одним заголовком
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"База не найдена: {db_path}")
+    conn = sqlite3.connect(db_path)
+    counts = {}
+
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [table for table in tables if table not in existing]
+        if missing:
+            raise ValueError(f"В базе {db_path} нет таблиц: {', '.join(missing)}")
+
+        with open_stream(out_path, 'w') as stream:
+            header = {'format': FORMAT_NAME, 'version': FORMAT_VERSION, 'tables': list(tables),
+                      'exported_at': time.time()}
+            stream.write(json.dumps(header) + '\n')
+
+            for table in tables:
+                counts[table] = 0
+                rows = iter_table(conn, table)
+                if table == 'posted_news':
+                    rows = itertools.chain(rows, iter_archive(db_path))
+                for row in rows:
+                    stream.write(json.dumps({'table': table, 'row': row}, ensure_ascii=False) + '\n')
+                    counts[table] += 1
+                logger.info(f"📤 {table}: выгружено {counts[table]} строк")
+    finally:
+        conn.close()
+
+    return counts
+
+
+class Importer:
+    def __init__(self, db_path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.db = None
+        self.conn = None
+        self._columns: Dict[str, List[str]] = {}
+        self._has_archive = False
+
+    def _connect(self):
+        # Схема (включая поисковые индексы и триггеры) создается штатным кодом бота
+        from bot import DatabaseManager
+
+        self.db = DatabaseManager(self.db_path)
+        self.db.init_database()
+        self.conn = self.db.get_connection()
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS import_progress (
+                file_key TEXT PRIMARY KEY,
+                lines_done INTEGER NOT NULL,
+                completed BOOLEAN DEFAULT FALSE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self.conn.commit()
+        for table in TABLES:
+            self._columns[table] = [row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')]
+        # Таблица остается и при выключенной архивации - проверяем ее наличие, а не настройку
+        self._has_archive = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archive_index'"
+        ).fetchone() is not None
+
+    def _archived(self, cursor: sqlite3.Cursor, table: str, news_id: str) -> bool:
+        return (table == 'posted_news' and self._has_archive
+                and self.db.find_row_key(cursor, 'archive_index', news_id) is not None)
+
+    @staticmethod
+    def _file_key(path: str) -> str:
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def _flush(self, pending: Dict[str, List[Dict]], file_key: str, lines_done: int):
+        cursor = self.conn.cursor()
+        for table, rows in pending.items():
+            if not rows:
+                continue
+            columns = [column for column in self._columns[table] if column in rows[0] or column == 'digest']
+            placeholders = ', '.join('?' for _ in columns)
+            insert = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})'
+            for row in rows:
+                if self._archived(cursor, table, row['id']):
+                    continue
+                # hex-идентификатор -> свободный ключ строки и digest (None - новость уже есть)
+                row_key = self.db.allocate_row_key(cursor, table, row['id'])
+                if row_key is None:
+                    continue
+                row = dict(row, id=row_key, digest=bytes.fromhex(row['id']))
+                cursor.execute(insert, [row.get(column) for column in columns])
+            rows.clear()
+        cursor.close()
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO import_progress (file_key, lines_done) VALUES (?, ?)',
+            (file_key, lines_done)
+        )
+        self.conn.commit()
+
+    def run(self, in_path: str, restart: bool = False) -> Dict[str, int]:
+        self._connect()
+        file_key = self._file_key(in_path)
+
+        row = self.conn.execute(
+            'SELECT lines_done, completed FROM import_progress WHERE file_key = ?', (file_key,)
+        ).fetchone()
+        skip = 0
+        if row and not restart:
+            if row[1]:
+                logger.info("✅ Этот файл уже импортирован (--restart для повторного импорта)")
+                return {}
+            skip = row[0]
+            logger.info(f"⏩ Продолжаем импорт с строки {skip + 1}")
+
+        counts = {table: 0 for table in TABLES}
+        pending = {table: [] for table in TABLES}
+        buffered = 0
+        line_number = 0
+
+        with open_stream(in_path, 'r') as stream:
+            header = json.loads(stream.readline())
+            if header.get('format') != FORMAT_NAME:
+                raise ValueError(f"Неизвестный формат файла: {header.get('format')}")
+            line_number = 1
+
+            for line in stream:
+                line_number += 1
+                if line_number <= skip or not line.strip():
+                    continue
+
+                record = json.loads(line)
+                table = record['table']
+                if table not in pending:
+                    continue
+                pending[table].append(record['row'])
+                counts[table] += 1
+                buffered += 1
+
+                if buffered >= self.batch_size:
+                    self._flush(pending, file_key, line_number)
+                    buffered = 0
+                    logger.info(f"📥 Импортировано строк: {line_number - 1}")
+
+        self._flush(pending, file_key, line_number)
+        self.conn.execute('UPDATE import_progress SET completed = TRUE WHERE file_key = ?', (file_key,))
+        self.conn.commit()
+
+        for table, count in counts.items():
+            logger.info(f"📥 {table}: прочитано {count} строк")
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DB_CONFIG['database'], help='путь к базе бота')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='выгрузить таблицы в JSONL')
+    export_parser.add_argument('path')
+    export_parser.add_argument('--tables', nargs='+', choices=TABLES, default=list(TABLES))
+
+    import_parser = commands.add_parser('import', help='загрузить JSONL в базу')
+    import_parser.add_argument('path')
+    import_parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    import_parser.add_argument('--restart', action='store_true', help='начать импорт заново')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    started = time.perf_counter()
+    try:
+        if args.command == 'export':
+            export_database(args.db, args.path, args.tables)
+        else:
+            Importer(args.db, args.batch_size).run(args.path, args.restart)
+    except (FileNotFoundError, ValueError) as e:
+        raise SystemExit(f"❌ {e}")
+    logger.info(f"⏱️ Готово за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == '__main__':
+    main()
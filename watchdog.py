@@ -0,0 +1,228 @@
+"""Сторож фонового потока бота.
+
+Бот работает в потоке веб-приложения; если run() упал или основной цикл
+завис (например, на запросе к источнику без ответа), публикации молча
+прекращаются. Рантайм бота отмечает в Heartbeat каждый завершенный тик
+основного цикла и каждый асинхронный цикл (публикация, срочная полоса), а
+во время цикла проба измеряет задержку цикла событий. BotWatchdog проверяет
+эти сигналы и, если поток умер или порог превышен, останавливает старый
+рантайм (аренда публикатора отдается - fencing-токен отсекает его записи,
+если зависший поток все же проснется) и запускает новый. Повторные
+перезапуски идут с экспоненциальной задержкой.
+
+Поток Python нельзя прервать снаружи: зависший поток остается daemon'ом и
+завершится сам, когда вызов вернется и он увидит флаг остановки.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Heartbeat:
+    """Сигналы живости одного рантайма бота (время - time.monotonic)"""
+
+    def __init__(self, probe_interval: float = 0.5):
+        self.probe_interval = probe_interval
+        self.started_at = time.monotonic()
+        self.last_tick_at: Optional[float] = None
+        self.completed: Dict[str, float] = {}  # имя цикла -> когда завершился последний
+        self.running: Optional[str] = None
+        self.running_since: Optional[float] = None
+        self.loop_lag_ms = deque(maxlen=240)
+        self._last_probe_at: Optional[float] = None
+
+    def tick(self):
+        self.last_tick_at = time.monotonic()
+
+    async def watch(self, coro, name: str):
+        """Выполняет корутину цикла, замеряя задержку цикла событий"""
+        self.running, self.running_since = name, time.monotonic()
+        self._last_probe_at = self.running_since
+        probe = asyncio.ensure_future(self._probe())
+        try:
+            return await coro
+        finally:
+            probe.cancel()
+            self.completed[name] = time.monotonic()
+            self.running = self.running_since = self._last_probe_at = None
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.probe_interval
+            await asyncio.sleep(self.probe_interval)
+            self.loop_lag_ms.append(max(0.0, loop.time() - expected) * 1000)
+            self._last_probe_at = time.monotonic()
+
+    def current_loop_lag(self) -> float:
+        """Сколько секунд цикл событий не давал пробе сработать (0 вне цикла)"""
+        if self._last_probe_at is None:
+            return 0.0
+        return max(0.0, time.monotonic() - self._last_probe_at - self.probe_interval)
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+
+        def age(moment):
+            return round(now - moment, 1) if moment is not None else None
+
+        lags = sorted(self.loop_lag_ms)
+        return {
+            'uptime_s': age(self.started_at),
+            'last_tick_age_s': age(self.last_tick_at),
+            'last_cycle_age_s': {name: age(moment) for name, moment in self.completed.items()},
+            'running': self.running,
+            'running_for_s': age(self.running_since),
+            'loop_lag_ms': {
+                'current': round(self.current_loop_lag() * 1000, 1),
+                'p50': round(lags[len(lags) // 2], 1) if lags else None,
+                'max': round(lags[-1], 1) if lags else None,
+            },
+        }
+
+
+class BotWatchdog:
+    """Запускает рантайм бота в потоке и перезапускает его при падении или зависании.
+
+    factory - создает новый рантайм (NewsBot): у него должны быть run(), stop()
+    и heartbeat. Пороги в секундах: tick_timeout - с последнего тика основного
+    цикла (тик включает слот публикации, поэтому порог больше самого долгого
+    цикла), cycle_timeout - длительность одного асинхронного цикла,
+    loop_lag_limit - сколько цикл событий может быть заблокирован.
+    """
+
+    def __init__(self, factory: Callable[[], object], on_start: Callable[[object], None] = None,
+                 tick_timeout: float = 900.0, cycle_timeout: float = 600.0, loop_lag_limit: float = 60.0,
+                 check_interval: float = 15.0, backoff_base: float = 30.0, backoff_max: float = 900.0,
+                 stable_after: float = 3600.0):
+        self.factory = factory
+        self.on_start = on_start
+        self.tick_timeout = tick_timeout
+        self.cycle_timeout = cycle_timeout
+        self.loop_lag_limit = loop_lag_limit
+        self.check_interval = check_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.bot = None
+        self.thread: Optional[threading.Thread] = None
+        self.restarts = 0
+        self.consecutive_failures = 0
+        self.last_failure: Optional[str] = None
+        self.next_start_at = 0.0
+        self._startup_grace_until = 0.0
+        self._error: Optional[str] = None
+        self._stop = threading.Event()
+
+    def _run_bot(self, bot):
+        try:
+            bot.run()
+            error = 'run() завершился'
+        except Exception as e:
+            logger.error(f"❌ Ошибка в боте: {e}", exc_info=True)
+            error = f'{type(e).__name__}: {e}'
+        # Брошенный зависший рантайм может завершиться уже после перезапуска
+        if bot is self.bot:
+            self._error = error
+
+    def _start_runtime(self):
+        self._error = None
+        try:
+            self.bot = self.factory()
+        except Exception as e:
+            logger.error(f"❌ Не удалось создать бота: {e}", exc_info=True)
+            self._error = f'{type(e).__name__}: {e}'
+            self._schedule_restart(self._error)
+            return
+        if self.on_start:
+            self.on_start(self.bot)
+        self.thread = threading.Thread(target=self._run_bot, args=(self.bot,), name='news-bot', daemon=True)
+        self.thread.start()
+        # До первого тика идут init_database и, возможно, первая публикация
+        self._startup_grace_until = time.monotonic() + self.tick_timeout
+
+    def check(self) -> Optional[str]:
+        """Причина перезапуска или None, если рантайм жив"""
+        if self.thread is None:
+            return None
+        if not self.thread.is_alive():
+            return f'поток бота завершился: {self._error or "без ошибки"}'
+
+        heartbeat = self.bot.heartbeat
+        now = time.monotonic()
+        if heartbeat.running_since is not None and now - heartbeat.running_since > self.cycle_timeout:
+            return f'цикл {heartbeat.running} идет {now - heartbeat.running_since:.0f} с'
+        lag = heartbeat.current_loop_lag()
+        if lag > self.loop_lag_limit:
+            return f'цикл событий заблокирован {lag:.0f} с'
+        last_tick = heartbeat.last_tick_at
+        if now > self._startup_grace_until and (last_tick is None or now - last_tick > self.tick_timeout):
+            return f'основной цикл не отвечает {now - (last_tick or heartbeat.started_at):.0f} с'
+        return None
+
+    def _schedule_restart(self, reason: str):
+        self.consecutive_failures += 1
+        self.last_failure = reason
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (self.consecutive_failures - 1))
+        self.next_start_at = time.monotonic() + delay
+        self.thread = None
+        logger.warning(f"🐕 Перезапуск бота через {delay:.0f} с (попытка {self.consecutive_failures}): {reason}")
+
+    def _stop_runtime(self):
+        bot = self.bot
+        if bot is None:
+            return
+        try:
+            bot.stop()
+        except Exception as e:
+            logger.error(f"❌ Ошибка остановки бота: {e}")
+
+    def step(self):
+        """Одна проверка: перезапуск по расписанию или по сработавшему порогу"""
+        if self.thread is None:
+            if time.monotonic() >= self.next_start_at:
+                if self.bot is not None:
+                    self.restarts += 1
+                self._start_runtime()
+            return
+
+        reason = self.check()
+        if reason:
+            self._stop_runtime()
+            self._schedule_restart(reason)
+        elif self.consecutive_failures and time.monotonic() - self.bot.heartbeat.started_at > self.stable_after:
+            # Рантайм давно работает без сбоев - задержка снова минимальная
+            self.consecutive_failures = 0
+
+    def run(self):
+        """Блокирующий цикл сторожа (запускается в фоновом потоке приложения)"""
+        while not self._stop.is_set():
+            self.step()
+            self._stop.wait(self.check_interval)
+        self._stop_runtime()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Dict:
+        if self.thread is not None:
+            state = 'active'
+        elif self.bot is None:
+            state = 'starting'
+        else:
+            state = 'restarting'
+        status = {
+            'state': state,
+            'restarts': self.restarts,
+            'last_failure': self.last_failure,
+        }
+        if state == 'restarting':
+            status['restart_in_s'] = round(max(0.0, self.next_start_at - time.monotonic()), 1)
+        if self.bot is not None:
+            status.update(self.bot.heartbeat.snapshot())
+        return status